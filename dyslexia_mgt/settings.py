@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'user.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,7 +72,7 @@ CORS_ALLOW_METHODS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.ClaimsJWTAuthentication',
     )
 }
 
@@ -80,8 +81,27 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),  # Extend refresh token to 30 days
     'ROTATE_REFRESH_TOKENS': True,  # Optionally rotate refresh tokens
     'BLACKLIST_AFTER_ROTATION': True,  # Optionally blacklist old refresh tokens
+    'TOKEN_REFRESH_SERIALIZER': 'user.serializers.CustomTokenRefreshSerializer',
 }
 
+# Claims-based authentication re-checks each user's active flag and password at most once per TTL per process.
+
+AUTH_STATE_CACHE_TTL = 60
+
+AUTH_STATE_CACHE_MAX_ENTRIES = 10000
+
+# Roster import (see user/roster.py): rows per validation/insert batch and, for `manage.py import_roster`, password hashing processes (None = CPU count)
+
+ROSTER_BATCH_SIZE = 500
+
+ROSTER_HASH_WORKERS = None
+
+# Largest roster /api/admin/roster-import/ accepts. Its passwords are hashed one after
+# another in the request thread (about 0.3 s each with PBKDF2), so this keeps the request
+# well inside a worker timeout; larger rosters go through `manage.py import_roster`.
+
+ROSTER_UPLOAD_MAX_ROWS = 10
+
 ROOT_URLCONF = 'dyslexia_mgt.urls'
 
 TEMPLATES = [
@@ -163,3 +183,133 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Exercise recommender
+# Trained artifacts are written by `manage.py train_recommender`; workers pick up a
+# newly activated version within RECOMMENDER_RELOAD_INTERVAL seconds.
+
+RECOMMENDER_MODEL_DIR = BASE_DIR / 'artifacts' / 'recommender'
+
+RECOMMENDER_RELOAD_INTERVAL = 30
+
+RECOMMENDER_TRAINING_CHUNK_SIZE = 5000
+
+# Most users /api/admin/suggested-exercises/ scores in one request (one query, one model call).
+
+RECOMMENDER_BULK_MAX_USERS = 500
+
+# Cache
+# Shared by every worker: catalog responses and exercise ID lists are invalidated by
+# bumping versions here, which a per-process cache would only do for the worker that
+# handled the write.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://localhost:6379/1'),
+    }
+}
+
+# Seconds a cached per-difficulty exercise ID list may live; saves and deletes invalidate it
+# sooner in the shared cache. Draws that hit a since-deleted ID fall back to the table.
+
+EXERCISE_SAMPLER_CACHE_TIMEOUT = 300
+
+# Seconds a cached TextContent/Exercise list or detail payload may live; saves and deletes invalidate it sooner.
+
+CATALOG_CACHE_TIMEOUT = 600
+
+# Readability (see user/readability.py)
+# Grade band served by /api/text-content/for-me/ for each named Profile.reading_level.
+# Numeric reading levels ("3", "grade 3") are read as a grade, +/- READING_LEVEL_GRADE_SPREAD.
+READING_LEVEL_GRADES = {
+    'beginner': (0.0, 2.0),
+    'elementary': (1.0, 4.0),
+    'intermediate': (3.0, 6.0),
+    'advanced': (5.0, 9.0),
+}
+READING_LEVEL_GRADE_SPREAD = 1.0
+
+# Longest segment /api/text-content/<pk>/segments/<n>/ serves; segments end on sentence
+# boundaries. Changing it takes effect for existing texts after `manage.py analyze_text_content`.
+TEXT_SEGMENT_CHARS = 2000
+
+# Next-exercise difficulty
+# The average of the user's last NEXT_DIFFICULTY_WINDOW scores is compared against
+# NEXT_DIFFICULTY_THRESHOLDS in order: (score must exceed, difficulty level). Below
+# every threshold the user gets difficulty 1.
+
+NEXT_DIFFICULTY_WINDOW = 5
+
+NEXT_DIFFICULTY_THRESHOLDS = [
+    (85, 3),  # hard
+    (70, 2),  # medium
+]
+
+# Seconds a user's cached score window may live. Progress writes delete it, so this
+# only bounds how long a window rebuilt during a concurrent write can stay stale.
+
+RECENT_SCORES_CACHE_TIMEOUT = 300
+
+# Serve /api/progress/summary/ from the per-user ProgressSummary row instead of
+# aggregating Progress. Rows are only maintained while this is on; after turning it
+# back on, run `manage.py check_progress_summaries --rebuild`.
+
+PROGRESS_SUMMARY_MATERIALIZED = True
+
+# Query budgets
+# Views declare `query_budget`; QueryBudgetMiddleware logs requests that exceed it.
+# Views without one fall back to this (None disables the check).
+
+QUERY_BUDGET_DEFAULT = None
+
+# Add X-Query-Count/-Time-Ms/-Duplicates headers to responses and log repeated statements.
+# They expose internals, so only in development (the benchmark commands turn them on in process).
+
+QUERY_DIAGNOSTICS = DEBUG
+
+# Largest batch accepted by /api/progress/bulk/
+
+PROGRESS_BULK_MAX_ITEMS = 500
+
+# Google Speech-to-Text
+# Clients are shared per process (see user/speech.py). Point SPEECH_API_ENDPOINT at
+# a local server and set SPEECH_API_INSECURE to test against a plaintext fake.
+
+SPEECH_API_ENDPOINT = os.environ.get('SPEECH_API_ENDPOINT')
+
+SPEECH_API_INSECURE = os.environ.get('SPEECH_API_INSECURE') == '1'
+
+SPEECH_LANGUAGE_CODE = 'en-GH'
+
+SPEECH_CLIENT_POOL_SIZE = 2
+
+SPEECH_MAX_CONCURRENT_REQUESTS = 16
+
+SPEECH_QUEUE_TIMEOUT = 10  # seconds to wait for a free recognition slot
+
+SPEECH_REQUEST_TIMEOUT = 60
+
+SPEECH_STREAM_CHUNK_SIZE = 16 * 1024  # bytes per StreamingRecognizeRequest (the API caps messages at 25 KB)
+
+SPEECH_STREAM_MAX_HEADER = 1024 * 1024  # bytes of WAV metadata chunks read past before the samples must start
+
+# WAV uploads are downmixed, resampled to 16 kHz and trimmed of silence before recognition (see user/audio.py)
+
+SPEECH_PREPROCESS = True
+
+SPEECH_SILENCE_THRESHOLD_DB = -40  # frames quieter than this (dBFS RMS) count as silence
+
+SPEECH_SILENCE_PADDING_MS = 200
+
+# Per-process transcription cache keyed by audio + config hash
+
+TRANSCRIPTION_CACHE_MAX_ENTRIES = 1024
+
+TRANSCRIPTION_CACHE_TTL = 60 * 60
+
+# Answer matching (see user/matching.py)
+
+ANSWER_MATCH_THRESHOLD = 80
+
+VERIFY_ANSWERS_MAX_ITEMS = 200
@@ -20,8 +20,9 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from user.views import CurrentUserView, CustomTokenObtainPairView, ExerciseDetailView, ExerciseListCreateView, MatchAnswerView, NextExerciseView, ProfileDetailView, ProgressDetailView, ProgressHistoryView, ProgressReportView, ProgressSummaryView, RetrieveProgressView, SpeechToTextView, SuggestedExerciseView, TextContentDetailView, TextContentListCreateView, UpdateProgressView, register_user
+from user.views import BulkProgressView, BulkSuggestedExercisesView, CurrentUserView, CustomTokenObtainPairView, ExerciseDetailView, ExerciseListCreateView, MatchAnswerView, NextExerciseView, ProfileDetailView, ProgressDetailView, ProgressHistoryView, ProgressReportView, ProgressSummaryView, RetrieveProgressView, RosterImportView, SpeechToTextView, StreamingSpeechToTextView, SuggestedExerciseView, TextContentDetailView, TextContentForLevelView, TextContentListCreateView, TextContentSearchView, TextContentSegmentView, UpdateProgressView, VerifyAnswersView, register_user
 from django.contrib.auth import views as auth_views
+from user import async_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -29,21 +30,34 @@ urlpatterns = [
     path('api/profile/', ProfileDetailView.as_view(), name='profile_detail'),
     path('api/current-user/', CurrentUserView.as_view(), name='current_user'),
     path('api/register/', register_user, name='register_user'),
+    path('api/admin/roster-import/', RosterImportView.as_view(), name='roster-import'),
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/text-content/', TextContentListCreateView.as_view(), name='text-content-list-create'),
+    path('api/text-content/for-me/', TextContentForLevelView.as_view(), name='text-content-for-me'),
+    path('api/text-content/search/', TextContentSearchView.as_view(), name='text-content-search'),
     path('api/text-content/<int:pk>/', TextContentDetailView.as_view(), name='text-content-detail'),
+    path('api/text-content/<int:pk>/segments/<int:index>/', TextContentSegmentView.as_view(), name='text-content-segment'),
     path('api/exercises/', ExerciseListCreateView.as_view(), name='exercise-list-create'),
     path('api/exercises/<int:pk>/', ExerciseDetailView.as_view(), name='exercise-detail'),
     path('api/progress/', RetrieveProgressView.as_view(), name='retrieve-progress'),
     path('api/progress/<int:pk>/', ProgressDetailView.as_view(), name='progress-detail'),
     path('api/progress/update/', UpdateProgressView.as_view(), name='update-progress'),
+    path('api/progress/bulk/', BulkProgressView.as_view(), name='bulk-progress'),
     path('api/progress/report/', ProgressReportView.as_view(), name='progress-report'),
     path('api/progress/history/', ProgressHistoryView.as_view(), name='progress-history'),
     path('api/progress/summary/', ProgressSummaryView.as_view(), name='progress-summary'),
     path('api/exercises/next/', NextExerciseView.as_view(), name='next-exercise'),
     path('api/speech-to-text/', SpeechToTextView.as_view(), name='speech-to-text'),
+    path('api/speech-to-text/stream/', StreamingSpeechToTextView.as_view(), name='speech-to-text-stream'),
+    path('api/speech-to-text/async/', async_views.speech_to_text, name='speech-to-text-async'),
+    path('api/progress/async/', async_views.progress_list, name='retrieve-progress-async'),
+    path('api/progress/update/async/', async_views.progress_update, name='update-progress-async'),
+    path('api/progress/summary/async/', async_views.progress_summary, name='progress-summary-async'),
+    path('api/exercises/next/async/', async_views.next_exercise, name='next-exercise-async'),
     path('api/verify-answer/', MatchAnswerView.as_view(), name='verify-answer'),
+    path('api/verify-answers/', VerifyAnswersView.as_view(), name='verify-answers'),
     path('api/suggested-exercise/', SuggestedExerciseView.as_view(), name='suggested-exercise'),
+    path('api/admin/suggested-exercises/', BulkSuggestedExercisesView.as_view(), name='suggested-exercises-bulk'),
 
 ]
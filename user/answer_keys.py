@@ -0,0 +1,135 @@
+from user.matching import match_threshold, normalize, ratio
+from user.models import AnswerKey, Exercise
+
+# Keys holding the expected answer of one item, by exercise type, most specific first.
+ANSWER_FIELDS = {
+    'comprehension': ('answer',),
+    'matching': ('word', 'answer'),
+    'scramble': ('sentence', 'answer', 'word'),
+    'blanks': ('answer', 'blank', 'word'),
+}
+FALLBACK_FIELDS = ('answer', 'word', 'sentence', 'text')
+
+
+def _items(content):
+    """The list of items in ``exercise_content``: the content itself, or the first list under a wrapping dict."""
+    if isinstance(content, list):
+        return content
+    if isinstance(content, dict):
+        for value in content.values():
+            if isinstance(value, list):
+                return value
+        return [content]
+    return []
+
+
+def _answer(item, fields):
+    if isinstance(item, str):
+        return item
+    if not isinstance(item, dict):
+        return None
+    for field in fields + FALLBACK_FIELDS:
+        value = item.get(field)
+        if isinstance(value, list) and value and all(isinstance(part, str) for part in value):
+            return ' '.join(value)  # e.g. scramble words in order
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            return str(value)
+    return None
+
+
+def _option_texts(item):
+    options = item.get('options') if isinstance(item, dict) else None
+    texts = []
+    for option in options or ():
+        text = option.get('text') if isinstance(option, dict) else option
+        if isinstance(text, str):
+            texts.append(normalize(text))
+    return texts
+
+
+def compile_answers(exercise_type, content):
+    """
+    Walk ``exercise_content`` once and return the answer key entries.
+
+    Each entry holds the normalized expected answer, its tokens and, for
+    multiple-choice items, the normalized options and the one closest to the
+    answer. Items without a recognizable answer are kept as ``None`` so indexes
+    still line up with the exercise.
+    """
+    fields = ANSWER_FIELDS.get(exercise_type, ())
+    entries = []
+    for item in _items(content):
+        answer = _answer(item, fields)
+        if answer is None:
+            entries.append(None)
+            continue
+        answer = normalize(answer)
+        entry = {'answer': answer, 'tokens': answer.split()}
+        options = _option_texts(item)
+        if options:
+            entry['options'] = options
+            # Option wording can differ slightly from the answer (punctuation, spacing).
+            entry['correct_option'] = max(options, key=lambda option: ratio(answer, option))
+        entries.append(entry)
+    return entries
+
+
+def build_answer_key(exercise):
+    answer_key, _ = AnswerKey.objects.update_or_create(
+        exercise=exercise,
+        defaults={
+            'exercise_type': exercise.exercise_type,
+            'answers': compile_answers(exercise.exercise_type, exercise.exercise_content),
+        },
+    )
+    return answer_key
+
+
+def get_answer_key(exercise_id):
+    """The stored key, compiled on the spot for exercises written without signals (e.g. bulk updates)."""
+    answer_key = AnswerKey.objects.filter(exercise_id=exercise_id).first()
+    if answer_key is None:
+        exercise = Exercise.objects.filter(pk=exercise_id).first()
+        if exercise is not None:
+            answer_key = build_answer_key(exercise)
+    return answer_key
+
+
+def _submitted(answer):
+    if isinstance(answer, list):
+        return ' '.join(str(part) for part in answer)  # tokens in the order the user placed them
+    return '' if answer is None else str(answer)
+
+
+def verify_against_key(answer_key, submitted, cutoff=None):
+    """
+    Score a submission against a stored key.
+
+    ``submitted`` is a list aligned with the exercise items or a ``{index: answer}``
+    dict. Scramble items must match token for token and a chosen option must be
+    the right one; everything else is scored with the fuzzy matcher. Returns
+    ``(results, total)`` where ``total`` counts the answerable items in the exercise.
+    """
+    cutoff = match_threshold() if cutoff is None else cutoff
+    entries = answer_key.answers
+    if isinstance(submitted, dict):
+        submitted = {int(index): answer for index, answer in submitted.items()}
+    else:
+        submitted = dict(enumerate(submitted))
+
+    results = []
+    for index, answer in sorted(submitted.items()):
+        entry = entries[index] if 0 <= index < len(entries) else None
+        if entry is None:
+            results.append({'index': index, 'match_score': 0, 'match': False, 'error': "No answer key for this item."})
+            continue
+        answer = normalize(_submitted(answer))
+        if answer_key.exercise_type == 'scramble':
+            score = 100 if answer.split() == entry['tokens'] else 0
+        elif answer in entry.get('options', ()):
+            # Picking another option is wrong however similar its wording is.
+            score = 100 if answer == entry['correct_option'] else 0
+        else:
+            score = ratio(entry['answer'], answer)  # reported, so not cut off below the threshold
+        results.append({'index': index, 'match_score': score, 'match': score >= cutoff})
+    return results, sum(entry is not None for entry in entries)
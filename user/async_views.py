@@ -0,0 +1,178 @@
+import functools
+import json
+from datetime import timedelta
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, NotFound
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from user.audio import UnsupportedAudio
+from user.authentication import ClaimsJWTAuthentication
+from user.middleware import query_budget
+from user.models import Exercise, Progress
+from user.pagination import LastUpdatedKeysetPagination
+from user.sampling import asample_exercise
+from user.serializers import ExerciseSerializer, ProgressSerializer
+from user.speech import SpeechBusy, arecognize_content
+from user.summary import aget_progress_summary
+from user.utils import aget_next_difficulty
+
+# Async twins of the hot endpoints for ASGI deployments. They authenticate with
+# ClaimsJWTAuthentication.aauthenticate and query through the async ORM, so only the
+# queries themselves leave the event loop (Django runs them on its ORM thread); warm
+# authentication runs none. Responses match their DRF counterparts.
+
+
+async def authenticate(request):
+    """
+    Resolve the JWT user for a plain Django async view; ``None`` when no credentials
+    were sent. Invalid credentials raise ``AuthenticationFailed``.
+    """
+    result = await ClaimsJWTAuthentication().aauthenticate(request)
+    if result is None or not result[0].is_active:
+        return None
+    return result[0]
+
+
+def not_authenticated(request, exc=None):
+    """The 401 DRF's exception handler would send for ``exc``, challenge header included."""
+    exc = exc or NotAuthenticated()
+    data = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+    response = api_response(data, status=exc.status_code)
+    response['WWW-Authenticate'] = ClaimsJWTAuthentication().authenticate_header(request)
+    return response
+
+
+def api_response(data, status=status.HTTP_200_OK):
+    # DRF's encoder, so durations and decimals render exactly as on the DRF views.
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def authenticated(view):
+    """Async counterpart of ``IsAuthenticated``: sets ``request.user`` or answers 401."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            user = await authenticate(request)
+        except AuthenticationFailed as exc:
+            return not_authenticated(request, exc)
+        if user is None:
+            return not_authenticated(request)
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@csrf_exempt
+@require_POST
+@authenticated
+async def speech_to_text(request):
+    """Async counterpart of SpeechToTextView: the recognition call awaits without holding a worker thread."""
+    if 'audio' not in request.FILES:
+        return JsonResponse({"detail": "No audio file provided."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        transcriptions, cache_hit = await arecognize_content(request.FILES['audio'].read())
+    except UnsupportedAudio as e:
+        return JsonResponse({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except SpeechBusy:
+        return JsonResponse({"detail": "Speech recognition is busy, please retry."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    response = JsonResponse({"transcriptions": transcriptions}, status=status.HTTP_200_OK)
+    response['X-Transcription-Cache'] = 'hit' if cache_hit else 'miss'
+    return response
+
+
+@query_budget(2)
+@require_GET
+@authenticated
+async def progress_list(request):
+    """Async counterpart of RetrieveProgressView, including its opt-in keyset pagination."""
+    queryset = Progress.objects.filter(user_id=request.user.id)
+    paginator = LastUpdatedKeysetPagination()
+    try:
+        page = await paginator.apaginate_queryset(queryset, Request(request))
+    except NotFound as e:
+        return api_response({"detail": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
+    if page is None:
+        return api_response(ProgressSerializer([row async for row in queryset], many=True).data)
+    return api_response({'next': paginator.get_next_link(), 'results': ProgressSerializer(page, many=True).data})
+
+
+@query_budget(9)
+@csrf_exempt
+@require_http_methods(['PUT', 'PATCH'])
+@authenticated
+async def progress_update(request):
+    """Async counterpart of UpdateProgressView: adds ``time_spent`` seconds to the user's progress on an exercise."""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({"detail": "Request body must be JSON."}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(data, dict):
+        return JsonResponse({"detail": "Request body must be a JSON object."}, status=status.HTTP_400_BAD_REQUEST)
+
+    exercise_id = data.get('exercise')
+    time_spent_seconds = data.get('time_spent')
+    if not exercise_id:
+        return JsonResponse({"detail": "Exercise ID is required."}, status=status.HTTP_400_BAD_REQUEST)
+    if not time_spent_seconds:
+        return JsonResponse({"detail": "Time spent is required."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        time_spent_seconds = int(time_spent_seconds)
+    except (TypeError, ValueError):
+        return JsonResponse({"detail": "Time spent must be a valid integer."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        exercise_id = int(exercise_id)
+    except (TypeError, ValueError):
+        return JsonResponse({"exercise": ["Incorrect type. Expected pk value."]}, status=status.HTTP_400_BAD_REQUEST)
+    if not await Exercise.objects.filter(pk=exercise_id).aexists():
+        return JsonResponse({"exercise": ["Exercise does not exist."]}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Only the plain fields go through the serializer, so validation needs no queries.
+    changes = {key: value for key, value in data.items() if key in ('status', 'score')}
+    serializer = ProgressSerializer(data=changes, partial=True)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    progress, created = await Progress.objects.aget_or_create(
+        user_id=request.user.id,
+        exercise_id=exercise_id,
+        defaults={'time_spent': timedelta(seconds=0)},
+    )
+    # Rows written elsewhere may have no time recorded yet.
+    progress.time_spent = (progress.time_spent or timedelta(0)) + timedelta(seconds=time_spent_seconds)
+    for field, value in serializer.validated_data.items():
+        setattr(progress, field, value)
+    await progress.asave()
+    return api_response(ProgressSerializer(progress).data)
+
+
+@query_budget(2)
+@require_GET
+@authenticated
+async def progress_summary(request):
+    """Async counterpart of ProgressSummaryView."""
+    return api_response(await aget_progress_summary(request.user))
+
+
+@query_budget(5)
+@require_GET
+@authenticated
+async def next_exercise(request):
+    """Async counterpart of NextExerciseView."""
+    exclude_completed = request.GET.get('exclude_completed', '').lower() in ('1', 'true', 'yes')
+    exercise = await asample_exercise(
+        await aget_next_difficulty(request.user),
+        learning_style=request.GET.get('learning_style'),
+        exclude_completed_by=request.user if exclude_completed else None,
+    )
+    if exercise is None:
+        return JsonResponse({"detail": "No exercises available."}, status=status.HTTP_404_NOT_FOUND)
+    return api_response(ExerciseSerializer(exercise).data)
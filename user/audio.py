@@ -0,0 +1,289 @@
+import itertools
+import struct
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from google.cloud import speech
+
+TARGET_SAMPLE_RATE = 16000
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# Data chunk sizes written by recorders that did not know the length up front.
+_UNKNOWN_DATA_SIZES = (0, 0xFFFFFFFF)
+
+Encoding = speech.RecognitionConfig.AudioEncoding
+
+# MPEG audio sample rates by version bits, then by the 2-bit rate index.
+_MP3_SAMPLE_RATES = {
+    0b11: (44100, 48000, 32000),  # MPEG 1
+    0b10: (22050, 24000, 16000),  # MPEG 2
+    0b00: (11025, 12000, 8000),   # MPEG 2.5
+}
+
+
+class UnsupportedAudio(ValueError):
+    pass
+
+
+class AudioInfo:
+    """What the recognizer needs to know about an upload: its encoding and, where it matters, rate and channels."""
+
+    def __init__(self, container, encoding, sample_rate=None, channels=None, data_offset=0, sample_width=None, data_size=None):
+        self.container = container
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.data_offset = data_offset  # where the samples start, past any header the recognizer should not see
+        self.sample_width = sample_width  # bytes per sample of one channel (WAV)
+        self.data_size = data_size  # bytes of samples, when the WAV header states it
+
+    def config_kwargs(self):
+        kwargs = {'encoding': self.encoding}
+        if self.sample_rate:
+            kwargs['sample_rate_hertz'] = self.sample_rate
+        if self.channels:
+            kwargs['audio_channel_count'] = self.channels
+        return kwargs
+
+
+def _skip_id3(data):
+    if data[:3] == b'ID3' and len(data) >= 10:
+        size = data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9]
+        return data[10 + size:]
+    return data
+
+
+WavHeader = namedtuple('WavHeader', 'format_tag channels sample_rate sample_width data_offset data_size')
+
+
+def _wav_header(data):
+    """
+    The format and data chunk position read from the chunks of a RIFF/WAVE header.
+
+    ``format_tag`` is the extensible header's sub-format where there is one.
+    ``data_offset`` is 0 and ``data_size`` ``None`` while ``data`` ends before the
+    data chunk, e.g. behind a large LIST metadata chunk.
+    """
+    format_tag = channels = sample_rate = sample_width = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, chunk_size = struct.unpack_from('<4sI', data, offset)
+        if chunk_id == b'fmt ' and offset + 24 <= len(data):
+            format_tag, channels, sample_rate, _, block_align, _ = struct.unpack_from('<HHIIHH', data, offset + 8)
+            sample_width = block_align // channels if channels else None
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40 and offset + 34 <= len(data):
+                format_tag, = struct.unpack_from('<H', data, offset + 32)  # leading bytes of the SubFormat GUID
+        elif chunk_id == b'data':
+            data_size = None if chunk_size in _UNKNOWN_DATA_SIZES else chunk_size
+            return WavHeader(format_tag, channels, sample_rate, sample_width, offset + 8, data_size)
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return WavHeader(format_tag, channels, sample_rate, sample_width, 0, None)
+
+
+def probe(header):
+    """
+    Identify an upload from its first bytes (a few KB is enough).
+
+    Raises UnsupportedAudio for anything that is not integer PCM WAV, FLAC, Ogg Opus,
+    WebM Opus or MP3. A WAV whose data chunk lies beyond ``header`` gets a
+    ``data_offset`` of 0; read more and probe again (see probe_stream).
+    """
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        wav = _wav_header(header)
+        if wav.format_tag is not None and wav.format_tag != WAVE_FORMAT_PCM:
+            raise UnsupportedAudio("Only integer PCM WAV is supported.")
+        return AudioInfo(
+            'wav', Encoding.LINEAR16, wav.sample_rate, wav.channels, wav.data_offset, wav.sample_width, wav.data_size,
+        )
+    if header[:4] == b'fLaC':
+        return AudioInfo('flac', Encoding.FLAC)
+    if header[:4] == b'OggS':
+        if b'OpusHead' not in header[:512]:
+            raise UnsupportedAudio("Only Opus is supported inside Ogg containers.")
+        return AudioInfo('ogg', Encoding.OGG_OPUS, 48000)  # Opus always decodes at 48 kHz
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        return AudioInfo('webm', Encoding.WEBM_OPUS, 48000)
+
+    frame = _skip_id3(header)
+    if len(frame) >= 4 and frame[0] == 0xFF and frame[1] & 0xE0 == 0xE0:
+        version = (frame[1] >> 3) & 0b11
+        rate_index = (frame[2] >> 2) & 0b11
+        if version in _MP3_SAMPLE_RATES and rate_index < 3:
+            return AudioInfo('mp3', Encoding.MP3, _MP3_SAMPLE_RATES[version][rate_index])
+    raise UnsupportedAudio("Unrecognized audio format.")
+
+
+def probe_stream(chunks, limit=None):
+    """
+    Probe a chunked upload. Returns ``(info, head)``, ``head`` being the bytes read.
+
+    Reads on while a WAV's data chunk has not been reached, so metadata chunks of
+    any size up to ``limit`` (SPEECH_STREAM_MAX_HEADER) bytes are skipped properly.
+    """
+    limit = limit or settings.SPEECH_STREAM_MAX_HEADER
+    head = next(chunks, b'')
+    info = probe(head)
+    while info.container == 'wav' and not info.data_offset:
+        chunk = next(chunks, b'')
+        if not chunk:
+            raise UnsupportedAudio("The WAV file has no data chunk.")
+        head += chunk
+        if len(head) > limit:
+            raise UnsupportedAudio(f"The WAV header is larger than {limit} bytes.")
+        info = probe(head)
+    return info, head
+
+
+def linear16_stream(info, head, chunks, max_chunk):
+    """
+    The audio of a probed upload as ``(chunks, info)`` ready for streaming recognition.
+
+    WAV samples are cut from their container (header and anything after the data
+    chunk) and, unless they already are mono 16-bit, converted to it chunk by chunk;
+    ``info`` then describes the converted stream. Other formats pass through as they
+    are. No chunk is longer than ``max_chunk`` bytes.
+    """
+    if info.container != 'wav':
+        return _bounded(itertools.chain([head], chunks), max_chunk), info
+
+    def samples():
+        remaining = info.data_size
+        for chunk in itertools.chain([head[info.data_offset:]], chunks):
+            if remaining is not None:
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+            if chunk:
+                yield chunk
+            if remaining == 0:
+                return
+
+    if info.sample_width == 2 and info.channels == 1:
+        return _bounded(samples(), max_chunk), info
+
+    def converted():
+        frame = info.sample_width * info.channels
+        rest = b''
+        for chunk in samples():
+            chunk = rest + chunk
+            usable = len(chunk) - len(chunk) % frame
+            rest = chunk[usable:]
+            if usable:
+                yield to_pcm16(downmix(decode_pcm(chunk[:usable], info.sample_width, info.channels)))
+
+    return _bounded(converted(), max_chunk), AudioInfo('wav', Encoding.LINEAR16, info.sample_rate, 1)
+
+
+def _bounded(chunks, size):
+    for chunk in chunks:
+        for start in range(0, len(chunk), size):
+            yield chunk[start:start + size]
+
+
+def decode_wav(data):
+    """Decode integer PCM WAV into float32 samples in [-1, 1] shaped ``(frames, channels)``."""
+    info = probe(data)
+    if info.container != 'wav' or not info.data_offset or not info.channels:
+        raise UnsupportedAudio("Not a WAV file with a format and a data chunk.")
+    end = info.data_offset + info.data_size if info.data_size is not None else len(data)
+    raw = data[info.data_offset:end]
+    return decode_pcm(raw[:len(raw) - len(raw) % (info.sample_width * info.channels)], info.sample_width, info.channels), info.sample_rate
+
+
+def decode_pcm(raw, width, channels):
+    """Decode interleaved little-endian integer PCM into float32 samples in [-1, 1] shaped ``(frames, channels)``."""
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+    elif width == 3:
+        bytes_ = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = bytes_[:, 0] | bytes_[:, 1] << 8 | bytes_[:, 2] << 16
+        values = np.where(values & 0x800000, values - 0x1000000, values)
+        samples = values.astype(np.float32) / 8388608
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648
+    else:
+        raise UnsupportedAudio(f"Unsupported WAV sample width: {width} bytes.")
+    return samples.reshape(-1, channels)
+
+
+def downmix(samples):
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def _lowpass(samples, cutoff, taps=63):
+    """Hann-windowed sinc FIR; ``cutoff`` is a fraction of the sample rate."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hanning(taps)
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel.astype(np.float32), mode='same')
+
+
+def resample(samples, sample_rate, target_rate=TARGET_SAMPLE_RATE):
+    if sample_rate == target_rate or not len(samples):
+        return samples
+    if target_rate < sample_rate:
+        samples = _lowpass(samples, 0.5 * target_rate / sample_rate)
+    duration = len(samples) / sample_rate
+    positions = np.arange(int(duration * target_rate)) * (sample_rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def trim_silence(samples, sample_rate, threshold_db=None, frame_ms=20, padding_ms=None):
+    """
+    Cut leading and trailing silence with a frame-energy voice activity check.
+
+    A frame is voiced when its RMS level is above ``threshold_db`` dBFS. Everything
+    before the first and after the last voiced frame, beyond ``padding_ms``, is
+    dropped. Returns an empty array when nothing is voiced.
+    """
+    threshold_db = settings.SPEECH_SILENCE_THRESHOLD_DB if threshold_db is None else threshold_db
+    padding_ms = settings.SPEECH_SILENCE_PADDING_MS if padding_ms is None else padding_ms
+
+    frame = max(int(sample_rate * frame_ms / 1000), 1)
+    count = len(samples) // frame
+    if not count:
+        return samples
+
+    frames = samples[:count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    voiced = np.flatnonzero(20 * np.log10(rms + 1e-10) > threshold_db)
+    if not len(voiced):
+        return samples[:0]
+
+    padding = int(sample_rate * padding_ms / 1000)
+    start = max(voiced[0] * frame - padding, 0)
+    end = min((voiced[-1] + 1) * frame + padding, len(samples))
+    return samples[start:end]
+
+
+def to_pcm16(samples):
+    return (np.clip(samples, -1, 1) * 32767).astype('<i2').tobytes()
+
+
+def preprocessing_signature():
+    """The settings ``prepare_audio`` output depends on, for keys of anything derived from it."""
+    return 'preprocess=%s;rate=%d;threshold_db=%s;padding_ms=%s' % (
+        bool(settings.SPEECH_PREPROCESS), TARGET_SAMPLE_RATE,
+        settings.SPEECH_SILENCE_THRESHOLD_DB, settings.SPEECH_SILENCE_PADDING_MS,
+    )
+
+
+def prepare_audio(data):
+    """
+    Turn an upload into the most compact payload the recognizer accepts.
+
+    PCM WAV is decoded, downmixed to mono, resampled to 16 kHz, trimmed of leading
+    and trailing silence and re-encoded as headerless LINEAR16. Compressed formats
+    are already small and are sent as they are with their detected encoding.
+    Returns ``(content, AudioInfo)``; ``content`` is empty when the recording is silent.
+    """
+    info = probe(data[:4096])
+    if info.container != 'wav' or not settings.SPEECH_PREPROCESS:
+        return data, info
+
+    samples, sample_rate = decode_wav(data)
+    samples = trim_silence(resample(downmix(samples), sample_rate), TARGET_SAMPLE_RATE)
+    return to_pcm16(samples), AudioInfo('wav', Encoding.LINEAR16, TARGET_SAMPLE_RATE, 1)
@@ -0,0 +1,148 @@
+import threading
+
+from asgiref.sync import sync_to_async
+from cachetools import TTLCache
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+PROFILE_CLAIM = 'profile'
+PROFILE_FIELDS = ('reading_level', 'preferred_font_size', 'background_color', 'learning_style')
+USER_CLAIMS = ('username', 'email', 'first_name', 'last_name')
+
+
+def profile_claims(profile):
+    return {field: getattr(profile, field) for field in PROFILE_FIELDS}
+
+
+class ProfileSnapshot:
+    """Read-only Profile stand-in built from the token's profile claim, as of login or the last refresh."""
+
+    def __init__(self, user, claims):
+        self.user = user
+        self.user_id = user.id
+        for field in PROFILE_FIELDS:
+            setattr(self, field, claims.get(field))
+
+    def __str__(self):
+        return self.user.username
+
+
+class ClaimsUser(TokenUser):
+    """
+    A user backed by the access token's claims instead of the User row.
+
+    Has ``id``, ``username``, ``email``, names and a ``profile`` snapshot. Code that
+    needs the real rows must load them by ``id``, e.g. ``filter(user_id=request.user.id)``.
+    """
+
+    @cached_property
+    def profile(self):
+        return ProfileSnapshot(self, self.token.get(PROFILE_CLAIM) or {})
+
+
+class UserStateCache:
+    """
+    Per-process ``user_id -> (is_active, is_staff, password hash digest)``, expiring
+    after AUTH_STATE_CACHE_TTL seconds.
+
+    Deactivating a user, changing their staff flag or their password is noticed by every process
+    within the TTL; the process handling the change drops its entry immediately.
+    """
+
+    def __init__(self, maxsize=None, ttl=None):
+        self._lock = threading.Lock()
+        self._entries = TTLCache(
+            maxsize=maxsize or settings.AUTH_STATE_CACHE_MAX_ENTRIES,
+            ttl=ttl or settings.AUTH_STATE_CACHE_TTL,
+        )
+
+    def get(self, user_id):
+        """``(is_active, is_staff, password_digest)``, or ``None`` when the user does not exist."""
+        with self._lock:
+            if user_id in self._entries:
+                return self._entries[user_id]
+        return self._store(user_id, self._query(user_id).first())
+
+    async def aget(self, user_id):
+        """Async ``get``: a hit never leaves the event loop, a miss uses the async ORM."""
+        with self._lock:
+            if user_id in self._entries:
+                return self._entries[user_id]
+        return self._store(user_id, await self._query(user_id).afirst())
+
+    def _query(self, user_id):
+        return User.objects.filter(pk=user_id).values_list('is_active', 'is_staff', 'password')
+
+    def _store(self, user_id, row):
+        state = (row[0], row[1], get_md5_hash_password(row[2])) if row else None
+        with self._lock:
+            self._entries[user_id] = state
+        return state
+
+    def forget(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_states = UserStateCache()
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that does not load the User row on every request.
+
+    The user is built from the token claims (see CustomTokenObtainPairSerializer);
+    only the active flag and the password digest claim are checked, through
+    user_states, so warm requests run no authentication queries. Tokens issued
+    before the profile claim existed fall back to the regular database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if PROFILE_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user = ClaimsUser(validated_token)
+        return self.check_state(user, validated_token, user_states.get(user.id))
+
+    async def aauthenticate(self, request):
+        """
+        ``authenticate`` for async views, taking a Django ``HttpRequest``. Decoding the
+        token is CPU only and user_states answers warm requests on the event loop.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if PROFILE_CLAIM not in validated_token:
+            return await sync_to_async(super().get_user)(validated_token)
+        user = ClaimsUser(validated_token)
+        return self.check_state(user, validated_token, await user_states.aget(user.id))
+
+    def check_state(self, user, validated_token, state):
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        is_active, is_staff, password_digest = state
+        if not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_digest:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        user.is_staff = is_staff  # from the database, not the token, so IsAdminUser sees revocations
+        return user
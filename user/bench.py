@@ -0,0 +1,77 @@
+import math
+import time
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(durations):
+    """Count, total, mean, p50/p95/p99 and throughput of a list of durations in seconds."""
+    ordered = sorted(durations)
+    total = sum(ordered)
+    return {
+        'count': len(ordered),
+        'total': total,
+        'mean': total / len(ordered) if ordered else 0.0,
+        'p50': percentile(ordered, 50),
+        'p95': percentile(ordered, 95),
+        'p99': percentile(ordered, 99),
+        'per_second': len(ordered) / total if total else 0.0,
+    }
+
+
+def time_each(func, items):
+    """Call ``func(item)`` for every item and return the duration of each call in seconds."""
+    durations = []
+    clock = time.perf_counter
+    for item in items:
+        start = clock()
+        func(item)
+        durations.append(clock() - start)
+    return durations
+
+
+UNITS = {'s': 1, 'ms': 1e3, 'us': 1e6}
+
+
+def format_stats(label, stats, unit='ms'):
+    scale = UNITS[unit]
+    return (
+        f"{label}: n={stats['count']} mean={stats['mean'] * scale:.2f}{unit} "
+        f"p50={stats['p50'] * scale:.2f}{unit} p95={stats['p95'] * scale:.2f}{unit} "
+        f"p99={stats['p99'] * scale:.2f}{unit} ({stats['per_second']:,.0f}/s)"
+    )
+
+
+# metric -> +1 if higher is worse, -1 if lower is worse
+REGRESSION_METRICS = {'p50': 1, 'p95': 1, 'p99': 1, 'per_second': -1, 'queries': 1}
+
+
+def compare_results(current, baseline, tolerance=0.1):
+    """
+    Regressions of ``current`` against ``baseline``, both ``{label: stats}`` mappings.
+
+    A timing counts when it is more than ``tolerance`` (a fraction) worse; query
+    counts are exact, so any increase counts. Labels missing from either side are
+    ignored. Returns ``(label, metric, baseline, current, change)`` tuples, where
+    ``change`` is the relative difference.
+    """
+    regressions = []
+    for label, stats in current.items():
+        before = baseline.get(label)
+        if not before:
+            continue
+        for metric, direction in REGRESSION_METRICS.items():
+            if stats.get(metric) is None or before.get(metric) is None:
+                continue
+            old, new = before[metric], stats[metric]
+            change = (new - old) / old if old else 0.0
+            allowed = 0 if metric == 'queries' else tolerance
+            if direction * (new - old) > 0 and (not old or direction * change > allowed):
+                regressions.append((label, metric, old, new, change))
+    return regressions
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from user.models import Progress, UserFeatures
+
+
+def progress_values(score, time_spent):
+    return (score or 0.0, time_spent.total_seconds() if time_spent is not None else 0.0)
+
+
+def apply_progress_change(user_id, old=None, new=None):
+    """
+    Fold one Progress write into the user's running sums in O(1).
+
+    ``old`` and ``new`` are ``(score, time_spent_seconds)`` pairs for the row before
+    and after the write; ``None`` means the row did not exist (create / delete).
+    """
+    apply_progress_changes(user_id, [(old, new)])
+
+
+def apply_progress_changes(user_id, changes):
+    """Fold a batch of ``(old, new)`` Progress writes for one user into a single UPDATE."""
+    count, score, seconds = 0, 0.0, 0.0
+    for old, new in changes:
+        if old is not None:
+            count, score, seconds = count - 1, score - old[0], seconds - old[1]
+        if new is not None:
+            count, score, seconds = count + 1, score + new[0], seconds + new[1]
+
+    deltas = {
+        'progress_count': F('progress_count') + count,
+        'score_sum': F('score_sum') + score,
+        'time_spent_seconds_sum': F('time_spent_seconds_sum') + seconds,
+        'updated_at': timezone.now(),
+    }
+    if not UserFeatures.objects.filter(user_id=user_id).update(**deltas):
+        UserFeatures.objects.get_or_create(user_id=user_id)
+        UserFeatures.objects.filter(user_id=user_id).update(**deltas)
+
+
+def rebuild_user_features(user_ids=None):
+    """Recompute features from the Progress table, for everyone or just ``user_ids``."""
+    progress = Progress.objects.all()
+    if user_ids is not None:
+        progress = progress.filter(user_id__in=user_ids)
+
+    totals = progress.values('user_id').annotate(
+        progress_count=Count('id'),
+        score_sum=Sum('score'),
+        time_spent_sum=Sum('time_spent'),
+    )
+
+    features = [
+        UserFeatures(
+            user_id=row['user_id'],
+            progress_count=row['progress_count'],
+            score_sum=row['score_sum'] or 0.0,
+            time_spent_seconds_sum=row['time_spent_sum'].total_seconds() if row['time_spent_sum'] else 0.0,
+        )
+        for row in totals
+    ]
+
+    with transaction.atomic():
+        stale = UserFeatures.objects.all()
+        if user_ids is not None:
+            stale = stale.filter(user_id__in=user_ids)
+        stale.delete()
+        UserFeatures.objects.bulk_create(features, batch_size=1000)
+    return len(features)
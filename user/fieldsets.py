@@ -0,0 +1,40 @@
+from rest_framework import serializers
+
+
+class SparseFieldsetMixin:
+    """
+    ``?fields=a,b`` limits a GET response to those serializer fields; without it every
+    field but ``default_excluded_fields`` is sent. Of ``deferrable_fields``, the
+    columns no selected field needs are deferred, so unrequested bodies are never
+    read from the database. The serializer must accept a ``fields`` argument.
+    """
+
+    fields_query_param = 'fields'
+    default_excluded_fields = ()
+    deferrable_fields = ()
+
+    def selected_fields(self):
+        if not hasattr(self, '_selected_fields'):
+            available = list(self.get_serializer_class()().fields)
+            param = self.request.query_params.get(self.fields_query_param)
+            if param:
+                fields = [name.strip() for name in param.split(',') if name.strip()]
+                unknown = sorted(set(fields) - set(available))
+                if unknown:
+                    raise serializers.ValidationError({'fields': [f"Unknown field(s): {', '.join(unknown)}."]})
+            else:
+                fields = [name for name in available if name not in self.default_excluded_fields]
+            self._selected_fields = fields
+        return self._selected_fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        selected = self.selected_fields()
+        return queryset.defer(*(name for name in self.deferrable_fields if name not in selected))
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.setdefault('fields', self.selected_fields())
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, DurationField, F, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from user.features import apply_progress_changes, progress_values
+from user.models import Progress
+from user.summary import SUMMARY_FIELDS, apply_summary_changes
+from user.utils import forget_recent_scores
+
+
+def merge_progress_deltas(items):
+    """
+    Collapse validated items into one delta per exercise.
+
+    ``time_spent`` increments add up; for ``status`` and ``score`` the last item wins.
+    """
+    deltas = {}
+    for item in items:
+        delta = deltas.setdefault(item['exercise'], {'time_spent': timedelta(0)})
+        delta['time_spent'] += timedelta(seconds=item['time_spent'])
+        for field in ('status', 'score'):
+            if field in item:
+                delta[field] = item[field]
+    return deltas
+
+
+def insert_missing_progress(user_id, deltas):
+    """
+    Insert a row for every exercise in ``deltas`` this user has none for, with
+    ``INSERT ... ON CONFLICT DO NOTHING RETURNING``, and return the exercise ids
+    of the rows this call inserted.
+
+    The conflict check is the database's, so of two transactions inserting the same
+    row only one sees it as created; the other waits for it and then skips the row.
+    """
+    now = timezone.now()
+    fields = [Progress._meta.get_field(name) for name in ('user', 'exercise', 'status', 'score', 'time_spent', 'last_updated')]
+    rows = [
+        (user_id, exercise_id, delta.get('status', 'in_progress'), delta.get('score', 0.0), timedelta(0), now)
+        for exercise_id, delta in deltas.items()
+    ]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {table} ({columns}) VALUES {values} ON CONFLICT ({user}, {exercise}) DO NOTHING RETURNING {exercise}'.format(
+        table=quote(Progress._meta.db_table),
+        columns=', '.join(quote(field.column) for field in fields),
+        values=', '.join(['(%s)' % ', '.join(['%s'] * len(fields))] * len(rows)),
+        user=quote(fields[0].column),
+        exercise=quote(fields[1].column),
+    )
+    params = [field.get_db_prep_save(value, connection) for row in rows for field, value in zip(fields, row)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def apply_progress_deltas(user_id, deltas):
+    """
+    Apply ``{exercise_id: delta}`` for one user in a single transaction.
+
+    Missing rows are inserted first (``insert_missing_progress``), which decides
+    which rows were created, and every row is then locked, so concurrent batches
+    for the same user apply one after the other. ``status`` and ``score`` are set
+    with one ``bulk_create(update_conflicts=True)`` and ``time_spent`` is
+    incremented with one ``F()`` UPDATE, so concurrent writers cannot lose each
+    other's increments. The running features and materialized summary are updated,
+    and the cached score window dropped, once for the whole batch, because neither
+    bulk_create nor update() fires the per-row signals.
+
+    Returns ``{exercise_id: (progress, created)}``.
+    """
+    exercise_ids = list(deltas)
+    with transaction.atomic():
+        created = insert_missing_progress(user_id, deltas)
+        existing = {
+            progress.exercise_id: progress
+            for progress in Progress.objects.select_for_update().filter(user_id=user_id, exercise_id__in=exercise_ids)
+            if progress.exercise_id not in created
+        }
+
+        rows = []
+        for exercise_id, delta in deltas.items():
+            current = existing.get(exercise_id)
+            rows.append(Progress(
+                user_id=user_id,
+                exercise_id=exercise_id,
+                status=delta.get('status', current.status if current else 'in_progress'),
+                score=delta.get('score', current.score if current else 0.0),
+                time_spent=timedelta(0),
+            ))
+        Progress.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user', 'exercise'],
+            update_fields=['status', 'score', 'last_updated'],
+        )
+
+        Progress.objects.filter(user_id=user_id, exercise_id__in=exercise_ids).update(
+            time_spent=Coalesce(F('time_spent'), Value(timedelta(0))) + Case(
+                *(When(exercise_id=exercise_id, then=Value(delta['time_spent'])) for exercise_id, delta in deltas.items()),
+                output_field=DurationField(),
+            )
+        )
+
+        saved = {
+            progress.exercise_id: progress
+            for progress in Progress.objects.filter(user_id=user_id, exercise_id__in=exercise_ids)
+        }
+
+        feature_changes, summary_changes = [], []
+        for exercise_id, progress in saved.items():
+            current = existing.get(exercise_id)
+            old = {field: getattr(current, field) for field in SUMMARY_FIELDS} if current else None
+            new = {field: getattr(progress, field) for field in SUMMARY_FIELDS}
+            feature_changes.append((
+                progress_values(old['score'], old['time_spent']) if old else None,
+                progress_values(new['score'], new['time_spent']),
+            ))
+            summary_changes.append((old, new))
+        apply_progress_changes(user_id, feature_changes)
+        apply_summary_changes(user_id, summary_changes)
+        forget_recent_scores(user_id)
+
+    return {exercise_id: (progress, exercise_id in created) for exercise_id, progress in saved.items()}
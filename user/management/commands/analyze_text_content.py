@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from user.models import TextContent
+from user.readability import backfill
+from user.response_cache import invalidate_catalog
+
+
+class Command(BaseCommand):
+    help = "Recompute the readability metrics of TextContent rows (saves keep them current; this is for backfills)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help="Only analyze these rows (default: all of them).")
+        parser.add_argument('--missing', action='store_true', help="Only rows that have never been analyzed.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per UPDATE batch.")
+
+    def handle(self, *args, **options):
+        queryset = TextContent.objects.all()
+        if options['ids']:
+            queryset = queryset.filter(id__in=options['ids'])
+        if options['missing']:
+            queryset = queryset.filter(word_count=0).exclude(body='')
+
+        def on_batch(rows):
+            for row in rows:
+                invalidate_catalog('textcontent', row.pk)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  analyzed up to id {rows[-1].pk}")
+
+        count = backfill(queryset, batch_size=options['batch_size'], on_batch=on_batch)
+        self.stdout.write(self.style.SUCCESS(f"Analyzed {count} text(s)"))
@@ -0,0 +1,206 @@
+import asyncio
+import io
+import json
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+from user.bench import format_stats, summarize
+from user.models import Exercise, Progress
+from user.serializers import CustomTokenObtainPairSerializer
+
+# endpoint name -> (DRF view path, async view path)
+ENDPOINTS = {
+    'progress': ('/api/progress/', '/api/progress/async/'),
+    'summary': ('/api/progress/summary/', '/api/progress/summary/async/'),
+    'next-exercise': ('/api/exercises/next/', '/api/exercises/next/async/'),
+}
+
+# mode -> (server interface, which view path)
+MODES = {
+    'wsgi': ('wsgi', 0),
+    'asgi-sync-views': ('asgi', 0),
+    'asgi': ('asgi', 1),
+}
+
+HOST = 'localhost'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second and latency of the hot read endpoints served by the WSGI "
+        "handler from a thread pool against the ASGI handler with the async views, in process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and mode.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Requests in flight (WSGI threads / ASGI tasks).")
+        parser.add_argument(
+            '--endpoints', default=','.join(ENDPOINTS),
+            help=f"Comma-separated endpoints to run (default: all of {', '.join(ENDPOINTS)}).",
+        )
+        parser.add_argument(
+            '--modes', default=','.join(MODES),
+            help=f"Comma-separated modes to run (default: all of {', '.join(MODES)}).",
+        )
+        parser.add_argument(
+            '--db-latency-ms', type=float, default=0.0,
+            help="Sleep this long in every query, to stand in for a database across the network.",
+        )
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        endpoints = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        modes = [name.strip() for name in options['modes'].split(',') if name.strip()]
+        unknown = sorted(set(endpoints) - set(ENDPOINTS)) + sorted(set(modes) - set(MODES))
+        if unknown:
+            raise CommandError(f"Unknown endpoint or mode: {', '.join(unknown)}")
+
+        latency = options['db_latency_ms'] / 1000
+        if latency:
+            def add_latency(execute, sql, params, many, context):
+                time.sleep(latency)
+                return execute(sql, params, many, context)
+
+            def install(sender, connection, **kwargs):
+                connection.execute_wrappers.append(add_latency)
+            connection_created.connect(install, weak=False)
+
+        prefix = f'bench-{uuid.uuid4().hex[:8]}-'
+        diagnostics = override_settings(QUERY_DIAGNOSTICS=True)  # for the X-Query-Count header
+        diagnostics.enable()
+        try:
+            token = self.setup(prefix)
+            results = {}
+            for endpoint in endpoints:
+                for mode in modes:
+                    interface, variant = MODES[mode]
+                    path = ENDPOINTS[endpoint][variant]
+                    run = self.run_wsgi if interface == 'wsgi' else self.run_asgi
+                    run(path, token, options['concurrency'], 1)  # warm caches and connections
+                    started = time.perf_counter()
+                    durations, queries, errors = run(path, token, options['concurrency'], options['requests'])
+                    elapsed = time.perf_counter() - started
+                    results[f'{endpoint} {mode}'] = {
+                        **summarize(durations),
+                        'per_second': len(durations) / elapsed,  # concurrent, so not count / summed durations
+                        'queries': queries / len(durations),
+                        'errors': errors,
+                    }
+        finally:
+            diagnostics.disable()
+            User.objects.filter(username__startswith=prefix).delete()
+            Exercise.objects.filter(title__startswith=prefix).delete()
+            if latency:
+                connection_created.disconnect(install)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for label, result in results.items():
+            self.stdout.write(
+                f"{format_stats(label, result)} at concurrency {options['concurrency']}, "
+                f"{result['queries']:.1f} queries/request, {result['errors']} errors"
+            )
+
+    def setup(self, prefix):
+        user = User.objects.create_user(f'{prefix}user', f'{prefix}user@example.com', uuid.uuid4().hex)
+        exercises = list(Exercise.objects.order_by('id')[:20])
+        if not exercises:
+            exercises = Exercise.objects.bulk_create([
+                Exercise(
+                    title=f'{prefix}{level}-{n}', description='Benchmark exercise', exercise_content={},
+                    difficulty_level=level,
+                )
+                for level in (1, 2, 3) for n in range(5)
+            ])
+        for n, exercise in enumerate(exercises):
+            Progress.objects.create(
+                user=user, exercise=exercise, status='completed' if n % 2 else 'in_progress',
+                score=50 + n * 2, time_spent=timedelta(seconds=30 + n),
+            )
+        return str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+    def run_wsgi(self, path, token, concurrency, count):
+        application = get_wsgi_application()
+
+        def call(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': HOST,
+                'HTTP_AUTHORIZATION': f'Bearer {token}', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+                'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0), 'wsgi.multithread': True,
+                'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            captured = {}
+
+            def start_response(status, headers, exc_info=None):
+                captured['status'], captured['headers'] = int(status.split()[0]), dict(headers)
+
+            start = time.perf_counter()
+            body = application(environ, start_response)
+            try:
+                b''.join(body)
+            finally:
+                body.close()
+            return time.perf_counter() - start, captured['status'], int(captured['headers'].get('X-Query-Count', 0))
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return self.collect(pool.map(call, range(count)))
+
+    def run_asgi(self, path, token, concurrency, count):
+        application = get_asgi_application()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', HOST.encode()), (b'authorization', f'Bearer {token}'.encode())],
+            'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+        }
+
+        async def call(semaphore):
+            async with semaphore:
+                sent_body = asyncio.Event()
+                messages = []
+
+                async def receive():
+                    if not messages:
+                        messages.append(None)
+                        return {'type': 'http.request', 'body': b'', 'more_body': False}
+                    await sent_body.wait()
+                    return {'type': 'http.disconnect'}
+
+                captured = {}
+
+                async def send(message):
+                    if message['type'] == 'http.response.start':
+                        captured['status'] = message['status']
+                        captured['headers'] = {key.decode().lower(): value.decode() for key, value in message['headers']}
+                    elif not message.get('more_body'):
+                        sent_body.set()
+
+                start = time.perf_counter()
+                await application(dict(scope), receive, send)
+                return time.perf_counter() - start, captured['status'], int(captured['headers'].get('x-query-count', 0))
+
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(call(semaphore) for _ in range(count)))
+
+        return self.collect(asyncio.run(main()))
+
+    def collect(self, outcomes):
+        durations, queries, errors = [], 0, 0
+        for duration, status, query_count in outcomes:
+            durations.append(duration)
+            queries += query_count
+            errors += status >= 400
+        return durations, queries, errors
@@ -0,0 +1,67 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from user.bench import format_stats, summarize
+
+PASSWORD = 'Bench-passw0rd!'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure registration and login throughput through the API, in process. Runs against a "
+        "throwaway test database (created and destroyed like the test runner's), never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help="Registrations (and then logins) to run.")
+        parser.add_argument(
+            '--fast-hasher', action='store_true',
+            help="Hash passwords with MD5 so the numbers show request and database overhead rather than PBKDF2.",
+        )
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        overrides = {'QUERY_DIAGNOSTICS': True}  # for the X-Query-Count header
+        if options['fast_hasher']:
+            overrides['PASSWORD_HASHERS'] = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(**overrides):
+                results = self.run(options['requests'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for label, result in results.items():
+            self.stdout.write(f"{format_stats(label, result)}, {result['queries']:.1f} queries/request")
+
+    def run(self, count):
+        client = Client()
+        results = {}
+        for label, path, payload in (
+            ('register', '/api/register/', lambda n: {
+                'username': f'bench-{n}', 'password': PASSWORD, 'email': f'bench-{n}@example.com',
+                'first_name': 'Bench', 'last_name': str(n),
+            }),
+            ('login', '/api/token/', lambda n: {'username': f'bench-{n}', 'password': PASSWORD}),
+        ):
+            durations, queries = [], 0
+            for n in range(count):
+                data = payload(n)
+                start = time.perf_counter()
+                response = client.post(path, data, content_type='application/json')
+                durations.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    raise CommandError(f"{path} returned {response.status_code}: {response.content[:200]!r}")
+                queries += int(response['X-Query-Count'])
+            results[label] = {**summarize(durations), 'queries': queries / count}
+        return results
@@ -0,0 +1,88 @@
+import json
+import random
+import string
+
+from django.core.management.base import BaseCommand
+from fuzzywuzzy import fuzz
+
+from user.bench import format_stats, summarize, time_each
+from user.matching import _reference, match_threshold, normalize, ratio, verify_answers
+
+WORDS = (
+    "apple banana elephant giraffe butterfly necessary because beautiful friend "
+    "school library question answer rhythm island castle wednesday february "
+    "knight thought through enough colour neighbour receive believe separate"
+).split()
+
+
+def misspell(text, rng, edits):
+    chars = list(text)
+    for _ in range(edits):
+        position = rng.randrange(len(chars) + 1)
+        operation = rng.choice(('insert', 'delete', 'replace', 'swap'))
+        if operation == 'insert' or not chars:
+            chars.insert(position, rng.choice(string.ascii_lowercase))
+        elif operation == 'delete':
+            del chars[min(position, len(chars) - 1)]
+        elif operation == 'replace':
+            chars[min(position, len(chars) - 1)] = rng.choice(string.ascii_lowercase)
+        elif len(chars) > 1:
+            position = min(position, len(chars) - 2)
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+    return ''.join(chars)
+
+
+def make_pairs(count, seed):
+    """Reference answers of one to six words with 0-4 typos and random capitalization."""
+    rng = random.Random(seed)
+    references = [' '.join(rng.choices(WORDS, k=rng.randint(1, 6))) for _ in range(max(count // 10, 1))]
+    pairs = []
+    for _ in range(count):
+        reference = rng.choice(references)
+        answer = misspell(reference, rng, rng.randint(0, 4))
+        if rng.random() < 0.3:
+            answer = answer.capitalize()
+        pairs.append((reference, answer))
+    return pairs
+
+
+class Command(BaseCommand):
+    help = "Compare the per-pair cost of the answer matching engine against fuzzywuzzy."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pairs', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        pairs = make_pairs(options['pairs'], options['seed'])
+        cutoff = match_threshold()
+
+        normalize.cache_clear()
+        _reference.cache_clear()
+        results = {
+            'fuzzywuzzy': summarize(time_each(lambda pair: fuzz.ratio(*pair), pairs)),
+            'engine_cold': summarize(time_each(lambda pair: ratio(*pair, cutoff), pairs)),
+            'engine_warm': summarize(time_each(lambda pair: ratio(*pair, cutoff), pairs)),
+            'engine_batch': summarize(time_each(verify_answers, [pairs])),
+        }
+        results['engine_batch']['per_pair'] = results['engine_batch']['total'] / len(pairs)
+
+        agree = sum((fuzz.ratio(*pair) >= cutoff) == (ratio(*pair, cutoff) >= cutoff) for pair in pairs)
+        agree_normalized = sum(
+            (fuzz.ratio(normalize(reference), normalize(answer)) >= cutoff) == (ratio(reference, answer, cutoff) >= cutoff)
+            for reference, answer in pairs
+        )
+        results['agreement'] = {'raw': agree / len(pairs), 'normalized': agree_normalized / len(pairs)}
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        for label in ('fuzzywuzzy', 'engine_cold', 'engine_warm'):
+            self.stdout.write(format_stats(label, results[label], unit='us'))
+        self.stdout.write(f"engine_batch: {results['engine_batch']['per_pair'] * 1e6:.2f}us per pair")
+        self.stdout.write(
+            f"match decisions agreeing with fuzzywuzzy: {results['agreement']['raw']:.1%} raw, "
+            f"{results['agreement']['normalized']:.1%} on normalized input"
+        )
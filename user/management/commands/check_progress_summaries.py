@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from user.summary import check_progress_summaries, rebuild_progress_summaries
+
+
+class Command(BaseCommand):
+    help = "Compare materialized progress summaries with the Progress table, optionally rebuilding the ones that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help="Only check these users (default: everyone).")
+        parser.add_argument('--rebuild', action='store_true', help="Rewrite every mismatched summary from source.")
+
+    def handle(self, *args, **options):
+        mismatches = check_progress_summaries(options['user_ids'] or None)
+
+        for expected, stored in mismatches:
+            found = stored.as_dict() if stored else "missing"
+            self.stdout.write(f"User {expected.user_id}: expected {expected.as_dict()}, found {found}")
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("All progress summaries are consistent"))
+        elif options['rebuild']:
+            count = rebuild_progress_summaries(expected for expected, _ in mismatches)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} progress summaries"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(mismatches)} progress summaries are inconsistent; rerun with --rebuild to fix them"))
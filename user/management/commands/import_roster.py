@@ -0,0 +1,49 @@
+import json
+import sys
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user.roster import import_roster
+
+
+class Command(BaseCommand):
+    help = "Create users and profiles from a CSV or JSON Lines roster ('-' reads standard input)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None, help="Default: guessed from the first line.")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--workers', type=int, default=None, help="Password hashing processes (default: ROSTER_HASH_WORKERS or CPU count).")
+        parser.add_argument('--dry-run', action='store_true', help="Validate and check uniqueness without creating anyone.")
+        parser.add_argument('--errors', default=None, help="Write per-row errors to this JSON file instead of the console.")
+
+    def handle(self, *args, **options):
+        def report(processed, created, failed):
+            self.stdout.write(f"{processed} rows processed, {created} users created, {failed} failed")
+
+        try:
+            # Standard input is read but left open for whoever owns it.
+            stream = nullcontext(sys.stdin) if options['path'] == '-' else open(options['path'], encoding='utf-8-sig', newline='')
+        except OSError as e:
+            raise CommandError(str(e))
+        with stream as stream:
+            summary = import_roster(
+                stream,
+                options['format'],
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                dry_run=options['dry_run'],
+                on_progress=report,
+            )
+
+        if options['errors']:
+            with open(options['errors'], 'w') as f:
+                json.dump(summary['errors'], f, indent=2)
+        else:
+            for error in summary['errors']:
+                self.stderr.write(f"line {error['line']} ({error['username'] or '?'}): {json.dumps(error['errors'])}")
+
+        style = self.style.SUCCESS if not summary['failed'] else self.style.WARNING
+        action = "would be created" if options['dry_run'] else "created"
+        self.stdout.write(style(f"{summary['processed']} rows: {summary['processed'] - summary['failed']} {action}, {summary['failed']} failed"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from user.features import rebuild_user_features
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-user recommendation features from the Progress table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help="Only rebuild these users (default: everyone).")
+
+    def handle(self, *args, **options):
+        count = rebuild_user_features(options['user_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt features for {count} users"))
@@ -0,0 +1,366 @@
+import itertools
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from user.bench import compare_results, format_stats, summarize
+from user.models import Exercise, Profile, Progress, TextContent
+from user.serializers import CustomTokenObtainPairSerializer
+
+HOST = 'localhost'
+BENCH_PASSWORD = 'Bench-passw0rd!'
+BULK_ITEMS = 10
+
+# Batch endpoint -> the single-item endpoint its per-item cost is compared with.
+PER_ITEM_BASELINES = {'bulk-progress': 'update-progress'}
+
+
+# URL name -> function of the benchmark context returning the request to send:
+# {'method', 'kwargs' (URL kwargs), 'query', 'body', 'auth' (default True), 'write',
+# 'items' (records per request, for the per-item cost; default 1)}.
+# Writes only touch the benchmark user's rows (or create users with its prefix).
+def _list(query=None):
+    return lambda ctx: {'query': {'page_size': 20, **(query or {})}}
+
+
+SCENARIOS = {
+    'profile_detail': lambda ctx: {},
+    'current_user': lambda ctx: {},
+    'register_user': lambda ctx: {
+        'method': 'POST', 'auth': False, 'write': True,
+        'body': {
+            'username': f"{ctx['prefix']}reg{next(ctx['counter'])}", 'email': f"{ctx['prefix']}{next(ctx['counter'])}@example.com",
+            'password': BENCH_PASSWORD, 'first_name': 'Bench', 'last_name': 'User',
+        },
+    },
+    'token_obtain_pair': lambda ctx: {
+        'method': 'POST', 'auth': False, 'body': {'username': ctx['username'], 'password': BENCH_PASSWORD},
+    },
+    'token_refresh': lambda ctx: {'method': 'POST', 'auth': False, 'body': {'refresh': ctx['refresh']}},
+    'text-content-list-create': _list(),
+    'text-content-for-me': _list(),
+    'text-content-search': lambda ctx: {'query': {'q': ctx['search_term'], 'page_size': 20}},
+    'text-content-detail': lambda ctx: {'kwargs': {'pk': ctx['text_id']}},
+    'text-content-segment': lambda ctx: {'kwargs': {'pk': ctx['text_id'], 'index': 0}},
+    'exercise-list-create': _list(),
+    'exercise-detail': lambda ctx: {'kwargs': {'pk': ctx['exercise_ids'][0]}},
+    'retrieve-progress': lambda ctx: {},
+    'progress-detail': lambda ctx: {'kwargs': {'pk': ctx['progress_id']}},
+    'update-progress': lambda ctx: {
+        'method': 'PUT', 'write': True, 'body': {'exercise': ctx['exercise_ids'][0], 'time_spent': 5, 'status': 'in_progress'},
+    },
+    'bulk-progress': lambda ctx: {
+        'method': 'POST', 'write': True, 'items': len(ctx['exercise_ids'][:BULK_ITEMS]),
+        'body': {'items': [{'exercise': pk, 'time_spent': 5} for pk in ctx['exercise_ids'][:BULK_ITEMS]]},
+    },
+    'progress-report': lambda ctx: {},
+    'progress-history': lambda ctx: {},
+    'progress-summary': lambda ctx: {},
+    'next-exercise': lambda ctx: {},
+    'retrieve-progress-async': lambda ctx: {},
+    'update-progress-async': lambda ctx: {
+        'method': 'PUT', 'write': True, 'body': {'exercise': ctx['exercise_ids'][0], 'time_spent': 5},
+    },
+    'progress-summary-async': lambda ctx: {},
+    'next-exercise-async': lambda ctx: {},
+    'verify-answer': lambda ctx: {'method': 'POST', 'body': {'actual_answer': 'butterfly', 'user_answer': 'buterfly'}},
+    'verify-answers': lambda ctx: {
+        'method': 'POST', 'body': {'exercise_id': ctx['exercise_ids'][0], 'answers': ['cat', 'dog', 'sun']},
+    },
+    'suggested-exercise': lambda ctx: {},
+}
+
+# URL name -> why it is not benchmarked
+SKIPPED = {
+    'roster-import': "multipart upload that creates users; benchmark with import_roster instead",
+    'speech-to-text': "calls the external speech service",
+    'speech-to-text-stream': "calls the external speech service",
+    'speech-to-text-async': "calls the external speech service",
+}
+
+
+def query_count(header):
+    return int(header) if header is not None else None
+
+
+def url_names(resolver=None, namespace=None):
+    """Names of every named URL pattern in the project URLconf, outside the admin."""
+    resolver = resolver or get_resolver()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name != 'admin':
+                yield from url_names(pattern, pattern.namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield f'{namespace}:{pattern.name}' if namespace else pattern.name
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test every endpoint in the URLconf through the Django test client (in process) or "
+        "against a running server, and report throughput, p50/p95/p99 latency and queries per "
+        "request as JSON that later runs can be compared against. Seed data first with "
+        "seed_synthetic_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument('--concurrency', type=int, default=10, help="Requests in flight (client threads).")
+        parser.add_argument(
+            '--url', help="Base URL of a running server (e.g. http://localhost:8000) to load instead of the test client. "
+                          "It must use the same database as this command, and QUERY_DIAGNOSTICS for query counts.",
+        )
+        parser.add_argument('--only', help="Comma-separated URL names to run (default: all).")
+        parser.add_argument('--read-only', action='store_true', help="Skip endpoints that write.")
+        parser.add_argument(
+            '--allow-writes', action='store_true',
+            help="Confirm the configured database is a benchmark copy. Required: every run creates a temporary "
+                 "user with progress rows (and, without --read-only, whatever the write endpoints create), "
+                 "deleted again afterwards.",
+        )
+        parser.add_argument('--output', help="Write the JSON report to this file.")
+        parser.add_argument('--baseline', help="Compare against this earlier JSON report.")
+        parser.add_argument(
+            '--tolerance', type=float, default=10.0,
+            help="Percent a latency or throughput may worsen against the baseline before it is reported (default 10).",
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true', help="Exit with an error when the baseline comparison finds a regression.",
+        )
+        parser.add_argument('--json', action='store_true', help="Print the JSON report instead of a table.")
+
+    def handle(self, *args, **options):
+        if not options['allow_writes']:
+            raise CommandError(
+                f"run_benchmarks writes to the {connection.settings_dict['NAME']!r} database; point the settings "
+                "at a seeded benchmark database and pass --allow-writes."
+            )
+        names = list(dict.fromkeys(url_names()))
+        if options['only']:
+            selected = [name.strip() for name in options['only'].split(',') if name.strip()]
+            unknown = sorted(set(selected) - set(names))
+            if unknown:
+                raise CommandError(f"Unknown URL name: {', '.join(unknown)}")
+            names = selected
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        skipped = {name: SKIPPED.get(name, "no benchmark scenario") for name in names if name not in SCENARIOS}
+        prefix = f'bench-{uuid.uuid4().hex[:8]}-'
+        results = {}
+        diagnostics = override_settings(QUERY_DIAGNOSTICS=True)  # X-Query-Count for the test client
+        diagnostics.enable()
+        try:
+            ctx = self.setup(prefix)
+            if options['url']:
+                send = self.server_sender(options['url'].rstrip('/'))
+            else:
+                send = self.client_sender()
+            for name in names:
+                if name in skipped:
+                    continue
+                if options['read_only'] and SCENARIOS[name](ctx).get('write'):
+                    skipped[name] = "writes (--read-only)"
+                    continue
+                results[name] = self.run(name, ctx, send, options['requests'], options['concurrency'])
+                if not options['json']:
+                    result = results[name]
+                    queries = 'n/a' if result['queries'] is None else f"{result['queries']:.1f}"
+                    self.stdout.write(f"{format_stats(name, result)} {queries} queries/request, {result['errors']} errors")
+        finally:
+            diagnostics.disable()
+            self.cleanup(prefix)
+        per_item = self.per_item(results)
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'driver': 'server' if options['url'] else 'client',
+                'url': options['url'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'database': connection.vendor,
+                'rows': {
+                    'users': User.objects.count(),
+                    'exercises': Exercise.objects.count(),
+                    'texts': TextContent.objects.count(),
+                    'progress': Progress.objects.count(),
+                },
+            },
+            'results': results,
+            'per_item': per_item,
+            'skipped': skipped,
+        }
+
+        regressions = []
+        if baseline is not None:
+            regressions = compare_results(results, baseline.get('results', {}), options['tolerance'] / 100)
+            report['regressions'] = [
+                {'endpoint': label, 'metric': metric, 'baseline': old, 'current': new, 'change': change}
+                for label, metric, old, new, change in regressions
+            ]
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            for name, cost in per_item.items():
+                self.stdout.write(
+                    f"{name}: {cost['mean'] * 1e3:.2f}ms per item against {cost['baseline']}'s "
+                    f"{cost['baseline_mean'] * 1e3:.2f}ms ({cost['speedup']:.1f}x cheaper)"
+                )
+            for name, reason in skipped.items():
+                self.stdout.write(f"{name}: skipped ({reason})")
+            if baseline is not None:
+                for label, metric, old, new, change in regressions:
+                    self.stdout.write(self.style.WARNING(
+                        f"{label}: {metric} regressed from {old:.4g} to {new:.4g} ({change:+.0%})"
+                    ))
+                if not regressions:
+                    self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"{len(regressions)} regressions against {options['baseline']}")
+
+    def per_item(self, results):
+        """Mean latency per record of each batch endpoint, next to its single-item counterpart's."""
+        costs = {}
+        for name, single in PER_ITEM_BASELINES.items():
+            if name not in results or single not in results:
+                continue
+            mean = results[name]['mean'] / results[name]['items']
+            costs[name] = {
+                'items': results[name]['items'],
+                'mean': mean,
+                'baseline': single,
+                'baseline_mean': results[single]['mean'],
+                'speedup': results[single]['mean'] / mean if mean else 0.0,
+            }
+        return costs
+
+    def setup(self, prefix):
+        username = f'{prefix}user'
+        user = User.objects.create_user(username, f'{username}@example.com', BENCH_PASSWORD)
+        Profile.objects.filter(user=user).update(reading_level='3')
+
+        exercise_ids = list(Exercise.objects.order_by('id').values_list('id', flat=True)[:20])
+        if not exercise_ids:
+            exercise_ids = [exercise.pk for exercise in Exercise.objects.bulk_create([
+                Exercise(
+                    title=f'{prefix}{level}-{n}', description='Benchmark exercise', exercise_content=[],
+                    difficulty_level=level,
+                )
+                for level in (1, 2, 3) for n in range(5)
+            ])]
+        for n, exercise_id in enumerate(exercise_ids):
+            progress = Progress.objects.create(
+                user=user, exercise_id=exercise_id, status='completed' if n % 2 else 'in_progress',
+                score=50 + n * 2, time_spent=timedelta(seconds=30 + n),
+            )
+
+        text = TextContent.objects.order_by('id').first()
+        if text is None:
+            text = TextContent.objects.create(
+                title=f'{prefix}text', body='The cat sat on the mat. ' * 50, difficulty_level=1, topic='animals',
+            )
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
+        return {
+            'prefix': prefix,
+            'counter': itertools.count(),
+            'username': username,
+            'token': str(refresh.access_token),
+            'refresh': str(refresh),
+            'exercise_ids': exercise_ids,
+            'progress_id': progress.pk,
+            'text_id': text.pk,
+            'search_term': max(text.body.split()[:20] or ['the'], key=len).strip('.,!?;:"\''),
+        }
+
+    def cleanup(self, prefix):
+        User.objects.filter(username__startswith=prefix).delete()
+        Exercise.objects.filter(title__startswith=prefix).delete()
+        TextContent.objects.filter(title__startswith=prefix).delete()
+
+    def run(self, name, ctx, send, count, concurrency):
+        def call(_):
+            request = {'method': 'GET', 'kwargs': {}, 'query': {}, 'body': None, 'auth': True, **SCENARIOS[name](ctx)}
+            path = reverse(name, kwargs=request['kwargs'])
+            if request['query']:
+                path = f"{path}?{urlencode(request['query'])}"
+            token = ctx['token'] if request['auth'] else None
+            start = time.perf_counter()
+            status, query_count = send(request['method'], path, request['body'], token)
+            return time.perf_counter() - start, status, query_count
+
+        items = SCENARIOS[name](ctx).get('items', 1)
+        call(None)  # warm caches and connections
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(call, range(count)))
+        elapsed = time.perf_counter() - started
+
+        durations = [duration for duration, _, _ in outcomes]
+        query_counts = [query_count for _, _, query_count in outcomes]
+        statuses = {}
+        for _, status, _ in outcomes:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            **summarize(durations),
+            'per_second': len(durations) / elapsed,  # concurrent, so not count / summed durations
+            # None when the server does not send X-Query-Count (QUERY_DIAGNOSTICS off)
+            'queries': None if None in query_counts else sum(query_counts) / len(query_counts),
+            'items': items,
+            'errors': sum(status >= 400 for _, status, _ in outcomes),
+            'statuses': statuses,
+        }
+
+    def client_sender(self):
+        local = threading.local()
+
+        def send(method, path, body, token):
+            if not hasattr(local, 'client'):
+                local.client = Client(HTTP_HOST=HOST, raise_request_exception=False)
+            headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+            data = json.dumps(body) if body is not None else None
+            response = local.client.generic(method, path, data or '', content_type='application/json', **headers)
+            return response.status_code, query_count(response.get('X-Query-Count'))
+
+        return send
+
+    def server_sender(self, base_url):
+        def send(method, path, body, token):
+            headers = {'Content-Type': 'application/json'}
+            if token:
+                headers['Authorization'] = f'Bearer {token}'
+            data = json.dumps(body).encode() if body is not None else None
+            request = urllib.request.Request(base_url + path, data=data, headers=headers, method=method)
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                    return response.status, query_count(response.headers.get('X-Query-Count'))
+            except urllib.error.HTTPError as e:
+                e.read()
+                return e.code, query_count(e.headers.get('X-Query-Count'))
+
+        return send
@@ -0,0 +1,213 @@
+import math
+import random
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from user.answer_keys import compile_answers
+from user.features import rebuild_user_features
+from user.models import AnswerKey, Exercise, Profile, Progress, TextContent
+from user.readability import analyze_body
+from user.response_cache import invalidate_catalog_lists
+from user.sampling import invalidate_exercise_ids
+from user.summary import rebuild_progress_summaries, source_summaries, summary_enabled
+
+WORDS = {
+    1: "cat dog sun hat red run big bus map fox pen cup bed hen sit top".split(),
+    2: "apple happy little water garden rabbit yellow window basket kitten pocket summer".split(),
+    3: "elephant butterfly beautiful necessary tomorrow together adventure important knight thought".split(),
+}
+TOPICS = ('animals', 'nature', 'science', 'school', 'family', 'sports', 'space', 'food')
+LEARNING_STYLES = ('visual', 'auditory', 'kinesthetic')
+EXERCISE_TYPES = ('matching', 'comprehension', 'scramble', 'blanks')
+STATUSES = (('completed', 0.6), ('in_progress', 0.3), ('not_started', 0.1))
+PASSWORD = 'Synthetic-passw0rd!'
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed reproducible synthetic users, profiles, exercises, texts and progress for load testing. "
+        "Rows are bulk-inserted and the derived tables (answer keys, features, summaries) rebuilt afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--exercises', type=int, default=5000)
+        parser.add_argument('--texts', type=int, default=1000)
+        parser.add_argument(
+            '--progress-per-user', type=int, default=200,
+            help="Average Progress rows per user (the default scale makes about two million).",
+        )
+        parser.add_argument('--seed', type=int, default=1, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--prefix', default='synth-', help="Username and title prefix marking synthetic rows.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Users per progress batch.")
+        parser.add_argument('--clear', action='store_true', help="Delete earlier synthetic rows with this prefix first.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        if not self.prefix:
+            raise CommandError("--prefix must not be empty.")
+        if options['clear']:
+            self.clear(options['batch_size'])
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(f"Synthetic users with prefix {self.prefix!r} exist; pass --clear or another --prefix.")
+
+        started = time.perf_counter()
+        texts = self.seed_texts(options['texts'])
+        exercises = self.seed_exercises(options['exercises'])
+        user_ids = self.seed_users(options['users'])
+        progress = self.seed_progress(user_ids, exercises, options['progress_per_user'], options['batch_size'])
+
+        invalidate_exercise_ids()
+        invalidate_catalog_lists('exercise')
+        invalidate_catalog_lists('textcontent')
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(user_ids)} users, {len(exercises)} exercises, {texts} texts and {progress} progress rows "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
+
+    def clear(self, batch_size):
+        user_ids = list(User.objects.filter(username__startswith=self.prefix).values_list('id', flat=True))
+        for batch in batched(user_ids, batch_size):
+            User.objects.filter(id__in=batch).delete()
+        Exercise.objects.filter(title__startswith=self.prefix).delete()
+        TextContent.objects.filter(title__startswith=self.prefix).delete()
+        self.stdout.write(f"Deleted {len(user_ids)} synthetic users and their data")
+
+    def sentence(self, level, words=None):
+        words = words or self.rng.randint(4, 6 + 3 * level)
+        vocabulary = [word for lower in range(1, level + 1) for word in WORDS[lower]]
+        text = ' '.join(self.rng.choice(vocabulary) for _ in range(words))
+        return text[0].upper() + text[1:] + self.rng.choice('..!?')
+
+    def seed_texts(self, count):
+        texts = []
+        for n in range(count):
+            level = self.rng.choice((1, 1, 2, 2, 3))
+            body = ' '.join(self.sentence(level) for _ in range(self.rng.randint(3, 12) * level * level))
+            text = TextContent(
+                title=f'{self.prefix}{self.rng.choice(TOPICS)} story {n}', topic=self.rng.choice(TOPICS),
+                difficulty_level=level, body=body,
+            )
+            # bulk_create skips save(), which derives these.
+            for field, value in analyze_body(body).items():
+                setattr(text, field, value)
+            texts.append(text)
+        TextContent.objects.bulk_create(texts, batch_size=500)
+        return len(texts)
+
+    def exercise_content(self, exercise_type, level):
+        vocabulary = WORDS[level]
+        items = []
+        for _ in range(self.rng.randint(3, 8)):
+            word = self.rng.choice(vocabulary)
+            options = self.rng.sample(vocabulary, min(3, len(vocabulary)))
+            options = [word] + [option for option in options if option != word][:2]
+            self.rng.shuffle(options)
+            if exercise_type == 'matching':
+                items.append({'word': word, 'image': f'{word}.png', 'options': options})
+            elif exercise_type == 'comprehension':
+                items.append({'question': f'Which word did you read? ({word[0]}...)', 'answer': word, 'options': options})
+            elif exercise_type == 'scramble':
+                sentence = self.sentence(level, self.rng.randint(3, 6)).rstrip('.!?').lower()
+                words = sentence.split()
+                self.rng.shuffle(words)
+                items.append({'sentence': sentence, 'words': words})
+            else:
+                items.append({'text': f'The ___ is here. ({len(word)} letters)', 'answer': word})
+        if exercise_type == 'comprehension':
+            return {'passage': ' '.join(self.sentence(level) for _ in range(4)), 'questions': items}
+        return items
+
+    def seed_exercises(self, count):
+        exercises = []
+        for n in range(count):
+            exercise_type = self.rng.choice(EXERCISE_TYPES)
+            level = self.rng.choice((1, 1, 2, 2, 3))
+            exercises.append(Exercise(
+                title=f'{self.prefix}{exercise_type} {n}', description=f'Synthetic {exercise_type} exercise',
+                exercise_type=exercise_type, difficulty_level=level,
+                learning_style=self.rng.choice(LEARNING_STYLES),
+                exercise_content=self.exercise_content(exercise_type, level),
+            ))
+        with transaction.atomic():
+            Exercise.objects.bulk_create(exercises, batch_size=500)
+            AnswerKey.objects.bulk_create(
+                (
+                    AnswerKey(
+                        exercise_id=exercise.pk, exercise_type=exercise.exercise_type,
+                        answers=compile_answers(exercise.exercise_type, exercise.exercise_content),
+                    )
+                    for exercise in exercises
+                ),
+                batch_size=500,
+            )
+        return [(exercise.pk, exercise.difficulty_level) for exercise in exercises]
+
+    def seed_users(self, count):
+        password = make_password(PASSWORD)  # hashed once; every synthetic user shares it
+        width = len(str(count))
+        users = [
+            User(
+                username=f'{self.prefix}{n:0{width}d}', email=f'{self.prefix}{n}@example.com', password=password,
+                first_name='Synthetic', last_name=str(n),
+            )
+            for n in range(count)
+        ]
+        reading_levels = [*settings.READING_LEVEL_GRADES, '1', '2', '3', '4', None]
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=1000)
+            Profile.objects.bulk_create(
+                (
+                    Profile(
+                        user_id=user.pk, reading_level=self.rng.choice(reading_levels),
+                        preferred_font_size=self.rng.choice((14, 16, 18, 20, 24)),
+                        background_color=self.rng.choice(('#FFFFFF', '#FDF6E3', '#FFFBCC', '#E8F4FF')),
+                        learning_style=self.rng.choice(LEARNING_STYLES),
+                    )
+                    for user in users
+                ),
+                batch_size=1000,
+            )
+        return [user.pk for user in users]
+
+    def seed_progress(self, user_ids, exercises, per_user, batch_size):
+        if not exercises or per_user <= 0:
+            return 0
+        statuses, weights = zip(*STATUSES)
+        total = 0
+        for batch in batched(user_ids, batch_size):
+            rows = []
+            for user_id in batch:
+                ability = self.rng.gauss(70, 12)
+                count = min(len(exercises), max(0, round(self.rng.expovariate(1 / per_user))))
+                for exercise_id, level in self.rng.sample(exercises, count):
+                    status = self.rng.choices(statuses, weights)[0]
+                    score = 0.0 if status == 'not_started' else min(max(self.rng.gauss(ability - 8 * level, 15), 0.0), 100.0)
+                    seconds = 0 if status == 'not_started' else int(math.exp(self.rng.gauss(4.5, 0.6)))
+                    rows.append(Progress(
+                        user_id=user_id, exercise_id=exercise_id, status=status, score=round(score, 1),
+                        time_spent=timedelta(seconds=seconds),
+                    ))
+            with transaction.atomic():
+                Progress.objects.bulk_create(rows, batch_size=5000)
+                # bulk_create skips the signals that keep these current.
+                rebuild_user_features(batch)
+                if summary_enabled():
+                    rebuild_progress_summaries(source_summaries(batch), user_ids=batch)
+            total += len(rows)
+            self.stdout.write(f"  {total} progress rows")
+        return total
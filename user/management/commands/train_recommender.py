@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from user.recommender import extract_training_data, registry, train_model
+
+
+class Command(BaseCommand):
+    help = "Train the exercise recommender and save it as a new versioned artifact."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-activate', action='store_true', help="Save the artifact without making it the active version.")
+        parser.add_argument('--keep', type=int, default=None, help="Delete all but the newest N inactive artifacts.")
+        parser.add_argument('--chunk-size', type=int, default=None, help="Rows fetched per database round trip.")
+        parser.add_argument('--out-dir', default=None, help="Keep the extracted training arrays in .npy files in this directory instead of RAM.")
+
+    def handle(self, *args, **options):
+        X, y = extract_training_data(chunk_size=options['chunk_size'], out_dir=options['out_dir'])
+        if len(X) < 2:
+            raise CommandError("Not enough progress data to train the recommender.")
+
+        model, metrics = train_model(X, y)
+        self.stdout.write(f"Accuracy: {metrics['accuracy']}")
+        self.stdout.write(metrics['report'])
+        version = registry.save(model, activate=not options['no_activate'], n_samples=len(X), accuracy=metrics['accuracy'])
+        self.stdout.write(self.style.SUCCESS(f"Saved recommender version {version} to {registry.directory}"))
+
+        if options['keep'] is not None:
+            for removed in registry.prune(options['keep']):
+                self.stdout.write(f"Removed recommender version {removed}")
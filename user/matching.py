@@ -0,0 +1,89 @@
+import unicodedata
+from functools import lru_cache
+
+from django.conf import settings
+
+
+def match_threshold():
+    return getattr(settings, 'ANSWER_MATCH_THRESHOLD', 80)
+
+
+@lru_cache(maxsize=4096)
+def normalize(text):
+    """NFKC-fold, casefold and collapse whitespace so "Café ", "CAFÉ" and "café" compare equal."""
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+
+@lru_cache(maxsize=4096)
+def _reference(text):
+    """The normalized reference answer with its per-character bit masks, built once per distinct answer."""
+    text = normalize(text)
+    masks = {}
+    for position, char in enumerate(text):
+        masks[char] = masks.get(char, 0) | 1 << position
+    return text, masks
+
+
+def _lcs_length(reference, masks, answer, minimum=0):
+    """
+    Longest common subsequence of ``reference`` and ``answer``, bit-parallel over
+    the reference (one big-int step per answer character).
+
+    Returns ``None`` as soon as the LCS can no longer reach ``minimum``.
+    """
+    length = len(reference)
+    full = (1 << length) - 1
+    row = full  # zero bits mark reference positions already matched
+    remaining = len(answer)
+    for char in answer:
+        matches = row & masks.get(char, 0)
+        row = ((row + matches) | (row - matches)) & full
+        remaining -= 1
+        if length - row.bit_count() + remaining < minimum:
+            return None
+    return length - row.bit_count()
+
+
+def _score(total, lcs):
+    # Indel similarity, as fuzz.ratio with python-Levenshtein computes it.
+    return round(100 * 2 * lcs / total)
+
+
+def ratio(reference, answer, cutoff=0):
+    """
+    Similarity of two answers from 0 to 100 after normalization.
+
+    The score is ``100 * (1 - indel_distance / (len(a) + len(b)))``. With a
+    ``cutoff`` the comparison stops as soon as the score cannot reach it, and
+    anything below the cutoff scores 0.
+    """
+    reference, masks = _reference(reference)
+    answer = normalize(answer)
+    total = len(reference) + len(answer)
+    if not total:
+        return 100
+
+    # Smallest LCS whose rounded score still reaches the cutoff.
+    minimum = max(int((cutoff - 0.5) * total / 200), 0)
+    if min(len(reference), len(answer)) < minimum:
+        return 0
+    lcs = _lcs_length(reference, masks, answer, minimum)
+    if lcs is None:
+        return 0
+    score = _score(total, lcs)
+    return score if score >= cutoff else 0
+
+
+def verify_answers(pairs, cutoff=None):
+    """
+    Score ``(actual_answer, user_answer)`` pairs against the match threshold.
+
+    Returns one ``{'match_score', 'match'}`` dict per pair. ``match_score`` is the
+    full similarity, below the threshold too, so it is computed without a cutoff.
+    """
+    cutoff = match_threshold() if cutoff is None else cutoff
+    results = []
+    for actual, answer in pairs:
+        score = ratio(actual, answer)
+        results.append({'match_score': score, 'match': score >= cutoff})
+    return results
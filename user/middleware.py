@@ -0,0 +1,138 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# The recorder of the async request being served. Async requests run their queries on
+# worker threads with their own connections, which a per-connection execute_wrapper
+# installed on the event loop thread would miss; context variables follow the request there.
+_async_recorder = ContextVar('query_recorder', default=None)
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+def query_budget(max_queries):
+    """Declare the most queries a view may run per request. Works on view functions and view classes."""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def get_query_budget(view_func):
+    for view in (view_func, getattr(view_func, 'view_class', None), getattr(view_func, 'cls', None)):
+        budget = getattr(view, 'query_budget', None)
+        if budget is not None:
+            return budget
+    return getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+
+
+def fingerprint(sql):
+    """Reduce a statement to its shape so repeats with different parameters compare equal."""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING.sub('?', sql)
+    return _NUMBER.sub('?', sql)
+
+
+class QueryRecorder:
+    def __init__(self, statements=True):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = statements  # fingerprint every statement, for duplicates()
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            if self.statements:
+                self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+
+def _record_async_request(execute, sql, params, many, context):
+    recorder = _async_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_async_recorder(sender, connection, **kwargs):
+    if _record_async_request not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_async_request)
+
+
+class QueryBudgetMiddleware:
+    """
+    Records the query count and total SQL time of every request and logs a warning
+    when a view exceeds the budget it declared with ``query_budget``. With
+    QUERY_DIAGNOSTICS on it also exposes them as ``X-Query-*`` response headers and
+    logs repeated statement shapes. Works under WSGI and ASGI; under ASGI it stays
+    async so async views run without a thread hop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = self.start(request)
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = _async_recorder.set(self.start(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _async_recorder.reset(token)
+        return self.finish(request, response)
+
+    def start(self, request):
+        request.query_recorder = QueryRecorder(statements=settings.QUERY_DIAGNOSTICS)
+        return request.query_recorder
+
+    def finish(self, request, response):
+        recorder = request.query_recorder
+        duplicates = recorder.duplicates()
+        if recorder.statements:
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time-Ms'] = f'{recorder.duration * 1000:.1f}'
+            response['X-Query-Duplicates'] = str(sum(count - 1 for count in duplicates.values()))
+
+        # Read from the resolved view here rather than in process_view, which Django
+        # would run on a worker thread for async requests.
+        match = getattr(request, 'resolver_match', None)
+        budget = get_query_budget(match.func) if match is not None else None
+        if budget is not None and recorder.count > budget:
+            logger.warning(
+                "%s %s ran %d queries (budget %d, %.1f ms SQL)",
+                request.method, request.path, recorder.count, budget, recorder.duration * 1000,
+            )
+        for sql, count in duplicates.items():
+            logger.info("%s %s repeated %d times: %s", request.method, request.path, count, sql)
+        return response
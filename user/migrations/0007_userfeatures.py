@@ -0,0 +1,44 @@
+# Generated by Django 5.1 on 2026-10-17 11:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_user_features(apps, schema_editor):
+    Progress = apps.get_model('user', 'Progress')
+    UserFeatures = apps.get_model('user', 'UserFeatures')
+
+    features = {}
+    rows = Progress.objects.order_by('user_id').values_list('user_id', 'score', 'time_spent')
+    for user_id, score, time_spent in rows.iterator(chunk_size=2000):
+        entry = features.get(user_id)
+        if entry is None:
+            entry = features[user_id] = UserFeatures(user_id=user_id)
+        entry.progress_count += 1
+        entry.score_sum += score or 0.0
+        entry.time_spent_seconds_sum += time_spent.total_seconds() if time_spent is not None else 0.0
+
+    UserFeatures.objects.bulk_create(features.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user', '0006_exercise_learning_style'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFeatures',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='features', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('progress_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0.0)),
+                ('time_spent_seconds_sum', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_user_features, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1 on 2026-10-17 11:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0007_userfeatures'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='progress',
+            index=models.Index(fields=['user', 'last_updated', 'id'], name='progress_user_updated_idx'),
+        ),
+    ]
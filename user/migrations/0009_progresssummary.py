@@ -0,0 +1,57 @@
+# Generated by Django 5.1 on 2026-10-17 11:22
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_progress_summaries(apps, schema_editor):
+    Progress = apps.get_model('user', 'Progress')
+    ProgressSummary = apps.get_model('user', 'ProgressSummary')
+
+    rows = Progress.objects.values('user_id').annotate(
+        total_exercises=models.Count('id'),
+        completed_exercises=models.Count('id', filter=models.Q(status='completed')),
+        score_sum=models.Sum('score'),
+        time_spent_sum=models.Sum('time_spent'),
+        time_spent_count=models.Count('time_spent'),
+    ).order_by('user_id')
+    ProgressSummary.objects.bulk_create(
+        (
+            ProgressSummary(
+                user_id=row['user_id'],
+                total_exercises=row['total_exercises'],
+                completed_exercises=row['completed_exercises'],
+                score_sum=row['score_sum'] or 0.0,
+                time_spent_sum=row['time_spent_sum'] or datetime.timedelta(0),
+                time_spent_count=row['time_spent_count'],
+            )
+            for row in rows.iterator(chunk_size=2000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user', '0008_progress_recent_scores_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progress_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_exercises', models.PositiveIntegerField(default=0)),
+                ('completed_exercises', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0.0)),
+                ('time_spent_sum', models.DurationField(default=datetime.timedelta(0))),
+                ('time_spent_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_progress_summaries, migrations.RunPython.noop),
+    ]
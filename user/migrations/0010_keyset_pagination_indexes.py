@@ -0,0 +1,27 @@
+# Generated by Django 5.1 on 2026-10-17 11:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0009_progresssummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exercise',
+            index=models.Index(fields=['difficulty_level', 'learning_style'], name='exercise_level_style_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exercise',
+            index=models.Index(fields=['created_at', 'id'], name='exercise_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='textcontent',
+            index=models.Index(fields=['created_at', 'id'], name='textcontent_created_idx'),
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 5.1 on 2026-10-17 11:34
+
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# A frozen copy of user.answer_keys.compile_answers as of this migration, so later
+# changes to the live module do not change what this backfill writes.
+ANSWER_FIELDS = {
+    'comprehension': ('answer',),
+    'matching': ('word', 'answer'),
+    'scramble': ('sentence', 'answer', 'word'),
+    'blanks': ('answer', 'blank', 'word'),
+}
+FALLBACK_FIELDS = ('answer', 'word', 'sentence', 'text')
+
+
+def normalize(text):
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+
+def ratio(a, b):
+    """Indel similarity from 0 to 100, via a plain longest-common-subsequence table."""
+    if not a and not b:
+        return 100
+    previous = [0] * (len(b) + 1)
+    for char in a:
+        current = [0]
+        for position, other in enumerate(b):
+            current.append(previous[position] + 1 if char == other else max(previous[position + 1], current[position]))
+        previous = current
+    return round(100 * 2 * previous[-1] / (len(a) + len(b)))
+
+
+def items(content):
+    if isinstance(content, list):
+        return content
+    if isinstance(content, dict):
+        for value in content.values():
+            if isinstance(value, list):
+                return value
+        return [content]
+    return []
+
+
+def expected_answer(item, fields):
+    if isinstance(item, str):
+        return item
+    if not isinstance(item, dict):
+        return None
+    for field in fields + FALLBACK_FIELDS:
+        value = item.get(field)
+        if isinstance(value, list) and value and all(isinstance(part, str) for part in value):
+            return ' '.join(value)
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            return str(value)
+    return None
+
+
+def option_texts(item):
+    options = item.get('options') if isinstance(item, dict) else None
+    texts = []
+    for option in options or ():
+        text = option.get('text') if isinstance(option, dict) else option
+        if isinstance(text, str):
+            texts.append(normalize(text))
+    return texts
+
+
+def compile_answers(exercise_type, content):
+    fields = ANSWER_FIELDS.get(exercise_type, ())
+    entries = []
+    for item in items(content):
+        answer = expected_answer(item, fields)
+        if answer is None:
+            entries.append(None)
+            continue
+        answer = normalize(answer)
+        entry = {'answer': answer, 'tokens': answer.split()}
+        options = option_texts(item)
+        if options:
+            entry['options'] = options
+            entry['correct_option'] = max(options, key=lambda option: ratio(answer, option))
+        entries.append(entry)
+    return entries
+
+
+def backfill_answer_keys(apps, schema_editor):
+    Exercise = apps.get_model('user', 'Exercise')
+    AnswerKey = apps.get_model('user', 'AnswerKey')
+    AnswerKey.objects.bulk_create(
+        (
+            AnswerKey(
+                exercise_id=exercise.id,
+                exercise_type=exercise.exercise_type,
+                answers=compile_answers(exercise.exercise_type, exercise.exercise_content),
+            )
+            for exercise in Exercise.objects.only('id', 'exercise_type', 'exercise_content').iterator(chunk_size=500)
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0010_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerKey',
+            fields=[
+                ('exercise', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='answer_key', serialize=False, to='user.exercise')),
+                ('exercise_type', models.CharField(max_length=100)),
+                ('answers', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_answer_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations
+
+# The search index lives outside the ORM (see user/search.py). The statements are
+# copied here as of this migration; user/search.py may change without affecting it.
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE user_textcontent ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(topic, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(body, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX textcontent_search_idx ON user_textcontent USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS textcontent_search_idx",
+    "ALTER TABLE user_textcontent DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE user_textcontent_fts USING fts5(
+        title, topic, body, content='user_textcontent', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER user_textcontent_fts_insert AFTER INSERT ON user_textcontent BEGIN
+        INSERT INTO user_textcontent_fts(rowid, title, topic, body) VALUES (new.id, new.title, new.topic, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER user_textcontent_fts_delete AFTER DELETE ON user_textcontent BEGIN
+        INSERT INTO user_textcontent_fts(user_textcontent_fts, rowid, title, topic, body)
+        VALUES ('delete', old.id, old.title, old.topic, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER user_textcontent_fts_update AFTER UPDATE OF title, topic, body ON user_textcontent BEGIN
+        INSERT INTO user_textcontent_fts(user_textcontent_fts, rowid, title, topic, body)
+        VALUES ('delete', old.id, old.title, old.topic, old.body);
+        INSERT INTO user_textcontent_fts(rowid, title, topic, body) VALUES (new.id, new.title, new.topic, new.body);
+    END
+    """,
+    "INSERT INTO user_textcontent_fts(user_textcontent_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS user_textcontent_fts_update",
+    "DROP TRIGGER IF EXISTS user_textcontent_fts_delete",
+    "DROP TRIGGER IF EXISTS user_textcontent_fts_insert",
+    "DROP TABLE IF EXISTS user_textcontent_fts",
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in STATEMENTS.get(schema_editor.connection.vendor, ([], []))[0]:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in STATEMENTS.get(schema_editor.connection.vendor, ([], []))[1]:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0011_answerkey'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,145 @@
+# Generated by Django 5.1 on 2026-10-17 11:45
+
+import re
+from itertools import islice
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# A frozen copy of user.readability.analyze as of this migration.
+LONG_WORD_LETTERS = 7
+UNCOMMON_GRAPHEMES = re.compile(
+    r'ough|augh|eigh|^kn|^wr|^gn|^ps|^rh|^pn|mb$|mn$|gh|ph|ch(?=r|l)|^chr|sc(?=i|e)|tio|sio|cia|que$|^tw|wh',
+)
+READABILITY_FIELDS = (
+    'length', 'word_count', 'syllable_count', 'grade_level', 'long_word_ratio', 'uncommon_grapheme_ratio',
+)
+WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+SENTENCE_END = re.compile(r'[.!?]+(?=\s|$)')
+VOWEL_GROUP = re.compile(r'[aeiouy]+')
+
+
+def count_syllables(word):
+    word = word.lower().replace("'", '')
+    count = len(VOWEL_GROUP.findall(word))
+    if word.endswith('e') and not word.endswith(('le', 'ee', 'ye')) and count > 1:
+        count -= 1
+    return max(count, 1)
+
+
+def analyze(text):
+    words = WORD.findall(text)
+    syllables = long_words = uncommon = 0
+    for word in words:
+        lower = word.lower()
+        syllables += count_syllables(lower)
+        long_words += len(lower) >= LONG_WORD_LETTERS
+        uncommon += bool(UNCOMMON_GRAPHEMES.search(lower))
+
+    word_count = len(words)
+    per_word = max(word_count, 1)
+    sentences = max(len(SENTENCE_END.findall(text)), 1)
+    grade = 0.39 * word_count / sentences + 11.8 * syllables / per_word - 15.59 if words else 0.0
+    return {
+        'length': len(text),
+        'word_count': word_count,
+        'syllable_count': syllables,
+        'grade_level': round(max(grade, 0.0), 2),
+        'long_word_ratio': round(long_words / per_word, 4),
+        'uncommon_grapheme_ratio': round(uncommon / per_word, 4),
+    }
+
+
+# SQLite rebuilds user_textcontent for the AddFields below, which drops the search
+# index sync triggers created by 0012. A copy of them, re-created afterwards.
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS user_textcontent_fts_insert AFTER INSERT ON user_textcontent BEGIN
+        INSERT INTO user_textcontent_fts(rowid, title, topic, body) VALUES (new.id, new.title, new.topic, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_textcontent_fts_delete AFTER DELETE ON user_textcontent BEGIN
+        INSERT INTO user_textcontent_fts(user_textcontent_fts, rowid, title, topic, body)
+        VALUES ('delete', old.id, old.title, old.topic, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_textcontent_fts_update AFTER UPDATE OF title, topic, body ON user_textcontent BEGIN
+        INSERT INTO user_textcontent_fts(user_textcontent_fts, rowid, title, topic, body)
+        VALUES ('delete', old.id, old.title, old.topic, old.body);
+        INSERT INTO user_textcontent_fts(rowid, title, topic, body) VALUES (new.id, new.title, new.topic, new.body);
+    END
+    """,
+    "INSERT INTO user_textcontent_fts(user_textcontent_fts) VALUES ('rebuild')",
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in SQLITE_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+def backfill(TextContent, analyze, fields, batch_size=500):
+    now = timezone.now()
+    rows = TextContent.objects.only('id', 'body').order_by('id').iterator(chunk_size=batch_size)
+    while batch := list(islice(rows, batch_size)):
+        for row in batch:
+            values = analyze(row.body or '')
+            for field in fields:
+                setattr(row, field, values[field])
+            row.updated_at = now
+        TextContent.objects.bulk_update(batch, [*fields, 'updated_at'])
+
+
+def backfill_readability(apps, schema_editor):
+    backfill(apps.get_model('user', 'TextContent'), analyze, READABILITY_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0012_textcontent_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='textcontent',
+            name='grade_level',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='textcontent',
+            name='long_word_ratio',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='textcontent',
+            name='syllable_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='textcontent',
+            name='uncommon_grapheme_ratio',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='textcontent',
+            name='word_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='textcontent',
+            index=models.Index(fields=['grade_level', 'id'], name='textcontent_grade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='textcontent',
+            index=models.Index(fields=['word_count'], name='textcontent_word_count_idx'),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.RunPython(backfill_readability, migrations.RunPython.noop),
+    ]
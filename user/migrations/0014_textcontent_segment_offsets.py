@@ -0,0 +1,100 @@
+# Generated by Django 5.1 on 2026-10-17 12:20
+
+import re
+from itertools import islice
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# A frozen copy of user.readability.segment_offsets as of this migration.
+SEGMENT_BREAK = re.compile(r'[.!?]+["\'\u201d\u2019)\]]*\s+|\n\s*\n')
+SPACE = re.compile(r'\s+')
+
+
+def segment_offsets(text, size):
+    breaks = [match.end() for match in SEGMENT_BREAK.finditer(text)]
+    if not breaks or breaks[-1] != len(text):
+        breaks.append(len(text))
+
+    offsets, start, last = [], 0, 0
+    for end in breaks:
+        if end - start > size and last > start:
+            offsets.append([start, last])
+            start = last
+        while end - start > size:
+            cut = max((m.end() for m in SPACE.finditer(text, start + 1, start + size)), default=start + size)
+            offsets.append([start, cut])
+            start = cut
+        last = end
+    if last > start:
+        offsets.append([start, last])
+    return {'segment_offsets': offsets}
+
+
+# SQLite rebuilds user_textcontent for the AddFields below, which drops the search
+# index sync triggers created by 0012. A copy of them, re-created afterwards.
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS user_textcontent_fts_insert AFTER INSERT ON user_textcontent BEGIN
+        INSERT INTO user_textcontent_fts(rowid, title, topic, body) VALUES (new.id, new.title, new.topic, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_textcontent_fts_delete AFTER DELETE ON user_textcontent BEGIN
+        INSERT INTO user_textcontent_fts(user_textcontent_fts, rowid, title, topic, body)
+        VALUES ('delete', old.id, old.title, old.topic, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_textcontent_fts_update AFTER UPDATE OF title, topic, body ON user_textcontent BEGIN
+        INSERT INTO user_textcontent_fts(user_textcontent_fts, rowid, title, topic, body)
+        VALUES ('delete', old.id, old.title, old.topic, old.body);
+        INSERT INTO user_textcontent_fts(rowid, title, topic, body) VALUES (new.id, new.title, new.topic, new.body);
+    END
+    """,
+    "INSERT INTO user_textcontent_fts(user_textcontent_fts) VALUES ('rebuild')",
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in SQLITE_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+def backfill(TextContent, analyze, fields, batch_size=500):
+    now = timezone.now()
+    rows = TextContent.objects.only('id', 'body').order_by('id').iterator(chunk_size=batch_size)
+    while batch := list(islice(rows, batch_size)):
+        for row in batch:
+            values = analyze(row.body or '')
+            for field in fields:
+                setattr(row, field, values[field])
+            row.updated_at = now
+        TextContent.objects.bulk_update(batch, [*fields, 'updated_at'])
+
+
+def backfill_segment_offsets(apps, schema_editor):
+    size = getattr(settings, 'TEXT_SEGMENT_CHARS', 2000)
+    backfill(apps.get_model('user', 'TextContent'), lambda body: segment_offsets(body, size), ['segment_offsets'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0013_textcontent_readability'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='textcontent',
+            name='segment_offsets',
+            field=models.JSONField(default=list),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.RunPython(backfill_segment_offsets, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,36 @@
+from datetime import timedelta
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.contrib.postgres.fields import ArrayField
 
+from user.readability import BODY_FIELDS, analyze_body
+
+
+class TrackedFieldsMixin:
+    """Remembers the column values an instance was loaded with, so saves can tell what changed."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_loaded_values(self):
+        return getattr(self, '_loaded_values', None)
+
+    def get_dirty_fields(self):
+        """Names of the concrete fields changed since load or the last save; all of them for unsaved instances."""
+        loaded = self.get_loaded_values()
+        return [
+            field.attname for field in self._meta.concrete_fields
+            if loaded is None or field.attname not in loaded or loaded[field.attname] != getattr(self, field.attname)
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -12,7 +41,7 @@ class UserProfile(models.Model):
     def __str__(self) -> str:
         return self.full_name
     
-class Profile(models.Model):
+class Profile(TrackedFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     reading_level = models.CharField(max_length=100, blank=True, null=True)
     preferred_font_size = models.PositiveIntegerField(default=14)
@@ -27,7 +56,7 @@ class Profile(models.Model):
         return self.user.username
     
 
-class TextContent(models.Model):
+class TextContent(TrackedFieldsMixin, models.Model):
     title = models.CharField(max_length=100)
     body = models.TextField()
     difficulty_level = models.IntegerField(default=1, choices=[(1, 'Easy'), (2, 'Medium'), (3, 'Hard')])
@@ -35,11 +64,35 @@ class TextContent(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     length = models.IntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
+    # Derived from the body on save (see user/readability.py)
+    word_count = models.IntegerField(default=0)
+    syllable_count = models.IntegerField(default=0)
+    grade_level = models.FloatField(default=0.0)
+    long_word_ratio = models.FloatField(default=0.0)
+    uncommon_grapheme_ratio = models.FloatField(default=0.0)
+    # [start, end) character ranges of the body's TEXT_SEGMENT_CHARS-sized, sentence-aligned segments
+    segment_offsets = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='textcontent_created_idx'),
+            models.Index(fields=['grade_level', 'id'], name='textcontent_grade_idx'),
+            models.Index(fields=['word_count'], name='textcontent_word_count_idx'),
+        ]
     
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if 'body' in self.get_dirty_fields() and (update_fields is None or 'body' in update_fields):
+            for field, value in analyze_body(self.body).items():
+                setattr(self, field, value)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *BODY_FIELDS}
+        super().save(*args, **kwargs)
     
-class Exercise(models.Model):
+class Exercise(TrackedFieldsMixin, models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     exercise_content = models.JSONField()
@@ -48,11 +101,17 @@ class Exercise(models.Model):
     learning_style=models.CharField(max_length=100, choices=[('visual', 'Visual'), ('auditory', 'Auditory'), ('kinesthetic', 'Kinesthetic')], default='visual')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['difficulty_level', 'learning_style'], name='exercise_level_style_idx'),
+            models.Index(fields=['created_at', 'id'], name='exercise_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
     
-class Progress(models.Model):
+class Progress(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = [
         ('not_started', 'Not Started'),
         ('in_progress', 'In Progress'),
@@ -68,11 +127,70 @@ class Progress(models.Model):
     
     class Meta:
         unique_together = ('user', 'exercise')
+        indexes = [
+            models.Index(fields=['user', 'last_updated', 'id'], name='progress_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.exercise.title}"
 
 
+class UserFeatures(models.Model):
+    """Running per-user aggregates over Progress, maintained on every progress write."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='features')
+    progress_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0.0)
+    time_spent_seconds_sum = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def score_avg(self):
+        return self.score_sum / self.progress_count if self.progress_count else 0.0
+
+    @property
+    def time_spent_seconds_avg(self):
+        return self.time_spent_seconds_sum / self.progress_count if self.progress_count else 0.0
+
+    def __str__(self):
+        return f"Features for user {self.user_id}"
+
+
+class ProgressSummary(models.Model):
+    """Materialized ProgressSummaryView payload, maintained on every progress write."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='progress_summary')
+    total_exercises = models.PositiveIntegerField(default=0)
+    completed_exercises = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0.0)
+    time_spent_sum = models.DurationField(default=timedelta(0))
+    time_spent_count = models.PositiveIntegerField(default=0)  # rows with a non-null time_spent
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def as_dict(self):
+        return {
+            "total_exercises": self.total_exercises,
+            "completed_exercises": self.completed_exercises,
+            "average_score": self.score_sum / self.total_exercises if self.total_exercises else None,
+            "average_time_spent": self.time_spent_sum / self.time_spent_count if self.time_spent_count else None,
+        }
+
+    def __str__(self):
+        return f"Progress summary for user {self.user_id}"
+
+
+class AnswerKey(models.Model):
+    """Expected answers of an exercise, extracted and normalized from exercise_content when it is saved."""
+
+    exercise = models.OneToOneField(Exercise, on_delete=models.CASCADE, primary_key=True, related_name='answer_key')
+    exercise_type = models.CharField(max_length=100)
+    answers = models.JSONField(default=list)  # per item: {"answer", "tokens", "options"?} or null
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Answer key for exercise {self.exercise_id}"
+
+
 
 
 
@@ -0,0 +1,108 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in cursor pagination over a ``(timestamp, id)`` key, newest first.
+
+    Requests without ``?cursor=`` or ``?page_size=`` get the full, unpaginated list
+    as before. Paginated requests seek past the last row of the previous page with a
+    ``WHERE (ts, id) < (…)`` predicate instead of an OFFSET, so every page costs the
+    same however deep the client goes.
+    """
+
+    timestamp_field = None
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.page_queryset(queryset, request)
+        return None if page is None else self.set_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request):
+        """``paginate_queryset`` for async views, fetching the page with the async ORM."""
+        page = self.page_queryset(queryset, request)
+        return None if page is None else self.set_page([row async for row in page])
+
+    def page_queryset(self, queryset, request):
+        """The unevaluated page (one row extra, to tell if there is a next page), or ``None`` if not paginating."""
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(f'-{self.timestamp_field}', '-id')
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            timestamp, pk = cursor
+            queryset = queryset.filter(
+                Q(**{f'{self.timestamp_field}__lt': timestamp})
+                | Q(**{self.timestamp_field: timestamp, 'id__lt': pk})
+            )
+
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.last_row = rows[-1] if rows else None
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            timestamp, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+        return timestamp, pk
+
+    def encode_cursor(self, row):
+        key = [getattr(row, self.timestamp_field).isoformat(), row.pk]
+        return base64.urlsafe_b64encode(json.dumps(key).encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_row))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class CreatedAtKeysetPagination(KeysetPagination):
+    timestamp_field = 'created_at'
+
+
+class LastUpdatedKeysetPagination(KeysetPagination):
+    timestamp_field = 'last_updated'
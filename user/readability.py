@@ -0,0 +1,151 @@
+import re
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+
+# Words of this many letters or more count as long (the LIX cut-off).
+LONG_WORD_LETTERS = 7
+
+# Spellings that do not sound the way their letters suggest (silent letters,
+# irregular vowel teams, ph/ch for /f/ and /k/); the words that contain them are
+# the ones dyslexic readers most often stumble over.
+UNCOMMON_GRAPHEMES = re.compile(
+    r'ough|augh|eigh|^kn|^wr|^gn|^ps|^rh|^pn|mb$|mn$|gh|ph|ch(?=r|l)|^chr|sc(?=i|e)|tio|sio|cia|que$|^tw|wh',
+)
+
+READABILITY_FIELDS = (
+    'length', 'word_count', 'syllable_count', 'grade_level', 'long_word_ratio', 'uncommon_grapheme_ratio',
+)
+# Everything TextContent derives from its body on save.
+BODY_FIELDS = (*READABILITY_FIELDS, 'segment_offsets')
+
+_WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+_SENTENCE_END = re.compile(r'[.!?]+(?=\s|$)')
+_VOWEL_GROUP = re.compile(r'[aeiouy]+')
+# Where a segment may end: after sentence punctuation (and closing quotes) or a blank line.
+_SEGMENT_BREAK = re.compile(r'[.!?]+["\'\u201d\u2019)\]]*\s+|\n\s*\n')
+_SPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=20000)
+def count_syllables(word):
+    """Heuristic English syllable count: vowel groups, minus a silent final ``e``, at least one."""
+    word = word.lower().replace("'", '')
+    count = len(_VOWEL_GROUP.findall(word))
+    if word.endswith('e') and not word.endswith(('le', 'ee', 'ye')) and count > 1:
+        count -= 1
+    return max(count, 1)
+
+
+@lru_cache(maxsize=20000)
+def _word_traits(word):
+    lower = word.lower()
+    return count_syllables(lower), len(lower) >= LONG_WORD_LETTERS, bool(UNCOMMON_GRAPHEMES.search(lower))
+
+
+def analyze(text):
+    """
+    Readability metrics for a passage, keyed by the TextContent column they are stored in.
+
+    ``grade_level`` is the Flesch-Kincaid grade, floored at 0; the two ratios are
+    the share of words that are long or contain an uncommon grapheme.
+    """
+    text = text or ''
+    words = _WORD.findall(text)
+    syllables = long_words = uncommon = 0
+    for word in words:
+        word_syllables, is_long, is_uncommon = _word_traits(word)
+        syllables += word_syllables
+        long_words += is_long
+        uncommon += is_uncommon
+
+    word_count = len(words)
+    per_word = max(word_count, 1)
+    sentences = max(len(_SENTENCE_END.findall(text)), 1)
+    grade = 0.39 * word_count / sentences + 11.8 * syllables / per_word - 15.59 if words else 0.0
+    return {
+        'length': len(text),
+        'word_count': word_count,
+        'syllable_count': syllables,
+        'grade_level': round(max(grade, 0.0), 2),
+        'long_word_ratio': round(long_words / per_word, 4),
+        'uncommon_grapheme_ratio': round(uncommon / per_word, 4),
+    }
+
+
+def segment_offsets(text, size=None):
+    """
+    Split ``text`` into ``[start, end)`` character ranges of at most ``size``
+    (TEXT_SEGMENT_CHARS) characters, ending on sentence boundaries.
+
+    A sentence longer than ``size`` is split at whitespace, or hard at ``size`` if it
+    has none. The ranges are contiguous and cover the whole text.
+    """
+    size = size or settings.TEXT_SEGMENT_CHARS
+    text = text or ''
+    breaks = [match.end() for match in _SEGMENT_BREAK.finditer(text)]
+    if not breaks or breaks[-1] != len(text):
+        breaks.append(len(text))
+
+    offsets, start, last = [], 0, 0
+    for end in breaks:
+        if end - start > size and last > start:
+            offsets.append([start, last])
+            start = last
+        while end - start > size:
+            cut = max((m.end() for m in _SPACE.finditer(text, start + 1, start + size)), default=start + size)
+            offsets.append([start, cut])
+            start = cut
+        last = end
+    if last > start:
+        offsets.append([start, last])
+    return offsets
+
+
+def analyze_body(text):
+    """Every BODY_FIELDS value for a TextContent body: the readability metrics and the segment offsets."""
+    return {**analyze(text), 'segment_offsets': segment_offsets(text)}
+
+
+def grade_range(reading_level):
+    """
+    The ``(min, max)`` grade band for a Profile.reading_level, or ``None`` if it is unknown.
+
+    Named levels come from READING_LEVEL_GRADES; numeric ones ("3", "grade 3.5") are
+    taken as a grade, widened by READING_LEVEL_GRADE_SPREAD either side.
+    """
+    if not reading_level:
+        return None
+    level = reading_level.strip().lower()
+    if level in settings.READING_LEVEL_GRADES:
+        return tuple(settings.READING_LEVEL_GRADES[level])
+    match = re.search(r'\d+(?:\.\d+)?', level)
+    if match is None:
+        return None
+    grade = float(match.group())
+    spread = settings.READING_LEVEL_GRADE_SPREAD
+    return max(grade - spread, 0.0), grade + spread
+
+
+def backfill(queryset, fields=BODY_FIELDS, batch_size=500, on_batch=None):
+    """
+    Recompute and store ``fields`` (derived from the body) for every row in
+    ``queryset``, ``batch_size`` rows per UPDATE batch. Works on historical models
+    too; returns the number of rows. ``on_batch(rows)`` is called after each batch.
+    """
+    now = timezone.now()
+    count = 0
+    rows = queryset.only('id', 'body').order_by('id').iterator(chunk_size=batch_size)
+    while batch := list(islice(rows, batch_size)):
+        for row in batch:
+            values = analyze_body(row.body)
+            for field in fields:
+                setattr(row, field, values[field])
+            row.updated_at = now
+        queryset.model.objects.bulk_update(batch, [*fields, 'updated_at'])
+        count += len(batch)
+        if on_batch:
+            on_batch(batch)
+    return count
@@ -0,0 +1,276 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import train_test_split
+
+from user.models import Progress
+
+# Features: User's average score, average time spent, exercise status encoding
+FEATURES = ['score_avg', 'time_spent_seconds_avg', 'status_encoded']
+
+# Fixed encoding so training and serving agree even when a status is missing from the data
+STATUS_CLASSES = sorted(key for key, _ in Progress.STATUS_CHOICES)
+
+
+FEATURE_STORE_COLUMNS = ['user__features__progress_count', 'user__features__score_sum', 'user__features__time_spent_seconds_sum']
+
+
+def add_user_averages(df):
+    """Per-user averages come precomputed from the UserFeatures store rather than a groupby."""
+    counts = df['user__features__progress_count'].where(df['user__features__progress_count'] > 0)
+    df['score_avg'] = (df['user__features__score_sum'] / counts).fillna(0.0)
+    df['time_spent_seconds_avg'] = (df['user__features__time_spent_seconds_sum'] / counts).fillna(0.0)
+    return df.drop(columns=FEATURE_STORE_COLUMNS)
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def extract_training_data(queryset=None, chunk_size=None, out_dir=None):
+    """
+    Stream progress rows into preallocated feature/label arrays.
+
+    Rows are read through a server-side cursor ``chunk_size`` at a time and written
+    straight into a float32 ``X`` (the dtype the forest trains on) and an int8 ``y``,
+    so peak memory is the arrays plus one chunk. With ``out_dir`` the arrays are
+    ``.npy`` memory maps on disk instead of RAM.
+    """
+    if queryset is None:
+        queryset = Progress.objects.all()
+    chunk_size = chunk_size or settings.RECOMMENDER_TRAINING_CHUNK_SIZE
+
+    n_rows = queryset.count()
+    if out_dir is not None:
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        X = np.lib.format.open_memmap(out_dir / 'X.npy', mode='w+', dtype=np.float32, shape=(n_rows, len(FEATURES)))
+        y = np.lib.format.open_memmap(out_dir / 'y.npy', mode='w+', dtype=np.int8, shape=(n_rows,))
+    else:
+        X = np.empty((n_rows, len(FEATURES)), dtype=np.float32)
+        y = np.empty(n_rows, dtype=np.int8)
+
+    status_codes = {status: code for code, status in enumerate(STATUS_CLASSES)}
+    completed = status_codes['completed']
+
+    rows = queryset.order_by().values_list('status', *FEATURE_STORE_COLUMNS).iterator(chunk_size=chunk_size)
+    filled = 0
+    for batch in _batched(rows, chunk_size):
+        batch = batch[:n_rows - filled]  # rows inserted after the count() are left for the next run
+        if not batch:
+            break
+        end = filled + len(batch)
+
+        status, count, score_sum, time_sum = zip(*batch)
+        status = np.fromiter((status_codes[value] for value in status), dtype=np.int8, count=len(batch))
+        count = np.array(count, dtype=np.float64)
+        count[count <= 0] = np.nan
+
+        X[filled:end, 0] = np.nan_to_num(np.array(score_sum, dtype=np.float64) / count)
+        X[filled:end, 1] = np.nan_to_num(np.array(time_sum, dtype=np.float64) / count)
+        X[filled:end, 2] = status
+        y[filled:end] = status == completed
+        filled = end
+
+    # Rows deleted after the count() leave a short tail; drop it.
+    return X[:filled], y[:filled]
+
+
+def train_model(X, y):
+    """
+    Fit the recommender on a train split of ``X``/``y``. Returns ``(model, metrics)``,
+    where ``metrics`` holds the held-out ``accuracy`` and the text classification ``report``.
+    """
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(X_train, y_train)
+
+    y_pred = model.predict(X_test)
+    metrics = {
+        'accuracy': accuracy_score(y_test, y_pred),
+        'report': classification_report(y_test, y_pred),
+    }
+    return model, metrics
+
+
+class ModelRegistry:
+    """
+    Versioned recommender artifacts on disk.
+
+    Each artifact is a joblib dump of the fitted model plus the feature metadata it
+    was trained with. The ``LATEST`` pointer file names the active version; workers
+    load it lazily on first use and re-check the pointer every
+    ``RECOMMENDER_RELOAD_INTERVAL`` seconds, so a newly trained version is picked
+    up without a restart.
+    """
+
+    POINTER_NAME = 'LATEST'
+
+    def __init__(self, directory=None, reload_interval=None):
+        self._directory = directory
+        self._reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._artifact = None
+        self._checked_at = None
+
+    @property
+    def directory(self):
+        return Path(self._directory or settings.RECOMMENDER_MODEL_DIR)
+
+    @property
+    def reload_interval(self):
+        if self._reload_interval is not None:
+            return self._reload_interval
+        return getattr(settings, 'RECOMMENDER_RELOAD_INTERVAL', 30)
+
+    def artifact_path(self, version):
+        return self.directory / f'recommender-{version}.joblib'
+
+    def versions(self):
+        if not self.directory.exists():
+            return []
+        return sorted(path.stem[len('recommender-'):] for path in self.directory.glob('recommender-*.joblib'))
+
+    def latest_version(self):
+        try:
+            return (self.directory / self.POINTER_NAME).read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def save(self, model, activate=True, **metadata):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        trained_at = datetime.now(timezone.utc)
+        version = trained_at.strftime('%Y%m%d%H%M%S%f')
+        artifact = {
+            **metadata,
+            'version': version,
+            'trained_at': trained_at.isoformat(),
+            'features': FEATURES,
+            'status_classes': STATUS_CLASSES,
+            'model': model,
+        }
+        path = self.artifact_path(version)
+        tmp_path = path.with_suffix('.tmp')
+        joblib.dump(artifact, tmp_path)
+        os.replace(tmp_path, path)
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        if not self.artifact_path(version).exists():
+            raise FileNotFoundError(f"No recommender artifact for version {version}.")
+        pointer = self.directory / self.POINTER_NAME
+        tmp_pointer = pointer.with_suffix('.tmp')
+        tmp_pointer.write_text(version)
+        os.replace(tmp_pointer, pointer)
+
+    def prune(self, keep):
+        active = self.latest_version()
+        stale = [version for version in self.versions() if version != active]
+        removed = stale[:max(len(stale) - keep, 0)]
+        for version in removed:
+            self.artifact_path(version).unlink(missing_ok=True)
+        return removed
+
+    def load(self, version):
+        return joblib.load(self.artifact_path(version))
+
+    def _is_stale(self):
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.reload_interval
+
+    def get(self):
+        """Return the active artifact, loading it or hot-swapping a newer version as needed."""
+        if not self._is_stale():
+            return self._artifact
+
+        with self._lock:
+            if self._is_stale():
+                version = self.latest_version()
+                current = self._artifact['version'] if self._artifact else None
+                if version != current:
+                    self._artifact = self.load(version) if version else None
+                self._checked_at = time.monotonic()
+        return self._artifact
+
+    def reload(self, version=None):
+        """Swap in ``version`` (default: the active pointer) immediately, without a restart."""
+        with self._lock:
+            version = version or self.latest_version()
+            self._artifact = self.load(version) if version else None
+            self._checked_at = time.monotonic()
+        return self._artifact
+
+
+registry = ModelRegistry()
+
+
+def build_feature_frame(users):
+    """One row per progress entry of ``users``, with the model features computed in bulk."""
+    rows = Progress.objects.filter(user_id__in=[user.pk for user in users]).values_list(
+        'user_id', 'exercise_id', 'exercise__title', 'status', *FEATURE_STORE_COLUMNS
+    )
+    df = pd.DataFrame(list(rows), columns=['user_id', 'exercise_id', 'exercise_title', 'status', *FEATURE_STORE_COLUMNS])
+    if df.empty:
+        return df
+
+    df['status_encoded'] = df['status'].map({status: code for code, status in enumerate(STATUS_CLASSES)})
+    return add_user_averages(df)
+
+
+def score_users(users, artifact=None):
+    """
+    Score every progress entry of ``users`` with a single ``predict_proba`` call.
+
+    Returns ``{user_id: [(exercise_id, exercise_title, score), ...]}`` with each list
+    ranked by descending completion probability.
+    """
+    artifact = artifact or registry.get()
+    if artifact is None:
+        return {}
+
+    df = build_feature_frame(users)
+    if df.empty:
+        return {}
+
+    model = artifact['model']
+    classes = list(model.classes_)
+    if 1 in classes:
+        df['score'] = model.predict_proba(df[artifact['features']].to_numpy(dtype=np.float32))[:, classes.index(1)]
+    else:
+        df['score'] = 0.0
+
+    df = df.sort_values(['user_id', 'score', 'exercise_id'], ascending=[True, False, True])
+    return {
+        user_id: list(group[['exercise_id', 'exercise_title', 'score']].itertuples(index=False, name=None))
+        for user_id, group in df.groupby('user_id', sort=False)
+    }
+
+
+def suggest_exercises_bulk(users, threshold=0.5):
+    """Suggested exercises for many users in one query and one model call."""
+    return {
+        user_id: [
+            {'exercise': int(exercise_id), 'title': title, 'score': float(score)}
+            for exercise_id, title, score in ranked
+            if score > threshold
+        ]
+        for user_id, ranked in score_users(users).items()
+    }
+
+
+def suggest_exercises(user, threshold=0.5):
+    return suggest_exercises_bulk([user], threshold=threshold).get(user.pk, [])
@@ -0,0 +1,107 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _version_key(label, pk=None):
+    return f'catalog:{label}:version' if pk is None else f'catalog:{label}:{pk}:version'
+
+
+def _version(label, pk=None):
+    key = _version_key(label, pk)
+    version = cache.get(key)
+    if version is None:
+        version = 1
+        cache.add(key, version, None)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate_catalog(label, pk):
+    """Drop the cached lists of a model and the cached detail of one object. Called on save and delete."""
+    _bump(_version_key(label))
+    _bump(_version_key(label, pk))
+
+
+def invalidate_catalog_lists(label):
+    """Drop the cached lists of a model, e.g. after rows were bulk-created without signals."""
+    _bump(_version_key(label))
+
+
+def validators(label, rows):
+    """``(etag, last_modified)`` for a response built from ``rows``, derived from their ids and ``updated_at``."""
+    digest = hashlib.md5(label.encode())
+    last_modified = None
+    for row in rows:
+        digest.update(f'{row.pk}:{row.updated_at.isoformat()};'.encode())
+        if last_modified is None or row.updated_at > last_modified:
+            last_modified = row.updated_at
+    # HTTP dates have one-second resolution.
+    return quote_etag(digest.hexdigest()), int(last_modified.timestamp()) if last_modified else None
+
+
+class CatalogCacheMixin:
+    """
+    Serve GET responses of a catalog view from the shared cache, with conditional GET.
+
+    Payloads are cached per URL under the model's list version (list views) or the
+    object's version (detail views); signals bump those versions on every save and
+    delete, so a write invalidates exactly the lists of its model and its own
+    detail. Responses carry an ETag and Last-Modified computed from the rows'
+    ``updated_at``, and a matching ``If-None-Match`` / ``If-Modified-Since`` gets a
+    304 without touching the database or the serializer.
+    """
+
+    @property
+    def cache_label(self):
+        return self.queryset.model._meta.model_name
+
+    def get_serializer(self, *args, **kwargs):
+        if args:
+            self._cached_rows = args[0]
+        return super().get_serializer(*args, **kwargs)
+
+    def response_cache_key(self, request):
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        version = _version(self.cache_label, pk)
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        scope = 'list' if pk is None else f'detail:{pk}'
+        return f'catalog:{self.cache_label}:{scope}:{version}:{url}'
+
+    def get(self, request, *args, **kwargs):
+        key = self.response_cache_key(request)
+        entry = cache.get(key)
+        if entry is None:
+            self._cached_rows = None
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK or self._cached_rows is None:
+                return response
+            rows = self._cached_rows
+            rows = list(rows) if isinstance(rows, (list, tuple)) or hasattr(rows, 'model') else [rows]
+            etag, last_modified = validators(self.cache_label, rows)
+            entry = {'data': response.data, 'etag': etag, 'last_modified': last_modified}
+            cache.set(key, entry, settings.CATALOG_CACHE_TIMEOUT)
+            hit = False
+        else:
+            hit = True
+
+        response = get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'])
+        if response is None:
+            response = Response(entry['data'], status=status.HTTP_200_OK)
+        response['ETag'] = entry['etag']
+        if entry['last_modified'] is not None:
+            response['Last-Modified'] = http_date(entry['last_modified'])
+        response['Cache-Control'] = 'no-cache'  # clients may keep a copy but must revalidate
+        response['X-Catalog-Cache'] = 'hit' if hit else 'miss'
+        return response
@@ -0,0 +1,211 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from user.authentication import PROFILE_FIELDS
+from user.models import Profile
+from user.serializers import RosterRowSerializer
+
+
+def read_roster(stream, fmt=None):
+    """
+    Yield ``(line, row)`` from a CSV (with a header row) or JSON Lines roster.
+
+    ``stream`` is a text stream; the format is guessed from the first non-blank
+    character when not given. Malformed JSON lines are yielded as ``(line, None)``.
+    """
+    first = ''
+    while not first.strip():
+        first = stream.readline()
+        if not first:
+            return
+    lines = _chain(first, stream)
+    if (fmt or ('jsonl' if first.lstrip().startswith('{') else 'csv')) == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key.strip(): value.strip() for key, value in row.items() if key and value is not None}
+        return
+    for line, text in enumerate(lines, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            row = None
+        yield line, row if isinstance(row, dict) else None
+
+
+def _chain(first, stream):
+    yield first
+    yield from stream
+
+
+def _init_hasher():
+    # Spawned workers start without Django configured; forked ones already are.
+    django.setup()
+
+
+def _hash_all(passwords):
+    return [make_password(password) for password in passwords]
+
+
+class RosterImport:
+    """
+    Create users and profiles from roster rows in batches.
+
+    Each batch of ROSTER_BATCH_SIZE rows is validated, checked for duplicate
+    usernames and emails (within the file and against the database, one query per
+    batch), hashed across ``workers`` processes (1 hashes in the calling thread)
+    and written with two ``bulk_create`` calls in one transaction. ``on_progress(processed, created, failed)`` is
+    called after every batch.
+    """
+
+    def __init__(self, batch_size=None, workers=None, dry_run=False, on_progress=None):
+        self.batch_size = batch_size or settings.ROSTER_BATCH_SIZE
+        self.workers = workers or settings.ROSTER_HASH_WORKERS or os.cpu_count() or 1
+        self.dry_run = dry_run
+        self.on_progress = on_progress
+        self.processed = 0
+        self.created = 0
+        self.errors = []
+        self._usernames = set()
+        self._emails = set()
+        self._pool = None
+
+    def run(self, rows):
+        try:
+            rows = iter(rows)
+            while batch := list(islice(rows, self.batch_size)):
+                self._import_batch(batch)
+                if self.on_progress:
+                    self.on_progress(self.processed, self.created, len(self.errors))
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+        return self.summary()
+
+    def summary(self):
+        return {'processed': self.processed, 'created': self.created, 'failed': len(self.errors), 'errors': self.errors}
+
+    def _fail(self, line, row, errors):
+        username = row.get('username') if isinstance(row, dict) else None
+        self.errors.append({'line': line, 'username': username, 'errors': errors})
+
+    def _import_batch(self, batch):
+        self.processed += len(batch)
+        valid = []
+        for line, row in batch:
+            if row is None:
+                self._fail(line, row, {'row': ["Not a valid JSON object."]})
+                continue
+            serializer = RosterRowSerializer(data=row)
+            if not serializer.is_valid():
+                self._fail(line, row, serializer.errors)
+                continue
+            data = serializer.validated_data
+            errors = {}
+            if data['username'] in self._usernames:
+                errors['username'] = ["Duplicate username in this roster."]
+            if data['email'] in self._emails:
+                errors['email'] = ["Duplicate email in this roster."]
+            if errors:
+                self._fail(line, row, errors)
+                continue
+            self._usernames.add(data['username'])
+            self._emails.add(data['email'])
+            valid.append((line, data))
+        if not valid:
+            return
+
+        taken = self._taken([data for _, data in valid])
+        rows = []
+        for line, data in valid:
+            errors = self._conflicts(data, taken)
+            if errors:
+                self._fail(line, data, errors)
+            else:
+                rows.append((line, data))
+        if not rows or self.dry_run:
+            return
+
+        hashes = self._hash([data['password'] for _, data in rows])
+        users = [
+            User(
+                username=data['username'], email=data['email'], password=password,
+                first_name=data['first_name'], last_name=data['last_name'],
+            )
+            for (_, data), password in zip(rows, hashes)
+        ]
+        try:
+            with transaction.atomic():
+                self._insert(users, [data for _, data in rows])
+            self.created += len(users)
+        except IntegrityError:
+            # Someone registered one of these names since the check; insert row by row to find out who.
+            for user in users:
+                user.pk = None
+            for (line, data), user in zip(rows, users):
+                try:
+                    with transaction.atomic():
+                        self._insert([user], [data])
+                    self.created += 1
+                except IntegrityError:
+                    user.pk = None
+                    errors = self._conflicts(data, self._taken([data]))
+                    self._fail(line, data, errors or {'non_field_errors': ["The user could not be created."]})
+
+    def _taken(self, rows):
+        """The usernames and emails of ``rows`` that existing users already have, in one query."""
+        taken_usernames, taken_emails = set(), set()
+        existing = User.objects.filter(
+            Q(username__in=[data['username'] for data in rows]) | Q(email__in=[data['email'] for data in rows])
+        ).values_list('username', 'email')
+        for username, email in existing:
+            taken_usernames.add(username)
+            taken_emails.add(email)
+        return taken_usernames, taken_emails
+
+    def _conflicts(self, data, taken):
+        taken_usernames, taken_emails = taken
+        errors = {}
+        if data['username'] in taken_usernames:
+            errors['username'] = ["A user with this username already exists."]
+        if data['email'] in taken_emails:
+            errors['email'] = ["A user with this email already exists."]
+        return errors
+
+    def _insert(self, users, rows):
+        User.objects.bulk_create(users)
+        Profile.objects.bulk_create([
+            Profile(user=user, **{field: data[field] for field in PROFILE_FIELDS if field in data})
+            for user, data in zip(users, rows)
+        ])
+
+    def _hash(self, passwords):
+        if self.workers <= 1 or len(passwords) < self.workers * 2:
+            return _hash_all(passwords)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_hasher)
+        size = -(-len(passwords) // self.workers)
+        chunks = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+        return [password for chunk in self._pool.map(_hash_all, chunks) for password in chunk]
+
+
+def import_roster(stream, fmt=None, **options):
+    """Import a roster text stream; returns the summary dict of RosterImport."""
+    return RosterImport(**options).run(read_roster(stream, fmt))
+
+
+def open_upload(uploaded_file):
+    """A text stream over an uploaded file, tolerating a UTF-8 BOM."""
+    return io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
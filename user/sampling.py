@@ -0,0 +1,157 @@
+import random
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+
+from user.models import Exercise, Progress
+
+VERSION_KEY = 'exercise_ids:version'
+
+# How many random candidates are checked against the user's completed exercises at once.
+CANDIDATES_PER_DRAW = 8
+
+
+def _ids_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(VERSION_KEY, version, None)
+    return version
+
+
+async def _aids_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        version = 1
+        await cache.aadd(VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_exercise_ids():
+    """Drop every cached ID list. Called whenever an Exercise is saved or deleted."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def _ids_key(version, difficulty_level, learning_style):
+    return f'exercise_ids:{version}:{difficulty_level}:{learning_style or "*"}'
+
+
+def _exercises(difficulty_level, learning_style):
+    queryset = Exercise.objects.filter(difficulty_level=difficulty_level)
+    if learning_style:
+        queryset = queryset.filter(learning_style=learning_style)
+    return queryset
+
+
+def _ids_queryset(difficulty_level, learning_style):
+    return _exercises(difficulty_level, learning_style).order_by('id').values_list('id', flat=True)
+
+
+def exercise_ids(difficulty_level, learning_style=None):
+    """Sorted IDs of the exercises at a difficulty (and optionally learning style), cached."""
+    key = _ids_key(_ids_version(), difficulty_level, learning_style)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(_ids_queryset(difficulty_level, learning_style))
+        cache.set(key, ids, settings.EXERCISE_SAMPLER_CACHE_TIMEOUT)
+    return ids
+
+
+async def aexercise_ids(difficulty_level, learning_style=None):
+    """Async ``exercise_ids``."""
+    key = _ids_key(await _aids_version(), difficulty_level, learning_style)
+    ids = await cache.aget(key)
+    if ids is None:
+        ids = [pk async for pk in _ids_queryset(difficulty_level, learning_style)]
+        await cache.aset(key, ids, settings.EXERCISE_SAMPLER_CACHE_TIMEOUT)
+    return ids
+
+
+def _live(difficulty_level, learning_style, user):
+    """The exercises a draw may return, straight from the table."""
+    queryset = _exercises(difficulty_level, learning_style)
+    if user is not None:
+        completed = Progress.objects.filter(user_id=user.pk, exercise=OuterRef('pk'), status='completed')
+        queryset = queryset.exclude(Exists(completed))
+    return queryset
+
+
+def _seek(queryset, pivot):
+    # Seek from a random pivot on the primary key instead of sorting the whole set,
+    # wrapping around once.
+    return (
+        queryset.filter(pk__gte=pivot).order_by('pk').first()
+        or queryset.filter(pk__lt=pivot).order_by('pk').first()
+    )
+
+
+async def _aseek(queryset, pivot):
+    return (
+        await queryset.filter(pk__gte=pivot).order_by('pk').afirst()
+        or await queryset.filter(pk__lt=pivot).order_by('pk').afirst()
+    )
+
+
+def sample_exercise(difficulty_level, learning_style=None, exclude_completed_by=None):
+    """
+    Pick a random exercise without ``ORDER BY RANDOM()``.
+
+    Candidates are drawn from the cached ID list; when ``exclude_completed_by`` is
+    given only those few candidates are checked against the user's progress. The
+    list may be briefly stale (it is refreshed on the next read after a write), so
+    a candidate that no longer exists falls back to a seek on the live table.
+    """
+    ids = exercise_ids(difficulty_level, learning_style)
+    if not ids:
+        return None
+
+    candidates = random.sample(ids, min(len(ids), CANDIDATES_PER_DRAW))
+    if exclude_completed_by is not None:
+        completed = set(
+            Progress.objects.filter(user_id=exclude_completed_by.pk, exercise_id__in=candidates, status='completed')
+            .values_list('exercise_id', flat=True)
+        )
+        candidates = [pk for pk in candidates if pk not in completed]
+        if not candidates:
+            # Rare path: every sampled candidate was completed.
+            if len(ids) <= CANDIDATES_PER_DRAW:
+                return None
+            return _seek(_live(difficulty_level, learning_style, exclude_completed_by), random.choice(ids))
+
+    exercise = Exercise.objects.filter(pk=candidates[0]).first()
+    if exercise is None:
+        # Deleted since the list was cached; refresh it for the next draw and take a live neighbour.
+        invalidate_exercise_ids()
+        exercise = _seek(_live(difficulty_level, learning_style, exclude_completed_by), candidates[0])
+    return exercise
+
+
+async def asample_exercise(difficulty_level, learning_style=None, exclude_completed_by=None):
+    """Async ``sample_exercise``."""
+    ids = await aexercise_ids(difficulty_level, learning_style)
+    if not ids:
+        return None
+
+    candidates = random.sample(ids, min(len(ids), CANDIDATES_PER_DRAW))
+    if exclude_completed_by is not None:
+        completed = {
+            pk async for pk in Progress.objects.filter(
+                user_id=exclude_completed_by.pk, exercise_id__in=candidates, status='completed',
+            ).values_list('exercise_id', flat=True)
+        }
+        candidates = [pk for pk in candidates if pk not in completed]
+        if not candidates:
+            if len(ids) <= CANDIDATES_PER_DRAW:
+                return None
+            return await _aseek(_live(difficulty_level, learning_style, exclude_completed_by), random.choice(ids))
+
+    exercise = await Exercise.objects.filter(pk=candidates[0]).afirst()
+    if exercise is None:
+        await sync_to_async(invalidate_exercise_ids)()
+        exercise = await _aseek(_live(difficulty_level, learning_style, exclude_completed_by), candidates[0])
+    return exercise
@@ -0,0 +1,115 @@
+import html
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from user.models import TextContent
+
+# The index lives outside the ORM: a generated tsvector column with a GIN index on
+# PostgreSQL, an external-content FTS5 table kept in sync by triggers on SQLite. Either
+# way the database maintains it on every write. Created by migration 0012; SQLite
+# migrations that rebuild user_textcontent must re-create the triggers (see 0013).
+
+SNIPPET_START = '<mark>'
+SNIPPET_STOP = '</mark>'
+# The database highlights with these private-use characters; the snippet is escaped
+# before they become tags, so markup stored in a body is never passed through.
+_MATCH_START = '\ue000'
+_MATCH_STOP = '\ue001'
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+POSTGRES_SEARCH = """
+    SELECT ranked.id, ranked.title, ranked.topic, ranked.difficulty_level, ranked.rank,
+           ts_headline('english', t.body, ranked.query, %s) AS snippet
+    FROM (
+        SELECT c.id, c.title, c.topic, c.difficulty_level, q AS query,
+               ts_rank_cd(c.search_vector, q) AS rank
+        FROM user_textcontent c, websearch_to_tsquery('english', %s) q
+        WHERE c.search_vector @@ q {filters}
+        ORDER BY rank DESC, c.id DESC
+        LIMIT %s OFFSET %s
+    ) ranked
+    JOIN user_textcontent t ON t.id = ranked.id
+    ORDER BY ranked.rank DESC, ranked.id DESC
+"""
+
+# bm25() is lower-is-better; title and topic matches weigh more than body matches.
+SQLITE_SEARCH = """
+    SELECT c.id, c.title, c.topic, c.difficulty_level,
+           -bm25(user_textcontent_fts, 10.0, 5.0, 1.0) AS rank,
+           snippet(user_textcontent_fts, 2, %s, %s, '…', 24) AS snippet
+    FROM user_textcontent_fts
+    JOIN user_textcontent c ON c.id = user_textcontent_fts.rowid
+    WHERE user_textcontent_fts MATCH %s {filters}
+    ORDER BY rank DESC, c.id DESC
+    LIMIT %s OFFSET %s
+"""
+
+COLUMNS = ('id', 'title', 'topic', 'difficulty_level', 'rank', 'snippet')
+
+
+def _filters(difficulty_level, topic):
+    clauses, params = [], []
+    if difficulty_level is not None:
+        clauses.append('AND c.difficulty_level = %s')
+        params.append(difficulty_level)
+    if topic:
+        clauses.append('AND c.topic = %s')
+        params.append(topic)
+    return ' '.join(clauses), params
+
+
+def fts5_query(text):
+    """Quote every word so user input can never be parsed as FTS5 syntax; words are ANDed."""
+    return ' '.join('"%s"' % word for word in _WORD.findall(text))
+
+
+def search_text_content(query, difficulty_level=None, topic=None, limit=20, offset=0):
+    """
+    Ranked full-text search over TextContent titles, topics and bodies.
+
+    Returns dicts with ``id``, ``title``, ``topic``, ``difficulty_level``, ``rank``
+    (higher is better) and a ``snippet``: an HTML fragment of the escaped body with
+    matches wrapped in ``<mark>``; titles and topics are plain text. Uses the index
+    created by migration 0012; backends without one get unranked substring matches.
+    """
+    filters, filter_params = _filters(difficulty_level, topic)
+
+    if connection.vendor == 'postgresql':
+        options = f'StartSel={_MATCH_START}, StopSel={_MATCH_STOP}, MaxFragments=2, MaxWords=24, MinWords=8'
+        sql = POSTGRES_SEARCH.format(filters=filters)
+        params = [options, query, *filter_params, limit, offset]
+    elif connection.vendor == 'sqlite':
+        match = fts5_query(query)
+        if not match:
+            return []
+        sql = SQLITE_SEARCH.format(filters=filters)
+        params = [_MATCH_START, _MATCH_STOP, match, *filter_params, limit, offset]
+    else:
+        return _substring_search(query, difficulty_level, topic, limit, offset)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = [dict(zip(COLUMNS, row)) for row in cursor.fetchall()]
+    for row in rows:
+        row['snippet'] = highlight(row['snippet'])
+    return rows
+
+
+def highlight(snippet):
+    """HTML-escape a database snippet, then turn its match markers into ``<mark>`` tags."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_MATCH_START, SNIPPET_START).replace(_MATCH_STOP, SNIPPET_STOP)
+
+
+def _substring_search(query, difficulty_level, topic, limit, offset):
+    queryset = TextContent.objects.filter(Q(title__icontains=query) | Q(body__icontains=query))
+    if difficulty_level is not None:
+        queryset = queryset.filter(difficulty_level=difficulty_level)
+    if topic:
+        queryset = queryset.filter(topic=topic)
+    rows = queryset.order_by('-id').values('id', 'title', 'topic', 'difficulty_level')[offset:offset + limit]
+    return [{**row, 'rank': None, 'snippet': None} for row in rows]
@@ -1,7 +1,15 @@
 from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from user.authentication import PROFILE_CLAIM, USER_CLAIMS, profile_claims
 from user.models import Exercise, Profile, Progress, TextContent
+from user.readability import READABILITY_FIELDS
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,9 +21,24 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        token['username'] = user.username
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        # Lets ClaimsJWTAuthentication serve requests without loading the user or profile.
+        token[PROFILE_CLAIM] = profile_claims(Profile.objects.get_or_create(user=user)[0])
+        token[api_settings.REVOKE_TOKEN_CLAIM] = get_md5_hash_password(user.password)
         return token
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """Re-reads the profile on refresh so the access token's snapshot picks up profile edits."""
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        profile = Profile.objects.filter(user_id=refresh[api_settings.USER_ID_CLAIM]).first()
+        if profile is not None and PROFILE_CLAIM in refresh:
+            refresh[PROFILE_CLAIM] = profile_claims(profile)
+            attrs['refresh'] = str(refresh)
+        return super().validate(attrs)
+
 class ProfileSerializer(serializers.ModelSerializer):
     user = UserSerializer()
     class Meta:
@@ -23,9 +46,27 @@ class ProfileSerializer(serializers.ModelSerializer):
         fields = ['user', 'reading_level', 'preferred_font_size', 'background_color', 'learning_style']
         
 class TextContentSerializer(serializers.ModelSerializer):
+    """Pass ``fields=[...]`` to serialize only those fields (sparse fieldsets)."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = TextContent
-        fields = '__all__'
+        exclude = ['segment_offsets']
+        read_only_fields = READABILITY_FIELDS
+
+class TextContentSegmentSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    index = serializers.IntegerField(source='segment_index')
+    count = serializers.IntegerField(source='segment_count')
+    start = serializers.IntegerField(source='segment_start')
+    end = serializers.IntegerField(source='segment_end')
+    text = serializers.CharField(source='segment_text')
 
 class ExerciseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -42,6 +83,35 @@ class ProgressSerializer(serializers.ModelSerializer):
     #     user = self.context['request'].user
     #     return Progress.objects.create(user=user, **validated_data)
     
+class ProgressDeltaSerializer(serializers.Serializer):
+    exercise = serializers.IntegerField(min_value=1)
+    time_spent = serializers.IntegerField(min_value=0)  # seconds to add
+    status = serializers.ChoiceField(choices=Progress.STATUS_CHOICES, required=False)
+    score = serializers.FloatField(required=False)
+
+class RosterRowSerializer(serializers.Serializer):
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField()
+    password = serializers.CharField(trim_whitespace=False)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    reading_level = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    preferred_font_size = serializers.IntegerField(min_value=1, required=False)
+    background_color = serializers.RegexField(r'^#[0-9A-Fa-f]{6}$', required=False)
+    learning_style = serializers.ChoiceField(choices=Profile._meta.get_field('learning_style').choices, required=False)
+
+    def validate(self, attrs):
+        user = User(username=attrs['username'], email=attrs['email'], first_name=attrs['first_name'], last_name=attrs['last_name'])
+        try:
+            validate_password(attrs['password'], user=user)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'password': list(e.messages)})
+        return attrs
+
+class AnswerPairSerializer(serializers.Serializer):
+    actual_answer = serializers.CharField(trim_whitespace=False)
+    user_answer = serializers.CharField(trim_whitespace=False)
+
 class ProgressReportSerializer(serializers.ModelSerializer):
     exercise_name = serializers.CharField(source='exercise.title', read_only=True)
     
@@ -1,9 +1,16 @@
 # signals.py
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from .answer_keys import build_answer_key
+from .authentication import user_states
+from .features import apply_progress_change, progress_values, rebuild_user_features
+from .models import Exercise, Profile, Progress, TextContent
+from .response_cache import invalidate_catalog
+from .sampling import invalidate_exercise_ids
+from .summary import SUMMARY_FIELDS, apply_summary_change, rebuild_progress_summaries, source_summaries, summary_enabled
+from .utils import forget_recent_scores
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -11,5 +18,72 @@ def create_user_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance)
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
+def save_user_profile(sender, instance, created, **kwargs):
+    # Only a profile already loaded through this user can have pending edits, and only dirty fields are written.
+    if created or not User.profile.is_cached(instance):
+        return
+    dirty = [field for field in instance.profile.get_dirty_fields() if field not in ('id', 'user_id')]
+    if dirty:
+        instance.profile.save(update_fields=dirty)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_auth_state(sender, instance, **kwargs):
+    user_states.forget(instance.pk)
+
+
+@receiver(post_save, sender=Progress)
+def track_progress_save(sender, instance, created, **kwargs):
+    forget_recent_scores(instance.user_id)
+    loaded = instance.get_loaded_values()
+    new = {field: getattr(instance, field) for field in SUMMARY_FIELDS}
+    if created:
+        apply_progress_change(instance.user_id, new=progress_values(new['score'], new['time_spent']))
+        apply_summary_change(instance.user_id, new=new)
+    elif loaded is not None and all(field in loaded for field in SUMMARY_FIELDS):
+        old = {field: loaded[field] for field in SUMMARY_FIELDS}
+        apply_progress_change(
+            instance.user_id,
+            old=progress_values(old['score'], old['time_spent']),
+            new=progress_values(new['score'], new['time_spent']),
+        )
+        apply_summary_change(instance.user_id, old=old, new=new)
+    else:
+        # Saved without knowing the previous values; fall back to recomputing this user.
+        rebuild_user_features([instance.user_id])
+        if summary_enabled():
+            rebuild_progress_summaries(source_summaries([instance.user_id]), user_ids=[instance.user_id])
+
+
+@receiver(post_delete, sender=Progress)
+def track_progress_delete(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return  # Deleting the user cascades to their features and summary too; nothing to fold.
+    forget_recent_scores(instance.user_id)
+    loaded = instance.get_loaded_values() or {}
+    old = {field: loaded.get(field, getattr(instance, field)) for field in SUMMARY_FIELDS}
+    apply_progress_change(instance.user_id, old=progress_values(old['score'], old['time_spent']))
+    apply_summary_change(instance.user_id, old=old)
+
+
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+def invalidate_exercise_sampler(sender, instance, **kwargs):
+    invalidate_exercise_ids()
+
+
+@receiver(post_save, sender=Exercise)
+def compile_answer_key(sender, instance, created, **kwargs):
+    loaded = instance.get_loaded_values()
+    if created or loaded is None or any(
+        loaded.get(field) != getattr(instance, field) for field in ('exercise_type', 'exercise_content')
+    ):
+        build_answer_key(instance)
+
+
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+@receiver(post_save, sender=TextContent)
+@receiver(post_delete, sender=TextContent)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    invalidate_catalog(sender._meta.model_name, instance.pk)
@@ -0,0 +1,357 @@
+import asyncio
+import hashlib
+import itertools
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+import grpc
+from cachetools import TTLCache
+from django.conf import settings
+from google.cloud import speech
+from google.cloud.speech_v1.services.speech.transports import SpeechGrpcAsyncIOTransport, SpeechGrpcTransport
+
+from user.audio import linear16_stream, prepare_audio, preprocessing_signature, probe_stream
+
+
+class SpeechBusy(Exception):
+    """Every recognition slot in this process stayed busy for SPEECH_QUEUE_TIMEOUT seconds."""
+
+
+class SpeechClientPool:
+    """
+    Process-wide Google Speech clients.
+
+    Clients (and their gRPC channels, credentials and TLS sessions) are created once
+    and shared by every request, round-robin across SPEECH_CLIENT_POOL_SIZE channels.
+    At most SPEECH_MAX_CONCURRENT_REQUESTS recognitions run at once; callers beyond
+    that wait up to SPEECH_QUEUE_TIMEOUT seconds and then get SpeechBusy.
+
+    Setting SPEECH_API_ENDPOINT with SPEECH_API_INSECURE points the pool at a
+    plaintext server such as the fake in user.testing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = None
+        self._slots = None
+        self._async_state = weakref.WeakKeyDictionary()  # event loop -> (client cycle, semaphore)
+
+    def _build_client(self):
+        endpoint = settings.SPEECH_API_ENDPOINT
+        if endpoint and settings.SPEECH_API_INSECURE:
+            return speech.SpeechClient(transport=SpeechGrpcTransport(channel=grpc.insecure_channel(endpoint)))
+        return speech.SpeechClient(client_options={'api_endpoint': endpoint} if endpoint else None)
+
+    def _build_async_client(self):
+        endpoint = settings.SPEECH_API_ENDPOINT
+        if endpoint and settings.SPEECH_API_INSECURE:
+            transport = SpeechGrpcAsyncIOTransport(channel=grpc.aio.insecure_channel(endpoint))
+            return speech.SpeechAsyncClient(transport=transport)
+        return speech.SpeechAsyncClient(client_options={'api_endpoint': endpoint} if endpoint else None)
+
+    def _ensure(self):
+        if self._clients is None:
+            with self._lock:
+                if self._clients is None:
+                    self._slots = threading.BoundedSemaphore(settings.SPEECH_MAX_CONCURRENT_REQUESTS)
+                    clients = [self._build_client() for _ in range(settings.SPEECH_CLIENT_POOL_SIZE)]
+                    self._clients = itertools.cycle(clients)
+
+    def client(self):
+        self._ensure()
+        with self._lock:
+            return next(self._clients)
+
+    @contextmanager
+    def slot(self):
+        self._ensure()
+        if not self._slots.acquire(timeout=settings.SPEECH_QUEUE_TIMEOUT):
+            raise SpeechBusy()
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def recognize(self, config, audio):
+        with self.slot():
+            return self.client().recognize(config=config, audio=audio, timeout=settings.SPEECH_REQUEST_TIMEOUT)
+
+    def _async_clients(self):
+        # grpc.aio channels are bound to the event loop that created them.
+        loop = asyncio.get_running_loop()
+        state = self._async_state.get(loop)
+        if state is None:
+            clients = [self._build_async_client() for _ in range(settings.SPEECH_CLIENT_POOL_SIZE)]
+            state = (itertools.cycle(clients), asyncio.Semaphore(settings.SPEECH_MAX_CONCURRENT_REQUESTS))
+            self._async_state[loop] = state
+        return state
+
+    @asynccontextmanager
+    async def aslot(self):
+        """Async counterpart of ``slot``; yields the client to use."""
+        clients, semaphore = self._async_clients()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), settings.SPEECH_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise SpeechBusy()
+        try:
+            yield next(clients)
+        finally:
+            semaphore.release()
+
+    async def arecognize(self, config, audio):
+        async with self.aslot() as client:
+            return await client.recognize(config=config, audio=audio, timeout=settings.SPEECH_REQUEST_TIMEOUT)
+
+    def reset(self):
+        """Forget every client, e.g. after changing the endpoint settings in tests."""
+        with self._lock:
+            self._clients = None
+            self._slots = None
+            self._async_state = weakref.WeakKeyDictionary()
+
+
+pool = SpeechClientPool()
+
+
+class TranscriptionCache:
+    """
+    Transcriptions keyed by a hash of the recognition config, the preprocessing
+    settings and the audio bytes.
+
+    Bounded to TRANSCRIPTION_CACHE_MAX_ENTRIES with least-recently-used eviction and
+    a TRANSCRIPTION_CACHE_TTL expiry, so a re-submitted or retried recording never
+    costs a second recognition call while it is cached.
+    """
+
+    def __init__(self, maxsize=None, ttl=None):
+        self._lock = threading.Lock()
+        self._entries = TTLCache(
+            maxsize=maxsize or settings.TRANSCRIPTION_CACHE_MAX_ENTRIES,
+            ttl=ttl or settings.TRANSCRIPTION_CACHE_TTL,
+        )
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(config):
+        """
+        A hash seeded with ``config`` and the preprocessing settings; feed it the audio
+        bytes and its ``hexdigest()`` is the key. Changing how uploads are trimmed or
+        resampled then misses the transcriptions made under the old settings.
+        """
+        digest = hashlib.sha256(speech.RecognitionConfig.serialize(config))
+        digest.update(b'\0')
+        digest.update(preprocessing_signature().encode())
+        digest.update(b'\0')
+        return digest
+
+    @classmethod
+    def key(cls, config, content):
+        """``content`` is the audio bytes, or an iterable of byte chunks so large uploads are hashed incrementally."""
+        digest = cls.digest(config)
+        for chunk in [content] if isinstance(content, (bytes, bytearray, memoryview)) else content:
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            transcriptions = self._entries.get(key)
+            if transcriptions is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return transcriptions
+
+    def set(self, key, transcriptions):
+        with self._lock:
+            self._entries[key] = list(transcriptions)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'max_entries': self._entries.maxsize}
+
+
+transcription_cache = TranscriptionCache()
+
+
+def recognize_content(content):
+    """
+    Transcribe ``content``, answering repeats from the cache. Returns ``(transcriptions, cache_hit)``.
+
+    The cache is keyed on the upload as received, so a hit skips preprocessing too.
+    Silent recordings are answered without calling the API.
+    """
+    key = transcription_cache.key(recognition_config(), content)
+    cached = transcription_cache.get(key)
+    if cached is not None:
+        return cached, True
+    audio, info = prepare_audio(content)
+    transcriptions = []
+    if audio:
+        response = pool.recognize(config=recognition_config(info), audio=speech.RecognitionAudio(content=audio))
+        transcriptions = transcripts(response)
+    transcription_cache.set(key, transcriptions)
+    return transcriptions, False
+
+
+async def arecognize_content(content):
+    key = transcription_cache.key(recognition_config(), content)
+    cached = transcription_cache.get(key)
+    if cached is not None:
+        return cached, True
+    # Decoding and resampling are CPU-bound; keep them off the event loop.
+    audio, info = await asyncio.to_thread(prepare_audio, content)
+    transcriptions = []
+    if audio:
+        response = await pool.arecognize(config=recognition_config(info), audio=speech.RecognitionAudio(content=audio))
+        transcriptions = transcripts(response)
+    transcription_cache.set(key, transcriptions)
+    return transcriptions, False
+
+
+def stream_recognize(uploaded_file):
+    """
+    Transcribe an uploaded file through the streaming API, yielding events as they arrive.
+
+    The upload is read ``SPEECH_STREAM_CHUNK_SIZE`` bytes at a time from Django's
+    in-memory or temporary-file buffer and each chunk goes straight into a
+    StreamingRecognizeRequest, so memory stays bounded by the chunk size however
+    long the recording is. Yields ``{'transcript', 'is_final'}`` for every partial
+    or final result, then ``{'done': True, 'transcriptions': [...]}``.
+
+    The encoding is detected from the first chunks (as many as a WAV needs to reach
+    its data chunk). WAV samples are sent bare, converted to mono LINEAR16 on the
+    way when they are in another width or channel layout.
+
+    Only in-memory uploads are looked up in the transcription cache, since their
+    hash costs no extra read; uploads spooled to disk are hashed as they stream
+    and the result stored for later requests.
+    """
+    chunk_size = settings.SPEECH_STREAM_CHUNK_SIZE
+    upload = StreamedUpload(uploaded_file, chunk_size)
+    cached = upload.cached()
+    if cached is not None:
+        yield from cached_events(cached)
+        return
+
+    info, head = probe_stream(upload.chunks)
+    audio, info = linear16_stream(info, head, upload.chunks, chunk_size)
+
+    def requests():
+        for chunk in audio:
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+    streaming_config = speech.StreamingRecognitionConfig(config=recognition_config(info), interim_results=True)
+    finals = []
+    with pool.slot():
+        responses = pool.client().streaming_recognize(
+            config=streaming_config, requests=requests(), timeout=settings.SPEECH_REQUEST_TIMEOUT
+        )
+        for response in responses:
+            for event in result_events(response):
+                if event['is_final']:
+                    finals.append(event['transcript'])
+                yield event
+
+    upload.store(finals)
+    yield {'done': True, 'transcriptions': finals, 'cache': 'miss'}
+
+
+async def astream_recognize(uploaded_file):
+    """
+    Async counterpart of ``stream_recognize`` for ASGI: the recognition runs on the
+    async client and reading and converting each chunk happens off the event loop.
+    """
+    chunk_size = settings.SPEECH_STREAM_CHUNK_SIZE
+    upload = StreamedUpload(uploaded_file, chunk_size)
+    cached = upload.cached()
+    if cached is not None:
+        for event in cached_events(cached):
+            yield event
+        return
+
+    info, head = await asyncio.to_thread(probe_stream, upload.chunks)
+    audio, info = linear16_stream(info, head, upload.chunks, chunk_size)
+    streaming_config = speech.StreamingRecognitionConfig(config=recognition_config(info), interim_results=True)
+
+    async def requests():
+        yield speech.StreamingRecognizeRequest(streaming_config=streaming_config)
+        while (chunk := await asyncio.to_thread(next, audio, None)) is not None:
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+    finals = []
+    async with pool.aslot() as client:
+        responses = await client.streaming_recognize(requests=requests(), timeout=settings.SPEECH_REQUEST_TIMEOUT)
+        async for response in responses:
+            for event in result_events(response):
+                if event['is_final']:
+                    finals.append(event['transcript'])
+                yield event
+
+    await asyncio.to_thread(upload.store, finals)
+    yield {'done': True, 'transcriptions': finals, 'cache': 'miss'}
+
+
+class StreamedUpload:
+    """
+    The chunks of an upload being streamed, and its transcription cache key.
+
+    An in-memory upload is hashed up front; anything else is hashed as ``chunks``
+    is consumed, so the file is only read once.
+    """
+
+    def __init__(self, uploaded_file, chunk_size):
+        self.key = self.digest = None
+        chunks = uploaded_file.chunks(chunk_size)
+        if hasattr(uploaded_file, 'temporary_file_path'):
+            self.digest = transcription_cache.digest(recognition_config())
+            chunks = self._hashed(chunks)
+        else:
+            self.key = transcription_cache.key(recognition_config(), uploaded_file.chunks(chunk_size))
+        self.chunks = chunks
+
+    def _hashed(self, chunks):
+        for chunk in chunks:
+            self.digest.update(chunk)
+            yield chunk
+
+    def cached(self):
+        return None if self.key is None else transcription_cache.get(self.key)
+
+    def store(self, transcriptions):
+        if self.key is None:
+            for _ in self.chunks:  # hash whatever follows the audio (e.g. trailing WAV chunks)
+                pass
+            self.key = self.digest.hexdigest()
+        transcription_cache.set(self.key, transcriptions)
+
+
+def cached_events(transcriptions):
+    for transcript in transcriptions:
+        yield {'transcript': transcript, 'is_final': True}
+    yield {'done': True, 'transcriptions': transcriptions, 'cache': 'hit'}
+
+
+def result_events(response):
+    for result in response.results:
+        if result.alternatives:
+            yield {'transcript': result.alternatives[0].transcript, 'is_final': result.is_final}
+
+
+def recognition_config(info=None):
+    """The recognition config for audio described by ``info`` (an AudioInfo); without it, the language settings only."""
+    return speech.RecognitionConfig(
+        language_code = settings.SPEECH_LANGUAGE_CODE,
+        **(info.config_kwargs() if info else {}),
+    )
+
+
+def transcripts(response):
+    return [result.alternatives[0].transcript for result in response.results]
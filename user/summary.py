@@ -0,0 +1,155 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Q, Sum
+from django.utils import timezone
+
+from user.models import Progress, ProgressSummary
+
+SUMMARY_FIELDS = ('status', 'score', 'time_spent')
+
+
+def summary_enabled():
+    return getattr(settings, 'PROGRESS_SUMMARY_MATERIALIZED', False)
+
+
+SUMMARY_AGGREGATES = {
+    'total_exercises': Count('id'),
+    'completed_exercises': Count('id', filter=Q(status='completed')),
+    'average_score': Avg('score'),
+    'average_time_spent': Avg('time_spent'),
+}
+
+
+def aggregate_progress_summary(user):
+    """The summary computed from Progress with a single conditional-aggregation query."""
+    return Progress.objects.filter(user_id=user.pk).aggregate(**SUMMARY_AGGREGATES)
+
+
+def get_progress_summary(user):
+    if not summary_enabled():
+        return aggregate_progress_summary(user)
+    summary = ProgressSummary.objects.filter(user_id=user.pk).first()
+    return (summary or ProgressSummary(user_id=user.pk)).as_dict()
+
+
+async def aget_progress_summary(user):
+    """Async ``get_progress_summary``."""
+    if not summary_enabled():
+        return await Progress.objects.filter(user_id=user.pk).aaggregate(**SUMMARY_AGGREGATES)
+    summary = await ProgressSummary.objects.filter(user_id=user.pk).afirst()
+    return (summary or ProgressSummary(user_id=user.pk)).as_dict()
+
+
+def apply_summary_change(user_id, old=None, new=None):
+    """
+    Fold one Progress write into the user's materialized summary.
+
+    ``old`` and ``new`` are dicts with the row's ``status``, ``score`` and
+    ``time_spent`` before and after the write; ``None`` means the row did not exist.
+    """
+    apply_summary_changes(user_id, [(old, new)])
+
+
+def apply_summary_changes(user_id, changes):
+    """Fold a batch of ``(old, new)`` Progress writes for one user into a single UPDATE."""
+    if not summary_enabled():
+        return
+
+    total, completed, score, time_spent, time_count = 0, 0, 0.0, timedelta(0), 0
+    for old, new in changes:
+        for values, sign in ((old, -1), (new, 1)):
+            if values is None:
+                continue
+            total += sign
+            completed += sign * (values['status'] == 'completed')
+            score += sign * (values['score'] or 0.0)
+            if values['time_spent'] is not None:
+                time_spent += sign * values['time_spent']
+                time_count += sign
+
+    deltas = {
+        'total_exercises': F('total_exercises') + total,
+        'completed_exercises': F('completed_exercises') + completed,
+        'score_sum': F('score_sum') + score,
+        'time_spent_sum': F('time_spent_sum') + time_spent,
+        'time_spent_count': F('time_spent_count') + time_count,
+        'updated_at': timezone.now(),
+    }
+    if not ProgressSummary.objects.filter(user_id=user_id).update(**deltas):
+        ProgressSummary.objects.get_or_create(user_id=user_id)
+        ProgressSummary.objects.filter(user_id=user_id).update(**deltas)
+
+
+def source_summaries(user_ids=None):
+    """Yield a ProgressSummary per user, computed from the Progress table in one grouped query."""
+    progress = Progress.objects.all()
+    if user_ids is not None:
+        progress = progress.filter(user_id__in=user_ids)
+
+    rows = progress.values('user_id').annotate(
+        total_exercises=Count('id'),
+        completed_exercises=Count('id', filter=Q(status='completed')),
+        score_sum=Sum('score'),
+        time_spent_sum=Sum('time_spent'),
+        time_spent_count=Count('time_spent'),
+    ).order_by('user_id')
+    for row in rows.iterator(chunk_size=2000):
+        yield ProgressSummary(
+            user_id=row['user_id'],
+            total_exercises=row['total_exercises'],
+            completed_exercises=row['completed_exercises'],
+            score_sum=row['score_sum'] or 0.0,
+            time_spent_sum=row['time_spent_sum'] or timedelta(0),
+            time_spent_count=row['time_spent_count'],
+        )
+
+
+def summaries_match(stored, expected):
+    return (
+        stored.total_exercises == expected.total_exercises
+        and stored.completed_exercises == expected.completed_exercises
+        and stored.time_spent_count == expected.time_spent_count
+        and stored.time_spent_sum == expected.time_spent_sum
+        and math.isclose(stored.score_sum, expected.score_sum, rel_tol=1e-9, abs_tol=1e-6)
+    )
+
+
+def check_progress_summaries(user_ids=None):
+    """
+    Compare the materialized summaries against the Progress table.
+
+    Returns ``(expected, stored)`` pairs for every user whose stored row is wrong;
+    ``stored`` is ``None`` when the row is missing. Rows for users without any
+    progress must be empty and are reported the same way.
+    """
+    stored_rows = ProgressSummary.objects.all()
+    if user_ids is not None:
+        stored_rows = stored_rows.filter(user_id__in=user_ids)
+    stored = {summary.user_id: summary for summary in stored_rows}
+
+    mismatches = []
+    for expected in source_summaries(user_ids):
+        current = stored.pop(expected.user_id, None)
+        if current is None or not summaries_match(current, expected):
+            mismatches.append((expected, current))
+    for current in stored.values():
+        expected = ProgressSummary(user_id=current.user_id)
+        if not summaries_match(current, expected):
+            mismatches.append((expected, current))
+    return mismatches
+
+
+def rebuild_progress_summaries(summaries, user_ids=()):
+    """
+    Overwrite the materialized rows with ``summaries`` (as produced by source_summaries).
+
+    Rows of ``user_ids`` that have no summary, i.e. users left without progress, are deleted.
+    """
+    summaries = list(summaries)
+    with transaction.atomic():
+        ProgressSummary.objects.filter(user_id__in={summary.user_id for summary in summaries} | set(user_ids)).delete()
+        ProgressSummary.objects.bulk_create(summaries, batch_size=1000)
+    return len(summaries)
@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import grpc
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from google.cloud import speech
+
+from user.middleware import get_query_budget
+
+
+class QueryBudgetTestMixin:
+    """
+    Assertions for ``TestCase`` subclasses that keep endpoints inside their query budget.
+
+    ``assertWithinQueryBudget`` seeds the data at each size in ``query_budget_sizes``,
+    requests the endpoint and fails if it runs more queries than the view declared
+    with ``query_budget``. An N+1 shows up as a failure at the larger size.
+    """
+
+    query_budget_sizes = (1, 100)
+
+    def assertWithinQueryBudget(self, path, seed, method='get', data=None, budget=None, client=None, **extra):
+        client = client or self.client
+        if budget is None:
+            budget = get_query_budget(resolve(urlsplit(path).path).func)
+        if budget is None:
+            self.fail(f"{path} does not declare a query budget.")
+
+        counts = {}
+        for size in self.query_budget_sizes:
+            with transaction.atomic():
+                seed(size)
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(client, method)(path, data, **extra)
+                transaction.set_rollback(True)
+
+            self.assertLess(response.status_code, 400, f"{method.upper()} {path} failed with N={size}: {response.status_code}")
+            counts[size] = len(queries)
+            if len(queries) > budget:
+                statements = '\n'.join(query['sql'] for query in queries.captured_queries)
+                self.fail(
+                    f"{method.upper()} {path} ran {len(queries)} queries with N={size} (budget {budget}):\n{statements}"
+                )
+        return counts
+
+
+class FakeSpeechServer:
+    """
+    A plaintext gRPC server implementing ``google.cloud.speech.v1.Speech`` with a canned transcript.
+
+    Use it with ``override_settings(SPEECH_API_ENDPOINT=server.endpoint, SPEECH_API_INSECURE=True)``
+    and ``user.speech.pool.reset()``. Received requests are kept in ``requests``.
+    """
+
+    SERVICE = 'google.cloud.speech.v1.Speech'
+
+    def __init__(self, transcript='hello', delay=0):
+        self.transcript = transcript
+        self.delay = delay
+        self.requests = []
+        self.server = None
+        self.port = None
+
+    @property
+    def endpoint(self):
+        return f'localhost:{self.port}'
+
+    def recognize(self, request, context):
+        self.requests.append(request)
+        if self.delay:
+            time.sleep(self.delay)
+        return speech.RecognizeResponse(results=[
+            speech.SpeechRecognitionResult(alternatives=[speech.SpeechRecognitionAlternative(transcript=self.transcript)])
+        ])
+
+    def streaming_recognize(self, request_iterator, context):
+        # One interim result per audio chunk, then the final transcript.
+        for request in request_iterator:
+            self.requests.append(request)
+            if 'audio_content' in request:
+                yield speech.StreamingRecognizeResponse(results=[speech.StreamingRecognitionResult(
+                    alternatives=[speech.SpeechRecognitionAlternative(transcript=self.transcript[:len(self.requests)])],
+                    is_final=False,
+                )])
+        yield speech.StreamingRecognizeResponse(results=[speech.StreamingRecognitionResult(
+            alternatives=[speech.SpeechRecognitionAlternative(transcript=self.transcript)],
+            is_final=True,
+        )])
+
+    def start(self):
+        self.server = grpc.server(ThreadPoolExecutor(max_workers=8))
+        handler = grpc.method_handlers_generic_handler(self.SERVICE, {
+            'Recognize': grpc.unary_unary_rpc_method_handler(
+                self.recognize,
+                request_deserializer=speech.RecognizeRequest.deserialize,
+                response_serializer=speech.RecognizeResponse.serialize,
+            ),
+            'StreamingRecognize': grpc.stream_stream_rpc_method_handler(
+                self.streaming_recognize,
+                request_deserializer=speech.StreamingRecognizeRequest.deserialize,
+                response_serializer=speech.StreamingRecognizeResponse.serialize,
+            ),
+        })
+        self.server.add_generic_rpc_handlers((handler,))
+        self.port = self.server.add_insecure_port('localhost:0')
+        self.server.start()
+        return self
+
+    def stop(self):
+        self.server.stop(grace=None)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,3 +1,807 @@
-from django.test import TestCase
+import asyncio
+import io
+import struct
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from cachetools import TTLCache
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework import generics
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+from sklearn.ensemble import RandomForestClassifier
+
+from user import audio, speech
+from user.answer_keys import compile_answers, verify_against_key
+from user.authentication import ClaimsJWTAuthentication, UserStateCache
+from user.ingest import apply_progress_deltas, insert_missing_progress
+from user.matching import ratio, verify_answers
+from user.models import AnswerKey, Exercise, Profile, Progress, ProgressSummary, TextContent, UserFeatures
+from user.readability import analyze, grade_range
+from user.recommender import FEATURES, STATUS_CLASSES, score_users
+from user.roster import RosterImport, read_roster
+from user.sampling import exercise_ids, sample_exercise
+from user.serializers import CustomTokenObtainPairSerializer
+from user.summary import aggregate_progress_summary, check_progress_summaries, get_progress_summary, rebuild_progress_summaries, source_summaries
+from user.utils import get_next_difficulty, get_recent_scores
+from user.testing import FakeSpeechServer, QueryBudgetTestMixin
+from user.views import RegisterSerializer
+
+
+def tone(rate, seconds=0.5, lead=0.25, amplitude=0.5):
+    """A 440 Hz tone between stretches of silence, as float samples."""
+    t = np.arange(int(seconds * rate)) / rate
+    silence = np.zeros(int(lead * rate))
+    return np.concatenate([silence, amplitude * np.sin(2 * np.pi * 440 * t), silence])
+
+
+def wav_file(samples, rate=44100, channels=2, width=1, format_tag=audio.WAVE_FORMAT_PCM, before=b'', after=b''):
+    """
+    WAV bytes built chunk by chunk, so tests can put arbitrary chunks (``before``
+    and ``after`` the data chunk) and format tags in the header.
+    """
+    frames = np.repeat(samples[:, None], channels, axis=1)
+    if width == 1:
+        data = (frames * 127 + 128).astype(np.uint8).tobytes()
+    else:
+        data = (frames * 32767).astype('<i2').tobytes()
+    fmt = struct.pack('<HHIIHH', format_tag, channels, rate, rate * channels * width, channels * width, width * 8)
+    body = b'WAVE' + chunk(b'fmt ', fmt) + before + chunk(b'data', data) + after
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def chunk(chunk_id, payload):
+    return chunk_id + struct.pack('<I', len(payload)) + payload + b'\0' * (len(payload) & 1)
+
+
+def metadata(size):
+    return chunk(b'LIST', b'INFO' + b'x' * (size - 4))
+
+
+def pieces(data, size):
+    return iter([data[start:start + size] for start in range(0, len(data), size)])
+
+
+class ProbeTests(SimpleTestCase):
+    def test_stereo_8_bit(self):
+        info = audio.probe(wav_file(tone(44100)))
+        self.assertEqual((info.container, info.sample_rate, info.channels, info.sample_width), ('wav', 44100, 2, 1))
+        self.assertEqual(info.data_offset, 44)
+        self.assertEqual(info.encoding, audio.Encoding.LINEAR16)
+
+    def test_large_metadata_chunk(self):
+        data = wav_file(tone(44100), before=metadata(64 * 1024))
+        self.assertEqual(audio.probe(data[:4096]).data_offset, 0)
+        info = audio.probe(data)
+        self.assertEqual(info.data_offset, 36 + 8 + 64 * 1024 + 8)
+        self.assertEqual(data[info.data_offset - 8:info.data_offset - 4], b'data')
+
+    def test_rejects_non_pcm(self):
+        with self.assertRaises(audio.UnsupportedAudio):
+            audio.probe(wav_file(tone(16000), format_tag=3))  # IEEE float
+
+    def test_probe_stream_reads_past_metadata(self):
+        data = wav_file(tone(44100), before=metadata(64 * 1024))
+        info, head = audio.probe_stream(pieces(data, 4096))
+        self.assertEqual(info.data_offset, audio.probe(data).data_offset)
+        self.assertTrue(data.startswith(head))
+
+    def test_probe_stream_limit(self):
+        data = wav_file(tone(16000), before=metadata(64 * 1024))
+        with self.assertRaises(audio.UnsupportedAudio):
+            audio.probe_stream(pieces(data, 4096), limit=16 * 1024)
+
+
+@override_settings(SPEECH_PREPROCESS=True)
+class PreprocessTests(SimpleTestCase):
+    def test_stereo_44k_8_bit_with_metadata(self):
+        content, info = audio.prepare_audio(wav_file(tone(44100), before=metadata(64 * 1024), after=metadata(512)))
+        self.assertEqual((info.sample_rate, info.channels), (audio.TARGET_SAMPLE_RATE, 1))
+        samples = np.frombuffer(content, '<i2') / 32767
+        # The tone plus at most the silence padding either side; the trailing chunk is not audio.
+        self.assertLess(abs(len(samples) / audio.TARGET_SAMPLE_RATE - 0.9), 0.05)
+        self.assertAlmostEqual(np.abs(samples).max(), 0.5, delta=0.03)
+
+    def test_silence(self):
+        content, _ = audio.prepare_audio(wav_file(tone(44100, amplitude=0)))
+        self.assertEqual(content, b'')
+
+
+class Linear16StreamTests(SimpleTestCase):
+    def stream(self, data, chunk_size=4096):
+        chunks = pieces(data, chunk_size)
+        info, head = audio.probe_stream(chunks)
+        return audio.linear16_stream(info, head, chunks, chunk_size)
+
+    def test_converts_stereo_8_bit(self):
+        samples = tone(44100)
+        chunks, info = self.stream(wav_file(samples, before=metadata(64 * 1024), after=metadata(512)))
+        chunks = list(chunks)
+        self.assertEqual((info.encoding, info.sample_rate, info.channels), (audio.Encoding.LINEAR16, 44100, 1))
+        self.assertTrue(all(len(piece) <= 4096 for piece in chunks))
+        converted = np.frombuffer(b''.join(chunks), '<i2') / 32767
+        self.assertEqual(len(converted), len(samples))
+        self.assertLess(np.abs(converted - samples).max(), 0.02)  # 8-bit quantization
+
+    def test_mono_16_bit_passes_through(self):
+        data = wav_file(tone(16000), rate=16000, channels=1, width=2, after=metadata(512))
+        chunks, info = self.stream(data)
+        offset = audio.probe(data).data_offset
+        self.assertEqual(b''.join(chunks), data[offset:len(data) - len(metadata(512))])
+        self.assertEqual(info.channels, 1)
+
+
+class StreamRecognizeTests(SimpleTestCase):
+    def test_cache_key_covers_preprocessing(self):
+        config, data = speech.recognition_config(), wav_file(tone(16000), rate=16000, channels=1, width=2)
+        key = speech.TranscriptionCache.key(config, data)
+        self.assertEqual(speech.TranscriptionCache.key(config, pieces(data, 100)), key)
+        for changed in ({'SPEECH_PREPROCESS': False}, {'SPEECH_SILENCE_THRESHOLD_DB': -30}, {'SPEECH_SILENCE_PADDING_MS': 0}):
+            with self.subTest(**changed), override_settings(**changed):
+                self.assertNotEqual(speech.TranscriptionCache.key(config, data), key)
+
+    def test_streams_converted_samples(self):
+        data = wav_file(tone(44100), before=metadata(64 * 1024))
+        with FakeSpeechServer('hello there') as server, override_settings(
+            SPEECH_API_ENDPOINT=server.endpoint, SPEECH_API_INSECURE=True, SPEECH_STREAM_CHUNK_SIZE=4096,
+        ):
+            speech.pool.reset()
+            speech.transcription_cache.clear()
+            try:
+                events = list(speech.stream_recognize(SimpleUploadedFile('a.wav', data, 'audio/wav')))
+            finally:
+                speech.pool.reset()
+
+        self.assertEqual(events[-1]['transcriptions'], ['hello there'])
+        config = server.requests[0].streaming_config.config
+        self.assertEqual((config.encoding, config.sample_rate_hertz, config.audio_channel_count), (audio.Encoding.LINEAR16, 44100, 1))
+        sent = b''.join(request.audio_content for request in server.requests[1:])
+        self.assertEqual(len(sent), len(tone(44100)) * 2)
+
+    def test_async_stream_matches_sync(self):
+        data = wav_file(tone(44100), before=metadata(64 * 1024))
+
+        async def collect():
+            return [event async for event in speech.astream_recognize(SimpleUploadedFile('a.wav', data, 'audio/wav'))]
+
+        with FakeSpeechServer('hello there') as server, override_settings(
+            SPEECH_API_ENDPOINT=server.endpoint, SPEECH_API_INSECURE=True, SPEECH_STREAM_CHUNK_SIZE=4096,
+        ):
+            speech.pool.reset()
+            speech.transcription_cache.clear()
+            try:
+                events = asyncio.run(collect())
+                cached = asyncio.run(collect())
+            finally:
+                speech.pool.reset()
+
+        self.assertEqual((events[-1]['transcriptions'], events[-1]['cache']), (['hello there'], 'miss'))
+        self.assertEqual((cached[-1]['transcriptions'], cached[-1]['cache']), (['hello there'], 'hit'))
+        sent = b''.join(request.audio_content for request in server.requests[1:])
+        self.assertEqual(len(sent), len(tone(44100)) * 2)
+
+    def test_spooled_upload_is_hashed_while_streaming(self):
+        data = wav_file(tone(16000), rate=16000, channels=1, width=2, after=metadata(512))
+        upload = TemporaryUploadedFile('a.wav', 'audio/wav', len(data), None)
+        upload.write(data)
+        upload.seek(0)
+        with FakeSpeechServer('hello there') as server, override_settings(
+            SPEECH_API_ENDPOINT=server.endpoint, SPEECH_API_INSECURE=True, SPEECH_STREAM_CHUNK_SIZE=4096,
+        ):
+            speech.pool.reset()
+            speech.transcription_cache.clear()
+            try:
+                events = list(speech.stream_recognize(upload))
+            finally:
+                speech.pool.reset()
+                upload.close()
+
+        self.assertEqual(events[-1]['cache'], 'miss')
+        stats = speech.transcription_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (0, 0, 1))
+        # Keyed on the whole upload, as the non-streaming endpoint keys it.
+        self.assertEqual(speech.recognize_content(data), (['hello there'], True))
+
+
+@override_settings(SPEECH_CLIENT_POOL_SIZE=2, SPEECH_MAX_CONCURRENT_REQUESTS=1, SPEECH_QUEUE_TIMEOUT=0.05)
+class SpeechClientPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = speech.SpeechClientPool()
+        # Stand-in clients: only their identity matters here.
+        self.build_client = mock.patch.object(self.pool, '_build_client', side_effect=object).start()
+        self.build_async_client = mock.patch.object(self.pool, '_build_async_client', side_effect=object).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_clients_are_shared_round_robin(self):
+        clients = [self.pool.client() for _ in range(4)]
+        self.assertEqual(self.build_client.call_count, 2)
+        self.assertIsNot(clients[0], clients[1])
+        self.assertEqual(clients[2:], clients[:2])
+
+    def test_callers_beyond_the_limit_get_busy(self):
+        with self.pool.slot():
+            with self.assertRaises(speech.SpeechBusy):
+                with self.pool.slot():
+                    pass
+        with self.pool.slot():
+            pass
+
+    def test_async_slots(self):
+        async def run():
+            async with self.pool.aslot() as first:
+                with self.assertRaises(speech.SpeechBusy):
+                    async with self.pool.aslot():
+                        pass
+            async with self.pool.aslot() as second:
+                return first, second
+
+        first, second = asyncio.run(run())
+        self.assertIsNot(first, second)
+        self.assertEqual(self.build_async_client.call_count, 2)
+
+
+class MatchScoreTests(SimpleTestCase):
+    def test_scores_below_the_threshold_are_reported(self):
+        score = ratio('butterfly', 'bird')
+        self.assertTrue(0 < score < 80)
+        self.assertEqual(verify_answers([('butterfly', 'bird')], cutoff=80), [{'match_score': score, 'match': False}])
+
+        key = SimpleNamespace(exercise_type='blanks', answers=compile_answers('blanks', [{'answer': 'butterfly'}]))
+        results, total = verify_against_key(key, ['bird'], cutoff=80)
+        self.assertEqual((results, total), ([{'index': 0, 'match_score': score, 'match': False}], 1))
+
+
+class ProgressReportQueryTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'Reader-passw0rd!')
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def seed(self, size):
+        exercises = Exercise.objects.bulk_create([
+            Exercise(title=f'Exercise {n}', description='', exercise_content=[], difficulty_level=1) for n in range(size)
+        ])
+        Progress.objects.bulk_create([
+            Progress(user=self.user, exercise=exercise, status='completed', score=80, time_spent=timedelta(seconds=30))
+            for exercise in exercises
+        ])
+
+    def test_report_queries_do_not_grow_with_rows(self):
+        counts = self.assertWithinQueryBudget('/api/progress/report/', self.seed, **self.auth)
+        self.assertLessEqual(counts[100], counts[1])
+
+
+class ProgressIngestTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'Reader-passw0rd!')
+        self.exercises = Exercise.objects.bulk_create([
+            Exercise(title=f'Exercise {n}', description='', exercise_content=[], difficulty_level=1) for n in range(3)
+        ])
+
+    def delta(self, seconds, **fields):
+        return {'time_spent': timedelta(seconds=seconds), **fields}
+
+    def test_created_comes_from_the_insert(self):
+        first, second, third = (exercise.pk for exercise in self.exercises)
+        # A row another writer inserted after this batch's reads started.
+        Progress.objects.bulk_create([Progress(user=self.user, exercise_id=first, status='in_progress', time_spent=timedelta(0))])
+        self.assertEqual(insert_missing_progress(self.user.pk, {first: self.delta(1), second: self.delta(1)}), {second})
+
+        applied = apply_progress_deltas(self.user.pk, {first: self.delta(5), second: self.delta(5), third: self.delta(5, score=90)})
+        self.assertEqual({exercise_id: created for exercise_id, (_, created) in applied.items()}, {first: False, second: False, third: True})
+        self.assertEqual(applied[third][0].score, 90)
+        self.assertEqual(applied[first][0].time_spent, timedelta(seconds=5))
+
+    def test_features_count_each_row_once(self):
+        exercise_id = self.exercises[0].pk
+        apply_progress_deltas(self.user.pk, {exercise_id: self.delta(5, score=50)})
+        apply_progress_deltas(self.user.pk, {exercise_id: self.delta(5, score=70)})
+        features = UserFeatures.objects.get(user=self.user)
+        self.assertEqual((features.progress_count, features.score_sum), (1, 70))
+
+
+@override_settings(PROGRESS_SUMMARY_MATERIALIZED=True)
+class ProgressSummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'Reader-passw0rd!')
+        self.exercise = Exercise.objects.create(title='Rhymes', description='d', exercise_content=[], difficulty_level=1)
+
+    def test_writes_keep_the_summary_equal_to_the_live_aggregate(self):
+        other = User.objects.create_user('other', 'other@example.com', 'Other-passw0rd!')
+        exercises = [self.exercise, *(
+            Exercise.objects.create(title=f'Exercise {n}', description='d', exercise_content=[], difficulty_level=1) for n in range(3)
+        )]
+        first = Progress.objects.create(user=self.user, exercise=exercises[0], score=40, status='in_progress', time_spent=timedelta(seconds=30))
+        second = Progress.objects.create(user=self.user, exercise=exercises[1], score=0, status='not_started', time_spent=None)
+        Progress.objects.create(user=other, exercise=exercises[0], score=100, status='completed', time_spent=timedelta(seconds=5))
+
+        first.score, first.status = 85, 'completed'
+        first.save()
+        # Saved without its previous values: the user is recomputed from the table.
+        Progress(pk=second.pk, user=self.user, exercise=exercises[1], score=60, status='in_progress', time_spent=timedelta(seconds=12)).save()
+        apply_progress_deltas(self.user.pk, {
+            exercises[2].pk: {'time_spent': timedelta(seconds=20), 'score': 70, 'status': 'completed'},
+            exercises[1].pk: {'time_spent': timedelta(seconds=8)},
+        })
+        Progress.objects.create(user=self.user, exercise=exercises[3], score=10, status='in_progress').delete()
+
+        for user in (self.user, other):
+            live, stored = aggregate_progress_summary(user), get_progress_summary(user)
+            self.assertEqual((stored['total_exercises'], stored['completed_exercises']), (live['total_exercises'], live['completed_exercises']))
+            self.assertAlmostEqual(stored['average_score'], live['average_score'])
+            self.assertEqual(stored['average_time_spent'], live['average_time_spent'])
+        self.assertEqual(check_progress_summaries(), [])
+
+    def test_rebuild_drops_users_left_without_progress(self):
+        # A summary left behind for a user whose progress is gone.
+        ProgressSummary.objects.update_or_create(user=self.user, defaults={'total_exercises': 1, 'score_sum': 80.0})
+
+        self.assertEqual(rebuild_progress_summaries(source_summaries([self.user.pk]), user_ids=[self.user.pk]), 0)
+        self.assertFalse(ProgressSummary.objects.filter(user=self.user).exists())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('reader', 'reader@example.com', 'Reader-passw0rd!')
+        self.auth = f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'
+        exercises = Exercise.objects.bulk_create([
+            Exercise(title=f'Exercise {n}', description='', exercise_content=[], difficulty_level=1) for n in range(7)
+        ])
+        rows = Progress.objects.bulk_create([Progress(user=user, exercise=exercise, score=50) for exercise in exercises])
+        # The last four rows share a timestamp, so pages must break ties on id.
+        now = timezone.now()
+        for n, row in enumerate(rows):
+            Progress.objects.filter(pk=row.pk).update(last_updated=now - timedelta(seconds=min(n, 3)))
+        self.expected = list(Progress.objects.order_by('-last_updated', '-id').values_list('id', flat=True))
+
+    def get(self, path):
+        response = self.client.get(path, HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_cover_every_row_once_in_order(self):
+        seen, path = [], '/api/progress/?page_size=2'
+        while path:
+            page = self.get(path)
+            self.assertLessEqual(len(page['results']), 2)
+            seen += [row['id'] for row in page['results']]
+            path = page['next']
+        self.assertEqual(seen, self.expected)
+
+    def test_unpaginated_by_default_and_bad_cursor_is_404(self):
+        self.assertEqual(len(self.get('/api/progress/')), len(self.expected))
+        response = self.client.get('/api/progress/?cursor=bm90LWEtY3Vyc29y', HTTP_AUTHORIZATION=self.auth)
+        self.assertEqual(response.status_code, 404)
+
+
+class TextSegmentTests(TestCase):
+    def test_segment_of_a_text_edited_between_reads(self):
+        text = TextContent.objects.create(title='Story', topic='animals', body='The cat sat. ' * 400)
+        stale = TextContent.objects.only('id', 'title', 'updated_at', 'segment_offsets').get(pk=text.pk)
+        text.body = 'A dog ran. ' * 400
+        text.save()
+
+        with mock.patch.object(generics.GenericAPIView, 'get_object', return_value=stale):
+            response = self.client.get(f'/api/text-content/{text.pk}/segments/0/')
+        start, end = text.segment_offsets[0]
+        self.assertEqual(response.json()['text'], text.body[start:end])
+
+
+class SamplingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'Reader-passw0rd!')
+
+    def exercise(self, level=1, style='visual'):
+        return Exercise.objects.create(title='e', description='d', exercise_content=[], difficulty_level=level, learning_style=style)
+
+    def test_draws_respect_filters_and_completed_progress(self):
+        done, open_, other_style = self.exercise(), self.exercise(), self.exercise(style='auditory')
+        self.exercise(level=2)
+        Progress.objects.create(user=self.user, exercise=done, status='completed', score=90)
+        draws = {sample_exercise(1, 'visual', exclude_completed_by=self.user).pk for _ in range(20)}
+        self.assertEqual(draws, {open_.pk})
+        self.assertEqual({sample_exercise(1).pk for _ in range(50)}, {done.pk, open_.pk, other_style.pk})
+
+        Progress.objects.create(user=self.user, exercise=open_, status='completed', score=90)
+        self.assertIsNone(sample_exercise(1, 'visual', exclude_completed_by=self.user))
+        self.assertIsNone(sample_exercise(3))
+
+    def test_cached_ids_follow_exercise_writes(self):
+        first = self.exercise(level=3)
+        self.assertEqual(exercise_ids(3), [first.pk])
+        with self.assertNumQueries(0):
+            exercise_ids(3)
+        second = self.exercise(level=3)
+        first.delete()
+        self.assertEqual(exercise_ids(3), [second.pk])
+        self.assertEqual(sample_exercise(3), second)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.exercise = Exercise.objects.create(title='Rhymes', description='d', exercise_content=[], difficulty_level=1)
+
+    def get(self, path='/api/exercises/', **headers):
+        return self.client.get(path, headers=headers)
+
+    def test_repeat_get_is_a_hit_and_revalidates(self):
+        first, second = self.get(), self.get()
+        self.assertEqual((first['X-Catalog-Cache'], second['X-Catalog-Cache']), ('miss', 'hit'))
+        self.assertEqual((second.json(), second['ETag']), (first.json(), first['ETag']))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(**{'If-None-Match': first['ETag']}).status_code, 304)
+
+    def test_writes_invalidate_the_list(self):
+        detail = f'/api/exercises/{self.exercise.pk}/'
+        etag = self.get()['ETag']
+        self.get(detail)
+        writes = [
+            lambda: self.client.post('/api/exercises/', {'title': 'Blends', 'description': 'd', 'exercise_content': ['cat', 'hat'], 'difficulty_level': 2}, content_type='application/json'),
+            lambda: self.client.put(detail, {'title': 'Rhyming pairs', 'description': 'd', 'exercise_content': ['cat'], 'difficulty_level': 1}, content_type='application/json'),
+            lambda: self.client.delete(detail),
+        ]
+        for write in writes:
+            self.assertLess(write().status_code, 300)
+            response = self.get(**{'If-None-Match': etag})
+            self.assertEqual((response.status_code, response['X-Catalog-Cache']), (200, 'miss'))
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+        self.assertEqual([row['title'] for row in response.json()['data']], ['Blends'])
+        self.assertFalse(self.get(detail).json()['success'])  # the deleted exercise's cached detail is gone too
+
+
+class ReadabilityTests(TestCase):
+    def test_flesch_kincaid_grade(self):
+        # 5 words, 10 syllables, 1 sentence: 0.39 * 5 + 11.8 * 2 - 15.59
+        metrics = analyze('Reading is a wonderful adventure.')
+        self.assertEqual((metrics['word_count'], metrics['syllable_count'], metrics['grade_level']), (5, 10, 9.96))
+        self.assertEqual(analyze('The cat sat on the mat.')['grade_level'], 0.0)
+
+    def test_grade_range(self):
+        self.assertEqual(grade_range(' Intermediate '), (3.0, 6.0))
+        self.assertEqual(grade_range('grade 3.5'), (2.5, 4.5))
+        self.assertEqual(grade_range('0'), (0.0, 1.0))
+        self.assertIsNone(grade_range('fluent'))
+        self.assertIsNone(grade_range(None))
+
+    def test_for_me_filters_by_the_profile_reading_level(self):
+        texts = {}
+        for grade in (1.5, 4.5, 8.0):
+            texts[grade] = TextContent.objects.create(title=f'Grade {grade}', body='The cat sat.')
+            TextContent.objects.filter(pk=texts[grade].pk).update(grade_level=grade)
+        user = User.objects.create_user('reader', 'reader@example.com', 'Reader-passw0rd!')
+        for reading_level, expected in (('elementary', [1.5]), ('grade 4', [4.5]), ('advanced', [8.0])):
+            user.profile.reading_level = reading_level
+            user.profile.save()
+            token = CustomTokenObtainPairSerializer.get_token(user).access_token
+            response = self.client.get('/api/text-content/for-me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([result['id'] for result in response.json()['results']], [texts[grade].pk for grade in expected])
+
+
+class SearchTests(TestCase):
+    def search(self, q):
+        response = self.client.get('/api/text-content/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_index_follows_writes(self):
+        text = TextContent.objects.create(title='Pond life', topic='animals', body='A <b>frog</b> sat by the pond.')
+        [result] = self.search('frog')
+        self.assertEqual(result['id'], text.pk)
+        self.assertEqual(result['snippet'], 'A &lt;b&gt;<mark>frog</mark>&lt;/b&gt; sat by the pond.')
+
+        text.body = 'A toad sat by the pond.'
+        text.save()
+        self.assertEqual(self.search('frog'), [])
+        self.assertEqual([result['id'] for result in self.search('toad')], [text.pk])
+
+        text.delete()
+        self.assertEqual(self.search('toad'), [])
+
+
+class RecentScoresTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'Reader-passw0rd!')
+        self.exercises = Exercise.objects.bulk_create([
+            Exercise(title=f'Exercise {n}', description='', exercise_content=[], difficulty_level=1) for n in range(6)
+        ])
+
+    def record(self, exercise, score):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Progress.objects.create(user=self.user, exercise=exercise, status='completed', score=score)
+
+    def test_window_is_cached_and_dropped_on_writes(self):
+        for exercise, score in zip(self.exercises, (10, 90, 90, 90, 90)):
+            self.record(exercise, score)
+        self.assertEqual(get_recent_scores(self.user.pk), [10, 90, 90, 90, 90])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_next_difficulty(self.user), 2)
+
+        progress = self.record(self.exercises[5], 0)
+        self.assertEqual(get_recent_scores(self.user.pk), [90, 90, 90, 90, 0])
+        with self.captureOnCommitCallbacks(execute=True):
+            progress.delete()
+        self.assertEqual(get_recent_scores(self.user.pk), [10, 90, 90, 90, 90])
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'Reader-passw0rd!', is_staff=True)
+        self.refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        self.token = self.refresh.access_token
+        self.now = [0]
+        self.states = UserStateCache()
+        self.states._entries = TTLCache(maxsize=10, ttl=60, timer=lambda: self.now[0])
+        for target in ('user.authentication.user_states', 'user.signals.user_states'):
+            patcher = mock.patch(target, self.states)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get(self, token):
+        return self.client.get('/api/progress/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_password_change_revokes_tokens(self):
+        self.assertEqual(self.get(self.token).status_code, 200)
+        self.user.set_password('Changed-passw0rd!')
+        self.user.save()
+        response = self.get(self.token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], "The user's password has been changed.")
+
+    def test_state_changes_elsewhere_apply_after_the_ttl(self):
+        authentication = ClaimsJWTAuthentication()
+        self.assertTrue(authentication.get_user(self.token).is_staff)
+        # Another process changes the row, so this process's entry is not dropped.
+        User.objects.filter(pk=self.user.pk).update(is_staff=False)
+        self.assertTrue(authentication.get_user(self.token).is_staff)
+        self.now[0] += 61
+        self.assertFalse(authentication.get_user(self.token).is_staff)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get(self.token).status_code, 200)
+        self.now[0] += 61
+        response = self.get(self.token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['detail'], 'User is inactive')
+
+    def test_refresh_carries_the_current_profile(self):
+        self.user.profile.reading_level = 'advanced'
+        self.user.profile.save()
+        response = self.client.post('/api/token/refresh/', {'refresh': str(self.refresh)}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.json()['access'])['profile']['reading_level'], 'advanced')
+        self.assertEqual(self.get(response.json()['access']).status_code, 200)
+
+    def test_tampered_or_expired_token_is_rejected(self):
+        header, payload, signature = str(self.token).split('.')
+        tampered = '.'.join([header, payload, signature[:-4] + ('AAAA' if signature[-4:] != 'AAAA' else 'BBBB')])
+        expired = AccessToken(str(self.token))
+        expired.set_exp(lifetime=-timedelta(seconds=1))
+        for token in (tampered, expired):
+            response = self.get(token)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.json()['code'], 'token_not_valid')
+        with self.assertRaises(AuthenticationFailed):
+            ClaimsJWTAuthentication().get_validated_token(tampered)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('learner', 'learner@example.com', 'Learner-passw0rd!')
+        self.token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.auth = {'Authorization': f'Bearer {self.token}'}
+        self.exercise = Exercise.objects.create(title='Rhymes', description='d', exercise_content=[], difficulty_level=1)
+
+    async def test_authentication_failures_match_drf(self):
+        expired = AccessToken(str(self.token))
+        expired.set_exp(lifetime=-timedelta(seconds=1))
+        for headers in ({}, {'Authorization': f'Bearer {expired}'}):
+            drf = await self.async_client.get('/api/progress/', headers=headers)
+            response = await self.async_client.get('/api/progress/async/', headers=headers)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.json(), drf.json())
+            self.assertEqual(response['WWW-Authenticate'], drf['WWW-Authenticate'])
+
+    async def test_update_adds_time_and_validates_the_exercise(self):
+        await Progress.objects.acreate(user=self.user, exercise=self.exercise, score=50, status='in_progress', time_spent=None)
+        response = await self.async_client.put(
+            '/api/progress/update/async/', {'exercise': self.exercise.pk, 'time_spent': 30, 'score': 70},
+            content_type='application/json', headers=self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+        progress = await Progress.objects.aget(user=self.user, exercise=self.exercise)
+        self.assertEqual((progress.time_spent, progress.score), (timedelta(seconds=30), 70))
+
+        for exercise in ('abc', [1], 10 ** 6):
+            response = await self.async_client.put(
+                '/api/progress/update/async/', {'exercise': exercise, 'time_spent': 5},
+                content_type='application/json', headers=self.auth,
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('exercise', response.json())
+
+    async def test_summary_and_next_exercise_match_drf(self):
+        await Progress.objects.acreate(user=self.user, exercise=self.exercise, score=90, status='completed', time_spent=timedelta(seconds=40))
+        for level in (2, 3):  # one exercise per level, so both views must pick the same one
+            await Exercise.objects.acreate(title=f'Level {level}', description='d', exercise_content=[], difficulty_level=level)
+        for path in ('/api/progress/summary/', '/api/exercises/next/'):
+            drf = await self.async_client.get(path, headers=self.auth)
+            response = await self.async_client.get(path + 'async/', headers=self.auth)
+            self.assertEqual((response.status_code, response.json()), (drf.status_code, drf.json()))
+        self.assertEqual(response.status_code, 200)
+
+    async def test_speech_to_text(self):
+        upload = SimpleUploadedFile('a.wav', wav_file(tone(16000), rate=16000, channels=1, width=2), 'audio/wav')
+        with FakeSpeechServer('hello there') as server, override_settings(
+            SPEECH_API_ENDPOINT=server.endpoint, SPEECH_API_INSECURE=True,
+        ):
+            speech.pool.reset()
+            speech.transcription_cache.clear()
+            try:
+                response = await self.async_client.post('/api/speech-to-text/async/', {'audio': upload}, headers=self.auth)
+            finally:
+                speech.pool.reset()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['transcriptions'], response['X-Transcription-Cache']), (['hello there'], 'miss'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RegistrationTests(TestCase):
+    def data(self, username, email):
+        return {'username': username, 'email': email, 'password': 'Register-passw0rd!', 'first_name': 'A', 'last_name': 'B'}
+
+    def test_uniqueness_is_checked_in_one_query(self):
+        User.objects.create_user('taken', 'taken@example.com', 'Taken-passw0rd!')
+        cases = [
+            (self.data('taken', 'taken@example.com'), {'username', 'email'}),
+            (self.data('taken', 'free@example.com'), {'username'}),
+            (self.data('free', 'taken@example.com'), {'email'}),
+            (self.data('free', 'free@example.com'), set()),
+        ]
+        for data, errors in cases:
+            serializer = RegisterSerializer(data=data)
+            with self.assertNumQueries(1):
+                self.assertEqual(serializer.is_valid(), not errors)
+            self.assertEqual(set(serializer.errors), errors)
+
+    def test_register_creates_user_and_profile(self):
+        response = self.client.post('/api/register/', self.data('new', 'new@example.com'), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Profile.objects.filter(user__username='new', user__email='new@example.com').exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RosterImportTests(TestCase):
+    ROSTER = (
+        'username,email,password,reading_level\n'
+        'amy,amy@example.com,Roster-passw0rd!,beginner\n'
+        'ben,not-an-email,Roster-passw0rd!,\n'
+        'amy,amy2@example.com,Roster-passw0rd!,\n'
+        'cal,taken@example.com,Roster-passw0rd!,\n'
+    )
+
+    def setUp(self):
+        User.objects.create_user('existing', 'taken@example.com', 'Existing-passw0rd!')
+
+    def rows(self, text=ROSTER):
+        return read_roster(io.StringIO(text))
+
+    def test_per_row_errors(self):
+        summary = RosterImport(workers=1).run(self.rows())
+        self.assertEqual((summary['processed'], summary['created'], summary['failed']), (4, 1, 3))
+        self.assertEqual(
+            [(error['line'], sorted(error['errors'])) for error in summary['errors']],
+            [(3, ['email']), (4, ['username']), (5, ['email'])],
+        )
+        self.assertEqual(User.objects.get(username='amy').profile.reading_level, 'beginner')
+
+    def test_dry_run_creates_nobody(self):
+        summary = RosterImport(workers=1, dry_run=True).run(self.rows())
+        self.assertEqual((summary['created'], summary['failed']), (0, 3))
+        self.assertFalse(User.objects.filter(username='amy').exists())
+
+    @override_settings(ROSTER_UPLOAD_MAX_ROWS=3)
+    def test_upload_is_capped(self):
+        admin = User.objects.create_user('admin', 'admin@example.com', 'Admin-passw0rd!', is_staff=True)
+        auth = f'Bearer {CustomTokenObtainPairSerializer.get_token(admin).access_token}'
+        upload = SimpleUploadedFile('roster.csv', self.ROSTER.encode(), 'text/csv')
+        response = self.client.post('/api/admin/roster-import/', {'roster': upload}, HTTP_AUTHORIZATION=auth)
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(User.objects.filter(username='amy').exists())
+
+    def test_conflict_found_at_insert_names_the_field(self):
+        class Racing(RosterImport):
+            checks = 0
+
+            def _taken(self, rows):
+                # The batch check runs before "existing" registers; the per-row retry sees it.
+                self.checks += 1
+                return (set(), set()) if self.checks == 1 else super()._taken(rows)
+
+        summary = Racing(workers=1).run(self.rows('username,email,password\nexisting,fresh@example.com,Roster-passw0rd!\n'))
+        self.assertEqual(summary['errors'][0]['errors'], {'username': ["A user with this username already exists."]})
+
+
+class RecommenderTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        X = np.column_stack([rng.uniform(0, 100, 200), rng.uniform(0, 600, 200), rng.integers(0, len(STATUS_CLASSES), 200)])
+        model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X.astype(np.float32), X[:, 0] > 60)
+        self.artifact = {'model': model, 'features': FEATURES}
+        self.exercises = [
+            Exercise.objects.create(title=f'Exercise {n}', description='d', exercise_content=[], difficulty_level=1) for n in range(3)
+        ]
+        self.users = []
+        for n, (score, status) in enumerate([(95, 'completed'), (40, 'in_progress'), (70, 'not_started')]):
+            user = User.objects.create_user(f'learner{n}', f'learner{n}@example.com', 'Learner-passw0rd!')
+            for offset, exercise in enumerate(self.exercises[:n + 1]):
+                Progress.objects.create(user=user, exercise=exercise, score=score - 5 * offset, status=status, time_spent=timedelta(seconds=60 * (n + 1)))
+            self.users.append(user)
+
+    def test_batched_scores_match_per_row_predictions(self):
+        scores = score_users(self.users, artifact=self.artifact)
+        model, completed = self.artifact['model'], list(self.artifact['model'].classes_).index(True)
+        for user in self.users:
+            features = UserFeatures.objects.get(user=user)
+            for progress in Progress.objects.filter(user=user):
+                row = [[features.score_sum / features.progress_count, features.time_spent_seconds_sum / features.progress_count, STATUS_CLASSES.index(progress.status)]]
+                expected = model.predict_proba(np.array(row, dtype=np.float32))[0, completed]
+                [score] = [score for exercise_id, _, score in scores[user.pk] if exercise_id == progress.exercise_id]
+                self.assertAlmostEqual(score, expected)
+            ranked = [score for _, _, score in scores[user.pk]]
+            self.assertEqual(ranked, sorted(ranked, reverse=True))
+
+    def test_bulk_endpoint_is_admin_only(self):
+        admin = User.objects.create_user('admin', 'admin@example.com', 'Admin-passw0rd!', is_staff=True)
+        path = f'/api/admin/suggested-exercises/?users={self.users[0].pk},{self.users[2].pk},999'
+        with mock.patch('user.recommender.registry.get', return_value=self.artifact):
+            for user, expected in ((self.users[0], 403), (admin, 200)):
+                token = CustomTokenObtainPairSerializer.get_token(user).access_token
+                response = self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+                self.assertEqual(response.status_code, expected)
+        self.assertEqual(list(response.json()), [str(self.users[0].pk), str(self.users[2].pk)])
+
+
+@override_settings(PROGRESS_SUMMARY_MATERIALIZED=True)
+class SeedSyntheticDataTests(TestCase):
+    def seed(self, **options):
+        call_command(
+            'seed_synthetic_data', users=4, exercises=5, texts=2, progress_per_user=3, seed=7, batch_size=3,
+            stdout=io.StringIO(), **options,
+        )
+        return list(Progress.objects.order_by('user__username', 'exercise__title').values_list('user__username', 'exercise__title', 'status', 'score'))
+
+    def test_tiny_seed_is_consistent_and_reproducible(self):
+        progress = self.seed()
+        self.assertEqual(User.objects.filter(username__startswith='synth-').count(), 4)
+        self.assertEqual((Exercise.objects.count(), AnswerKey.objects.count(), TextContent.objects.count()), (5, 5, 2))
+        self.assertTrue(progress)
+        self.assertGreater(TextContent.objects.first().word_count, 0)
+        # Bulk inserts skip the signals, so the derived tables must have been rebuilt.
+        counts = Progress.objects.values('user_id').annotate(count=Count('id')).values_list('user_id', 'count')
+        self.assertEqual(dict(UserFeatures.objects.values_list('user_id', 'progress_count')), dict(counts))
+        self.assertEqual(check_progress_summaries(), [])
+
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.assertEqual(self.seed(clear=True), progress)
+
+
+class QueryDiagnosticsTests(TestCase):
+    def test_headers_only_with_diagnostics(self):
+        with override_settings(QUERY_DIAGNOSTICS=False):
+            self.assertNotIn('X-Query-Count', self.client.get('/api/exercises/'))
+        with override_settings(QUERY_DIAGNOSTICS=True):
+            self.assertIn('X-Query-Count', self.client.get('/api/exercises/'))
@@ -1,59 +1,80 @@
 # In a new file, e.g., users/views.py
+import json
 from datetime import timedelta
-
-from django.http import JsonResponse
+from itertools import islice
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Substr
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import status, generics, permissions
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
-from rest_framework.validators import UniqueValidator
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import serializers
 from rest_framework_simplejwt.views import TokenObtainPairView
+from user.answer_keys import get_answer_key, verify_against_key
+from user.audio import UnsupportedAudio
+from user.fieldsets import SparseFieldsetMixin
+from user.ingest import apply_progress_deltas, merge_progress_deltas
+from user.matching import match_threshold, ratio, verify_answers
 from user.models import Exercise, Profile, Progress, TextContent
-from user.utils import get_next_difficulty, suggest_exercises
-from .serializers import CustomTokenObtainPairSerializer, ExerciseSerializer, ProfileSerializer, ProgressReportSerializer, ProgressSerializer, TextContentSerializer
+from user.pagination import CreatedAtKeysetPagination, LastUpdatedKeysetPagination
+from user.readability import grade_range
+from user.recommender import suggest_exercises, suggest_exercises_bulk
+from user.response_cache import CatalogCacheMixin
+from user.roster import RosterImport, open_upload, read_roster
+from user.sampling import sample_exercise
+from user.search import search_text_content
+from user.speech import SpeechBusy, astream_recognize, recognize_content, stream_recognize
+from user.summary import get_progress_summary
+from user.utils import get_next_difficulty
+from .serializers import AnswerPairSerializer, CustomTokenObtainPairSerializer, ExerciseSerializer, ProfileSerializer, ProgressDeltaSerializer, ProgressReportSerializer, ProgressSerializer, TextContentSegmentSerializer, TextContentSerializer
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser
-from google.cloud import speech
-from fuzzywuzzy import fuzz
 
 class RegisterSerializer(serializers.ModelSerializer):
-    email = serializers.EmailField(
-        required=True,
-        validators=[UniqueValidator(queryset=User.objects.all(), message="A user with this email already exists.")]
-    )
-    username = serializers.CharField(
-        required=True,
-        validators=[UniqueValidator(queryset=User.objects.all(), message="A user with this username already exists.")]
-    )
+    email = serializers.EmailField(required=True)
+    username = serializers.CharField(required=True)
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
 
     class Meta:
         model = User
         fields = ('username', 'password', 'email', 'first_name', 'last_name')
 
+    def validate(self, attrs):
+        # One query for both uniqueness checks.
+        taken = User.objects.filter(Q(username=attrs['username']) | Q(email=attrs['email'])).values_list('username', 'email')
+        errors = {}
+        for username, email in taken:
+            if username == attrs['username']:
+                errors['username'] = ["A user with this username already exists."]
+            if email == attrs['email']:
+                errors['email'] = ["A user with this email already exists."]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
     def create(self, validated_data):
-        # Check for existing users with the same email or username
-        if User.objects.filter(email=validated_data['email']).exists():
-            raise serializers.ValidationError({"email": "A user with this email already exists."})
-
-        if User.objects.filter(username=validated_data['username']).exists():
-            raise serializers.ValidationError({"username": "A user with this username already exists."})
-
-        # Create new user if validation passes
-        user = User.objects.create(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            first_name=validated_data['first_name'],
-            last_name=validated_data['last_name']
-        )
-        user.set_password(validated_data['password'])
-        user.save()
-        return user
+        # One INSERT for the user (password hashed beforehand) and one for the profile, atomically.
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(
+                    username=validated_data['username'],
+                    email=validated_data['email'],
+                    password=validated_data['password'],
+                    first_name=validated_data.get('first_name', ''),
+                    last_name=validated_data.get('last_name', ''),
+                )
+        except IntegrityError:
+            # Lost a race with a concurrent registration of the same username.
+            raise serializers.ValidationError({"username": ["A user with this username already exists."]})
 
     def to_representation(self, instance):
         return {
@@ -112,12 +133,9 @@ class ProfileDetailView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        user = self.request.user
-        try:
-            return user.profile  
-        except Profile.DoesNotExist:
-            profile = Profile.objects.create(user=user)
-            return profile
+        # request.user only carries a snapshot of the profile; edits need the row.
+        profile, _ = Profile.objects.select_related('user').get_or_create(user_id=self.request.user.id)
+        return profile
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -159,11 +177,7 @@ class CurrentUserView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        user = self.request
-        try:
-            return user
-        except User.DoesNotExist:
-            return None
+        return self.request.user.profile
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -178,27 +192,153 @@ class CurrentUserView(generics.RetrieveAPIView):
         return Response(response_data, status=status.HTTP_200_OK)
         
         
-class TextContentListCreateView(generics.ListCreateAPIView):
+class TextContentListCreateView(CatalogCacheMixin, SparseFieldsetMixin, generics.ListCreateAPIView):
     queryset = TextContent.objects.all()
     serializer_class = TextContentSerializer
+    pagination_class = CreatedAtKeysetPagination
+    query_budget = 2
+    # Lists leave bodies out unless asked (?fields=...,body); readers fetch them by segment.
+    default_excluded_fields = ('body',)
+    deferrable_fields = ('body', 'segment_offsets')
 
-class TextContentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TextContentDetailView(CatalogCacheMixin, SparseFieldsetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = TextContent.objects.all()
     serializer_class = TextContentSerializer
-    
-class ExerciseListCreateView(generics.ListCreateAPIView):
+    query_budget = 3
+    deferrable_fields = ('body', 'segment_offsets')
+
+class TextContentSegmentView(CatalogCacheMixin, generics.RetrieveAPIView):
+    """One precomputed, sentence-aligned segment of a text's body (see TEXT_SEGMENT_CHARS)."""
+    queryset = TextContent.objects.only('id', 'title', 'updated_at', 'segment_offsets')
+    serializer_class = TextContentSegmentSerializer
+    query_budget = 2
+
+    def get_object(self):
+        text = super().get_object()
+        index = self.kwargs['index']
+        start, end = self.segment_bounds(text, index)
+        # Only the segment leaves the database; SQL substrings are 1-based. Matching
+        # updated_at makes it the body the offsets were computed from.
+        segment = TextContent.objects.filter(pk=text.pk, updated_at=text.updated_at).values_list(
+            Substr('body', start + 1, end - start), flat=True,
+        ).first()
+        if segment is None:
+            # Edited between the two queries: read the offsets and body together instead.
+            text = get_object_or_404(TextContent.objects.only('id', 'title', 'updated_at', 'segment_offsets', 'body'), pk=text.pk)
+            start, end = self.segment_bounds(text, index)
+            segment = text.body[start:end]
+        text.segment_text = segment
+        text.segment_index, text.segment_count = index, len(text.segment_offsets)
+        text.segment_start, text.segment_end = start, end
+        return text
+
+    def segment_bounds(self, text, index):
+        if index >= len(text.segment_offsets):
+            raise NotFound(f"Text {text.pk} has {len(text.segment_offsets)} segment(s).")
+        return text.segment_offsets[index]
+
+class TextContentForLevelView(SparseFieldsetMixin, generics.GenericAPIView):
+    """Texts whose grade_level falls in the band for the user's reading level, easiest first."""
+    queryset = TextContent.objects.all()
+    serializer_class = TextContentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 1
+    max_page_size = 50
+    default_excluded_fields = ('body',)
+    deferrable_fields = ('body', 'segment_offsets')
+
+    def get(self, request, *args, **kwargs):
+        try:
+            reading_level = request.user.profile.reading_level
+        except Profile.DoesNotExist:
+            return Response({"detail": "Your account has no profile."}, status=status.HTTP_400_BAD_REQUEST)
+        band = grade_range(reading_level) or (None, None)
+        try:
+            low, high = (
+                float(value) if value is not None else None
+                for value in (request.query_params.get('min_grade', band[0]), request.query_params.get('max_grade', band[1]))
+            )
+            limit = min(max(int(request.query_params.get('page_size', 20)), 1), self.max_page_size)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({"detail": "min_grade, max_grade, page_size and offset must be numbers."}, status=status.HTTP_400_BAD_REQUEST)
+        if low is None and high is None:
+            return Response(
+                {"detail": "Your profile has no recognised reading level; pass min_grade and/or max_grade."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Range scan on textcontent_grade_idx (grade_level, id).
+        texts = self.get_queryset()
+        if low is not None:
+            texts = texts.filter(grade_level__gte=low)
+        if high is not None:
+            texts = texts.filter(grade_level__lte=high)
+        texts = texts.order_by('grade_level', 'id')[offset:offset + limit]
+        return Response({
+            'reading_level': reading_level,
+            'grade_range': [low, high],
+            'results': self.get_serializer(texts, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+class TextContentSearchView(APIView):
+    query_budget = 1
+    max_page_size = 50
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"detail": "A search query (?q=) is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            difficulty_level = request.query_params.get('difficulty_level')
+            difficulty_level = int(difficulty_level) if difficulty_level else None
+            limit = min(max(int(request.query_params.get('page_size', 20)), 1), self.max_page_size)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({"detail": "difficulty_level, page_size and offset must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = search_text_content(
+            query,
+            difficulty_level=difficulty_level,
+            topic=request.query_params.get('topic'),
+            limit=limit,
+            offset=offset,
+        )
+        return Response({'query': query, 'results': results}, status=status.HTTP_200_OK)
+
+class ExerciseListCreateView(CatalogCacheMixin, generics.ListCreateAPIView):
     queryset = Exercise.objects.all()
     serializer_class = ExerciseSerializer
+    pagination_class = CreatedAtKeysetPagination
+    query_budget = 2
 
-    def get(self, request, *args, **kwargs):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        # Optional filters
+        difficulty_level = self.request.query_params.get('difficulty_level')
+        learning_style = self.request.query_params.get('learning_style')
+
+        if difficulty_level:
+            queryset = queryset.filter(difficulty_level=difficulty_level)
+        if learning_style:
+            queryset = queryset.filter(learning_style=learning_style)
+
+        return queryset
+
+    def list(self, request, *args, **kwargs):
         exercises = self.get_queryset()
-        serializer = self.get_serializer(exercises, many=True)
+        page = self.paginate_queryset(exercises)
+        serializer = self.get_serializer(exercises if page is None else page, many=True)
 
         response_data = {
             'data': serializer.data,
             'success': True,
             'message': 'Exercise list retrieved successfully'
         }
+        if page is not None:
+            response_data['next'] = self.paginator.get_next_link()
 
         return Response(response_data, status=status.HTTP_200_OK)
 
@@ -224,11 +364,12 @@ class ExerciseListCreateView(generics.ListCreateAPIView):
                 'message': 'Exercise creation failed: ' + str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
     
-class ExerciseDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ExerciseDetailView(CatalogCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Exercise.objects.all()
     serializer_class = ExerciseSerializer
+    query_budget = 3
 
-    def get(self, request, *args, **kwargs):
+    def retrieve(self, request, *args, **kwargs):
         try:
             exercise = self.get_object()
             serializer = self.get_serializer(exercise)
@@ -292,11 +433,12 @@ class ExerciseDetailView(generics.RetrieveUpdateDestroyAPIView):
 class RetrieveProgressView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ProgressSerializer
+    pagination_class = LastUpdatedKeysetPagination
+    query_budget = 2
     
 
     def get_queryset(self):
-        user = self.request.user
-        return Progress.objects.filter(user=user)
+        return Progress.objects.filter(user_id=self.request.user.id)
 
 class ProgressDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Progress.objects.all()
@@ -332,34 +474,91 @@ class UpdateProgressView(generics.UpdateAPIView):
             )
 
         progress, created = Progress.objects.get_or_create(
-            user=request.user,
+            user_id=request.user.id,
             exercise_id=exercise_id,
             defaults={'time_spent': timedelta(seconds=0)}
         )
 
         progress.time_spent += timedelta(seconds=time_spent_seconds)
 
-        serializer = self.get_serializer(progress, data=request.data, partial=True)
+        # time_spent is the increment just applied, not the new total.
+        data = {key: value for key, value in request.data.items() if key != 'time_spent'}
+        serializer = self.get_serializer(progress, data=data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+class BulkProgressView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 10
+
+    def post(self, request, *args, **kwargs):
+        items = request.data if isinstance(request.data, list) else request.data.get('items')
+
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"detail": "A non-empty list of progress items is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(items) > settings.PROGRESS_BULK_MAX_ITEMS:
+            return Response(
+                {"detail": f"At most {settings.PROGRESS_BULK_MAX_ITEMS} progress items can be sent at once."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = ProgressDeltaSerializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'success': False, 'errors': serializer.errors}
+
+        known_exercises = set(
+            Exercise.objects.filter(id__in={item['exercise'] for _, item in valid}).values_list('id', flat=True)
+        )
+        for index, item in valid:
+            if item['exercise'] not in known_exercises:
+                results[index] = {'index': index, 'success': False, 'errors': {'exercise': ["Exercise does not exist."]}}
+        valid = [(index, item) for index, item in valid if item['exercise'] in known_exercises]
+
+        applied = apply_progress_deltas(request.user.pk, merge_progress_deltas(item for _, item in valid)) if valid else {}
+        for index, item in valid:
+            progress, created = applied[item['exercise']]
+            results[index] = {
+                'index': index,
+                'success': True,
+                'created': created,
+                'progress': ProgressSerializer(progress).data,
+            }
+
+        failed = sum(not result['success'] for result in results)
+        return Response({
+            'data': results,
+            'success': failed == 0,
+            'message': f"Applied {len(valid)} progress items, {failed} failed"
+        }, status=status.HTTP_200_OK if valid else status.HTTP_400_BAD_REQUEST)
+
 class ProgressReportView(generics.ListAPIView):
     serializer_class = ProgressReportSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 2
 
     def get_queryset(self):
-        return Progress.objects.filter(user=self.request.user)
+        return Progress.objects.filter(user_id=self.request.user.id).select_related('exercise')
     
 
 class ProgressHistoryView(generics.ListAPIView):
     serializer_class = ProgressSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = LastUpdatedKeysetPagination
+    query_budget = 2
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Progress.objects.filter(user=user)
+        queryset = Progress.objects.filter(user_id=self.request.user.id)
 
         # Optional filters
         start_date = self.request.query_params.get('start_date')
@@ -375,33 +574,27 @@ class ProgressHistoryView(generics.ListAPIView):
     
 class ProgressSummaryView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 2
 
     def get(self, request):
-        user = request.user
-        progress_entries = Progress.objects.filter(user=user)
-
-        total_exercises = progress_entries.count()
-        completed_exercises = progress_entries.filter(status="completed").count()
-        average_score = progress_entries.aggregate(Avg('score'))['score__avg']
-        average_time_spent = progress_entries.aggregate(Avg('time_spent'))['time_spent__avg']
-
-        summary_data = {
-            "total_exercises": total_exercises,
-            "completed_exercises": completed_exercises,
-            "average_score": average_score,
-            "average_time_spent": average_time_spent,
-        }
+        summary_data = get_progress_summary(request.user)
 
         return Response(summary_data, status=200)
 
 class NextExerciseView(generics.RetrieveAPIView):
     serializer_class = ExerciseSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 5
 
     def get(self, request, *args, **kwargs):
         user = request.user
         difficulty_level = get_next_difficulty(user)
-        next_exercise = Exercise.objects.filter(difficulty_level=difficulty_level).order_by('?').first()  # Random exercise
+        exclude_completed = request.query_params.get('exclude_completed', '').lower() in ('1', 'true', 'yes')
+        next_exercise = sample_exercise(
+            difficulty_level,
+            learning_style=request.query_params.get('learning_style'),
+            exclude_completed_by=user if exclude_completed else None,
+        )
         
         if next_exercise:
             serializer = self.get_serializer(next_exercise)
@@ -418,24 +611,66 @@ class SpeechToTextView(APIView):
         
         audio_file = request.FILES['audio'].read()
         
-        client = speech.SpeechClient()
-        
-        audio = speech.RecognitionAudio(content=audio_file)
-        config = speech.RecognitionConfig(
-            encoding = speech.RecognitionConfig.AudioEncoding.MP3 | speech.RecognitionConfig.AudioEncoding.LINEAR16 | speech.RecognitionConfig.AudioEncoding.OGG_OPUS | speech.RecognitionConfig.AudioEncoding.FLAC,
-            # sample_rate_hertz = 16000,
-            language_code = 'en-GH',
-        )
-        
         try:
-            response = client.recognize(config=config, audio=audio)
+            transcriptions, cache_hit = recognize_content(audio_file)
             
-            transcriptions = [result.alternatives[0].transcript for result in response.results]
-            return Response({"transcriptions": transcriptions}, status=status.HTTP_200_OK)
+            response = Response({"transcriptions": transcriptions}, status=status.HTTP_200_OK)
+            response['X-Transcription-Cache'] = 'hit' if cache_hit else 'miss'
+            return response
         
+        except UnsupportedAudio as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except SpeechBusy:
+            return Response({"detail": "Speech recognition is busy, please retry."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
+def ndjson(events):
+    try:
+        for event in events:
+            yield json.dumps(event) + "\n"
+    except Exception as e:
+        yield stream_error(e)
+
+
+async def andjson(events):
+    try:
+        async for event in events:
+            yield json.dumps(event) + "\n"
+    except Exception as e:
+        yield stream_error(e)
+
+
+def stream_error(e):
+    """The last NDJSON line of a recognition stream that failed part way."""
+    if isinstance(e, UnsupportedAudio):
+        return json.dumps({"detail": str(e)}) + "\n"
+    if isinstance(e, SpeechBusy):
+        return json.dumps({"detail": "Speech recognition is busy, please retry."}) + "\n"
+    return json.dumps({"error": str(e)}) + "\n"
+
+
+class StreamingSpeechToTextView(APIView):
+    parser_classes = [MultiPartParser]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+
+        if 'audio' not in request.FILES:
+            return Response({"detail": "No audio file provided."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Under ASGI the response must be an async iterator, or Django buffers it whole.
+        if isinstance(request._request, ASGIRequest):
+            content = andjson(astream_recognize(request.FILES['audio']))
+        else:
+            content = ndjson(stream_recognize(request.FILES['audio']))
+
+        response = StreamingHttpResponse(content, content_type='application/x-ndjson')
+        response['X-Accel-Buffering'] = 'no'  # let partial transcripts through reverse proxies
+        return response
+
 class MatchAnswerView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -446,23 +681,117 @@ class MatchAnswerView(APIView):
         if not actual_answer or not user_answer:
             return JsonResponse({"error": "Both 'actual_answer' and 'user_answer' are required."}, status=400)
         
-        match_score = fuzz.ratio(actual_answer, user_answer)
+        match_score = ratio(actual_answer, user_answer)
         
-        if match_score >= 80:
+        if match_score >= match_threshold():
             return Response({"success": True, "message": "Matching completed with a score of " + str(match_score) + "%", "match_score": match_score, "match": True})
         else:
             return Response({"success": False, "message": "Matching completed with a score of " + str(match_score) + "%", "match_score": match_score, "match": False})
 
-class SuggestedExerciseView(generics.RetrieveAPIView):
-    serializer_class = ExerciseSerializer
+class VerifyAnswersView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 2
+
+    def post(self, request, *args, **kwargs):
+        exercise_id = None if isinstance(request.data, list) else request.data.get('exercise_id')
+        items = request.data if isinstance(request.data, list) else request.data.get('answers')
+
+        if not isinstance(items, (list, dict)) or not items or (exercise_id is None and not isinstance(items, list)):
+            return Response({"detail": "A non-empty list of answers is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(items) > settings.VERIFY_ANSWERS_MAX_ITEMS:
+            return Response(
+                {"detail": f"At most {settings.VERIFY_ANSWERS_MAX_ITEMS} answers can be verified at once."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if exercise_id is not None:
+            # Expected answers come from the exercise's stored key, not from the client.
+            answer_key = get_answer_key(exercise_id) if str(exercise_id).isdigit() else None
+            if answer_key is None:
+                return Response({"detail": "Exercise not found."}, status=status.HTTP_404_NOT_FOUND)
+            try:
+                results, total = verify_against_key(answer_key, items)
+            except (TypeError, ValueError):
+                return Response({"detail": "Answers must be a list or an object keyed by item index."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            serializer = AnswerPairSerializer(data=items, many=True)
+            if not serializer.is_valid():
+                return Response({"detail": "Invalid answers.", "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+            results = [
+                {'index': index, **result}
+                for index, result in enumerate(verify_answers(
+                    (item['actual_answer'], item['user_answer']) for item in serializer.validated_data
+                ))
+            ]
+            total = len(results)
+
+        matched = sum(result['match'] for result in results)
+        return Response({
+            "success": True,
+            "message": f"{matched} of {total} answers matched.",
+            "matched": matched,
+            "total": total,
+            "results": results,
+        })
+
+class RosterImportView(APIView):
+    parser_classes = [MultiPartParser]
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        if 'roster' not in request.FILES:
+            return Response({"detail": "No roster file provided."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Not ?format=, which DRF reserves for choosing the renderer.
+        fmt = request.query_params.get('roster_format')
+        if fmt not in (None, 'csv', 'jsonl'):
+            return Response({"detail": "roster_format must be 'csv' or 'jsonl'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Passwords are hashed in this thread, so uploads stay small; larger rosters go through `manage.py import_roster`.
+        limit = settings.ROSTER_UPLOAD_MAX_ROWS
+        rows = list(islice(read_roster(open_upload(request.FILES['roster']), fmt), limit + 1))
+        if len(rows) > limit:
+            return Response(
+                {"detail": f"At most {limit} roster rows can be uploaded at once; import larger rosters with `manage.py import_roster`."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        summary = RosterImport(workers=1, dry_run=dry_run).run(rows)
+        return Response({
+            'data': summary,
+            'success': summary['failed'] == 0,
+            'message': f"{summary['processed'] - summary['failed']} of {summary['processed']} roster rows "
+                       f"{'are valid' if dry_run else 'imported'}",
+        }, status=status.HTTP_200_OK)
+
+class SuggestedExerciseView(APIView):
+    """The user's exercises the recommender scores above its threshold, as ``{exercise, title, score}`` items."""
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 2
 
     def get(self, request, *args, **kwargs):
-        user = request.user
-        next_exercises = suggest_exercises(user)
-        # next_exercise = Exercise.objects.filter(difficulty_level=difficulty_level).order_by('?').first()  # Random exercise
-        
+        next_exercises = suggest_exercises(request.user)
         if next_exercises:
-            serializer = self.get_serializer(next_exercises)
             return Response(next_exercises, status=status.HTTP_200_OK)
-        return Response({"detail": "No exercises available."}, status=status.HTTP_404_NOT_FOUND)        
\ No newline at end of file
+        return Response({"detail": "No exercises available."}, status=status.HTTP_404_NOT_FOUND)
+
+class BulkSuggestedExercisesView(APIView):
+    """Suggestions for ``?users=1,2,3`` keyed by user id, scored with one query and one model call."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            user_ids = {int(value) for value in request.query_params.get('users', '').split(',') if value.strip()}
+        except ValueError:
+            return Response({"detail": "users must be a comma-separated list of user ids."}, status=status.HTTP_400_BAD_REQUEST)
+        if not user_ids:
+            return Response({"detail": "users is required."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = settings.RECOMMENDER_BULK_MAX_USERS
+        if len(user_ids) > limit:
+            return Response({"detail": f"At most {limit} users can be scored at once."}, status=status.HTTP_400_BAD_REQUEST)
+
+        users = list(User.objects.filter(pk__in=user_ids).only('pk').order_by('pk'))
+        suggestions = suggest_exercises_bulk(users)
+        return Response({str(user.pk): suggestions.get(user.pk, []) for user in users}, status=status.HTTP_200_OK)        
\ No newline at end of file